@@ -0,0 +1,43 @@
+"""Compare two benchmark result files.
+
+Usage:
+    python -m benchmarks.compare benchmarks/results/<before>.json benchmarks/results/<after>.json
+"""
+from __future__ import annotations
+import argparse
+import json
+from pathlib import Path
+from typing import List, Optional
+
+METRICS = ['throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms']
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return 'n/a'
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Diff two benchmarks.run result files.")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    args = parser.parse_args(argv)
+    before = json.loads(Path(args.before).read_text(encoding='utf-8'))
+    after = json.loads(Path(args.after).read_text(encoding='utf-8'))
+    print(f"before: {before['meta'].get('commit')} ({before['meta'].get('mode')})   "
+          f"after: {after['meta'].get('commit')} ({after['meta'].get('mode')})")
+    if before['meta'].get('counts') != after['meta'].get('counts'):
+        print("warning: the runs used different data set sizes")
+    print(f"{'endpoint':<16}" + ''.join(f"{m:>26}" for m in METRICS))
+    for name in after['endpoints']:
+        if name not in before['endpoints']:
+            continue
+        b, a = before['endpoints'][name], after['endpoints'][name]
+        cells = [f"{b[m]:>9.2f} -> {a[m]:>9.2f} {_change(b[m], a[m]):>4}" for m in METRICS]
+        print(f"{name:<16}" + ''.join(f"{c:>26}" for c in cells))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
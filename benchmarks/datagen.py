@@ -0,0 +1,225 @@
+"""Synthetic data sets for the benchmarks.
+
+Writes the same files the app keeps in ``data/`` (users, orders, FAQs,
+subscribers, products, tickets) at a chosen scale, deterministically for a
+given seed, plus ``bench.json`` describing what was generated so the runner
+can pick valid users and messages. Large files are streamed to disk rather
+than built in memory.
+
+Usage:
+    python -m benchmarks.datagen --scale small --out benchmarks/.data/small
+    python -m benchmarks.datagen --users 100000 --orders 1000000 --faqs 10000 --subscribers 50000 --out /tmp/big
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import random
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("benchmarks.datagen")
+
+REPO_DATA = Path(__file__).resolve().parents[1] / 'data'
+MANIFEST = 'bench.json'
+PASSWORD = 'bench-password'
+
+SCALES: Dict[str, Dict[str, int]] = {
+    'small': {'users': 1_000, 'orders': 10_000, 'faqs': 500, 'subscribers': 1_000, 'products': 48},
+    'medium': {'users': 20_000, 'orders': 200_000, 'faqs': 2_000, 'subscribers': 10_000, 'products': 500},
+    'large': {'users': 100_000, 'orders': 1_000_000, 'faqs': 10_000, 'subscribers': 50_000, 'products': 2_000},
+}
+
+_NAMESPACE = uuid.UUID('6f1c6a52-3d7e-4c8b-9a5e-2b7f0c1d9e44')
+_EPOCH = datetime(2025, 1, 1)
+
+_FAQ_TOPICS = ['shipping', 'returns', 'sizing', 'gold plating', 'silver care', 'gift wrapping', 'engraving',
+               'warranty', 'payment', 'discount codes', 'order tracking', 'exchanges', 'gemstones',
+               'allergies', 'packaging', 'bulk orders', 'resizing', 'cancellations', 'refunds', 'stock alerts']
+_FAQ_OBJECTS = ['rings', 'necklaces', 'bracelets', 'earrings', 'anklets', 'pendants', 'chains', 'gift cards']
+_FAQ_FORMS = ['How does {t} work for {o}?', 'Can I get {t} on {o}?', 'What is your policy on {t} for {o}?',
+              'Do you offer {t} for {o}?', 'How long does {t} take for {o}?', 'Is there a fee for {t} on {o}?']
+_FILLER = ['hello', 'my', 'order', 'please', 'urgent', 'still', 'waiting', 'thanks', 'color', 'box',
+           'weekend', 'store', 'visit', 'price', 'cheaper', 'why', 'when', 'broken', 'clasp', 'love']
+
+
+def user_id(seed: int, index: int) -> str:
+    """Deterministic uuid for the ``index``-th generated user."""
+    return str(uuid.uuid5(_NAMESPACE, f"{seed}:user:{index}"))
+
+
+def user_email(index: int) -> str:
+    return f"user{index}@bench.lunara.test"
+
+
+def _write_array(path: Path, records: Iterable[Any]) -> int:
+    """Stream ``records`` to ``path`` as a JSON array; returns the count."""
+    count = 0
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for record in records:
+            f.write(',\n' if count else '\n')
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+            count += 1
+        f.write('\n]\n')
+    tmp.replace(path)
+    return count
+
+
+def _password_hash(rounds: int) -> str:
+    # One hash shared by every user: bcrypt embeds the salt, so verification is
+    # as expensive as with per-user salts while generation stays fast.
+    import bcrypt
+    return bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def gen_users(count: int, seed: int, password_hash: str) -> Iterable[Dict[str, Any]]:
+    for i in range(count):
+        yield {
+            'id': user_id(seed, i),
+            'name': f"Bench User {i}",
+            'email': user_email(i),
+            'password': password_hash,
+            'created_at': (_EPOCH + timedelta(minutes=i)).isoformat(),
+        }
+
+
+def gen_products(count: int, seed: int) -> List[Dict[str, Any]]:
+    base = json.loads((REPO_DATA / 'products.json').read_text(encoding='utf-8'))
+    rng = random.Random(f"{seed}:products")
+    products = []
+    for i in range(count):
+        template = base[i % len(base)]
+        product = dict(template, id=i + 1)
+        if i >= len(base):
+            product['name'] = f"{template['name']} {i // len(base) + 1}"
+            product['price'] = int(template['price'] * rng.uniform(0.6, 1.6))
+            product['originalPrice'] = int(product['price'] * 1.2) if rng.random() < 0.5 else None
+            product['rating'] = round(rng.uniform(3.5, 5.0), 1)
+            product['reviews'] = rng.randint(0, 400)
+            product['inventory'] = rng.randint(0, 40)
+        products.append(product)
+    return products
+
+
+def gen_orders(count: int, users: int, products: List[Dict[str, Any]], seed: int) -> Iterable[Dict[str, Any]]:
+    rng = random.Random(f"{seed}:orders")
+    methods = ['card', 'upi', 'paypal', 'cod']
+    step = timedelta(days=365) / max(1, count)
+    for i in range(count):
+        items = []
+        for product in rng.sample(products, rng.randint(1, min(4, len(products)))):
+            items.append({'product_id': product['id'], 'quantity': rng.randint(1, 3), 'unit_price': product['price']})
+        owner = user_id(seed, rng.randrange(users)) if users and rng.random() < 0.9 else 'guest'
+        yield {
+            'id': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            'user_id': owner,
+            'items': items,
+            'total': sum(it['unit_price'] * it['quantity'] for it in items),
+            'status': 'confirmed',
+            'payment_method': rng.choice(methods),
+            'created_at': (_EPOCH + step * i).isoformat(),
+        }
+
+
+def gen_faqs(count: int, seed: int) -> List[Dict[str, str]]:
+    base = json.loads((REPO_DATA / 'faqs.json').read_text(encoding='utf-8'))
+    rng = random.Random(f"{seed}:faqs")
+    faqs = list(base[:count])
+    seen = {f['question'] for f in faqs}
+    while len(faqs) < count:
+        topic, obj = rng.choice(_FAQ_TOPICS), rng.choice(_FAQ_OBJECTS)
+        question = rng.choice(_FAQ_FORMS).format(t=topic, o=obj)
+        if question in seen:
+            question = f"{question[:-1]} ({len(faqs)})?"
+        seen.add(question)
+        faqs.append({'category': topic.title(), 'question': question,
+                     'answer': f"Details about {topic} for {obj} are on our help pages."})
+    return faqs
+
+
+def gen_subscribers(count: int) -> Iterable[Dict[str, Any]]:
+    for i in range(count):
+        email = f"subscriber{i}@bench.lunara.test"
+        yield {'email': email, 'subscribed_at': (_EPOCH + timedelta(seconds=i)).isoformat(),
+               'discount_code': f"LUNARA10-{email[:3].upper()}", 'source': 'signup'}
+
+
+def chat_messages(faqs: List[Dict[str, str]], count: int, seed: int) -> List[str]:
+    """Mix of near-miss FAQ questions (mostly matched) and free text (mostly unmatched)."""
+    rng = random.Random(f"{seed}:messages")
+    messages = []
+    for _ in range(count):
+        if rng.random() < 0.7:
+            words = rng.choice(faqs)['question'].lower().rstrip('?').split()
+            if len(words) > 3:
+                words.pop(rng.randrange(len(words)))
+            messages.append(' '.join(words))
+        else:
+            messages.append(' '.join(rng.choice(_FILLER) for _ in range(rng.randint(3, 9))))
+    return messages
+
+
+def generate(out: Path, users: int, orders: int, faqs: int, subscribers: int, products: int,
+             seed: int = 42, bcrypt_rounds: int = 12) -> Dict[str, Any]:
+    """Write a full data directory to ``out`` and return its manifest."""
+    out.mkdir(parents=True, exist_ok=True)
+    for stale in out.glob('*.jsonl'):
+        stale.unlink()
+    started = time.perf_counter()
+    product_list = gen_products(products, seed)
+    faq_list = gen_faqs(faqs, seed)
+    counts = {
+        'users': _write_array(out / 'users.json', gen_users(users, seed, _password_hash(bcrypt_rounds))),
+        'products': _write_array(out / 'products.json', product_list),
+        'orders': _write_array(out / 'orders.json', gen_orders(orders, users, product_list, seed)),
+        'faqs': _write_array(out / 'faqs.json', faq_list),
+        'subscribers': _write_array(out / 'subscribers.json', gen_subscribers(subscribers)),
+    }
+    _write_array(out / 'support_tickets.json', [])
+    if (REPO_DATA / 'products.js').exists():
+        shutil.copyfile(REPO_DATA / 'products.js', out / 'products.js')
+    manifest = {
+        'seed': seed,
+        'counts': counts,
+        'password': PASSWORD,
+        'bcrypt_rounds': bcrypt_rounds,
+        'messages': chat_messages(faq_list, 200, seed),
+        'generated_at': datetime.now().isoformat(),
+    }
+    (out / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    logger.info("Generated %s in %s (%.1fs)", counts, out, time.perf_counter() - started)
+    return manifest
+
+
+def load_manifest(data_dir: Path) -> Dict[str, Any]:
+    path = Path(data_dir) / MANIFEST
+    if not path.exists():
+        raise SystemExit(f"{path} not found; generate a data set with python -m benchmarks.datagen")
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic Lunara data directory.")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    for name in SCALES['small']:
+        parser.add_argument(f'--{name}', type=int, help=f"number of {name} (overrides --scale)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--bcrypt-rounds', type=int, default=12,
+                        help="cost of the stored password hash (match BCRYPT_ROUNDS of the app under test)")
+    parser.add_argument('--out', required=True, help="target data directory (files in it are overwritten)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    sizes = {name: getattr(args, name) if getattr(args, name) is not None else default
+             for name, default in SCALES[args.scale].items()}
+    generate(Path(args.out), seed=args.seed, bcrypt_rounds=args.bcrypt_rounds, **sizes)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,246 @@
+"""Flash-sale checkout benchmark: hundreds of buyers racing for one SKU.
+
+Every buyer thread posts /api/process-payment for the same product until the
+stock is gone. Buyers are spread over ``--processes`` forked workers that share
+one data directory, the way gunicorn workers do, so the run checks both
+throughput and that the shared stock is never oversold. ``--strategy naive``
+swaps the inventory service for the simple alternative: a read-modify-write of
+products.json under its file lock on every checkout.
+
+Usage:
+    python -m benchmarks.flash_sale --buyers 400 --processes 4 --stock 2000
+    python -m benchmarks.flash_sale --buyers 400 --processes 4 --stock 2000 --strategy naive
+    python -m benchmarks.flash_sale --url http://127.0.0.1:5000 --buyers 200 --sku 6   # against a running server
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import multiprocessing
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .datagen import gen_products
+from .run import HttpClient, percentile
+
+logger = logging.getLogger("benchmarks.flash_sale")
+
+OUTCOMES = ('sold', 'sold_out', 'declined', 'error')
+
+
+class NaiveInventory:
+    """Baseline: decrement products.json under its lock per checkout, re-increment on decline."""
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+
+    def _adjust(self, items: Dict[Any, int], sign: int) -> None:
+        from lunara_app.services.db import json_transaction
+        from lunara_app.services.inventory import OutOfStock
+        with json_transaction(self.data_dir, 'products.json', []) as products:
+            by_id = {str(p.get('id')): p for p in products}
+            for product_id, qty in items.items():
+                product = by_id.get(str(product_id))
+                if product is not None and sign < 0 and product.get('inventory', 0) < qty:
+                    raise OutOfStock(str(product_id), qty, product.get('inventory', 0))
+            for product_id, qty in items.items():
+                product = by_id.get(str(product_id))
+                if product is not None:
+                    product['inventory'] = product.get('inventory', 0) + sign * qty
+
+    def reserve(self, items):
+        self._adjust(items, -1)
+        return _NaiveReservation(items)
+
+    def commit(self, reservation_id) -> bool:
+        return True
+
+    def release(self, reservation_id) -> None:
+        self._adjust(reservation_id.items, +1)
+
+
+class _NaiveReservation:
+    def __init__(self, items):
+        self.items = items
+        self.id = self  # payments passes reservation.id back to commit/release
+
+
+def _outcome(status: int, body: Dict[str, Any]) -> str:
+    if status != 200:
+        return 'error'
+    if body.get('success'):
+        return 'sold'
+    return 'sold_out' if body.get('out_of_stock') else 'declined'
+
+
+def _buyers(make_request, buyers: int, attempts: int, deadline: float) -> Dict[str, Any]:
+    """Run ``buyers`` threads, each retrying until sold out / ``attempts`` / ``deadline``."""
+    latencies: List[float] = []
+    counts = {name: 0 for name in OUTCOMES}
+    lock = threading.Lock()
+    start = threading.Barrier(buyers)
+
+    def buyer() -> None:
+        local: List[float] = []
+        local_counts = {name: 0 for name in OUTCOMES}
+        start.wait()
+        for _ in range(attempts):
+            if time.monotonic() > deadline:
+                break
+            t0 = time.perf_counter()
+            try:
+                outcome = make_request()
+            except Exception as e:
+                logger.debug("request failed: %s", e)
+                outcome = 'error'
+            local.append(time.perf_counter() - t0)
+            local_counts[outcome] += 1
+            if outcome == 'sold_out':
+                break
+        with lock:
+            latencies.extend(local)
+            for name, n in local_counts.items():
+                counts[name] += n
+
+    threads = [threading.Thread(target=buyer) for _ in range(buyers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {'latencies': latencies, 'counts': counts}
+
+
+def _in_process_worker(app, strategy: str, sku: int, buyers: int, attempts: int, deadline: float, out) -> None:
+    if strategy == 'naive':
+        from lunara_app.blueprints import payments
+        naive = NaiveInventory(app.config['DATA_DIR'])
+        payments.get_inventory = lambda config: naive
+    client_local = threading.local()
+    body = {'method': 'card', 'items': [{'id': sku, 'quantity': 1}]}
+
+    def make_request() -> str:
+        client = getattr(client_local, 'client', None)
+        if client is None:
+            client = client_local.client = app.test_client()
+        resp = client.post('/api/process-payment', json=body)
+        return _outcome(resp.status_code, resp.get_json(silent=True) or {})
+
+    result = _buyers(make_request, buyers, attempts, deadline)
+    from lunara_app.services.inventory import close_inventories
+    close_inventories()  # return leased units, as gunicorn's worker_exit hook does
+    out.put(result)
+
+
+def _http_request(url: str, sku: int):
+    local = threading.local()
+    body = {'method': 'card', 'items': [{'id': sku, 'quantity': 1}]}
+
+    def make_request() -> str:
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = _JsonHttpClient(url)
+        status, payload = client.post_json('/api/process-payment', body)
+        return _outcome(status, payload)
+    return make_request
+
+
+class _JsonHttpClient(HttpClient):
+    def post_json(self, path: str, body: Dict[str, Any]):
+        import urllib.error
+        import urllib.request
+        req = urllib.request.Request(self.base_url + path, data=json.dumps(body).encode('utf-8'), method='POST',
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                return resp.status, json.loads(resp.read() or b'{}')
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, {}
+
+
+def _prepare_data(stock: int, sku: int, catalog: int) -> str:
+    scratch = tempfile.mkdtemp(prefix='lunara-flash-')
+    products = gen_products(catalog, seed=42)
+    for product in products:
+        if product.get('id') == sku:
+            product['inventory'] = stock
+    (Path(scratch) / 'products.json').write_text(json.dumps(products, indent=2), encoding='utf-8')
+    return scratch
+
+
+def _stock_left(data_dir: str, sku: int) -> Optional[int]:
+    products = json.loads((Path(data_dir) / 'products.json').read_text(encoding='utf-8'))
+    return next((p.get('inventory') for p in products if p.get('id') == sku), None)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Checkout throughput with many buyers hitting one SKU.")
+    parser.add_argument('--buyers', type=int, default=400, help="parallel buyer threads in total")
+    parser.add_argument('--processes', type=int, default=4, help="forked worker processes sharing the data dir")
+    parser.add_argument('--attempts', type=int, default=20, help="max checkouts per buyer")
+    parser.add_argument('--stock', type=int, default=500)
+    parser.add_argument('--sku', type=int, default=1)
+    parser.add_argument('--products', type=int, default=500, help="catalog size (the naive strategy rewrites it all)")
+    parser.add_argument('--strategy', choices=('reserve', 'naive'), default='reserve')
+    parser.add_argument('--duration', type=float, default=60.0, help="stop after this many seconds")
+    parser.add_argument('--url', help="drive a running server over HTTP instead (stock is whatever it has)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    logging.getLogger('lunara_app').setLevel(logging.WARNING)
+
+    deadline = time.monotonic() + args.duration
+    started = time.perf_counter()
+    data_dir = None
+    if args.url:
+        result = _buyers(_http_request(args.url, args.sku), args.buyers, args.attempts, deadline)
+        results = [result]
+    else:
+        from lunara_app import create_app
+        from lunara_app.config import Config
+        data_dir = _prepare_data(args.stock, args.sku, max(args.products, args.sku))
+        # Build the app before forking, as the preloading server does
+        app = create_app(Config(DATA_DIR=data_dir, INVENTORY_FLUSH_INTERVAL=0.2))
+        ctx = multiprocessing.get_context('fork')
+        out = ctx.Queue()
+        per_process = max(1, args.buyers // max(1, args.processes))
+        started = time.perf_counter()
+        procs = [ctx.Process(target=_in_process_worker,
+                             args=(app, args.strategy, args.sku, per_process, args.attempts, deadline, out))
+                 for _ in range(max(1, args.processes))]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(v * 1000 for r in results for v in r['latencies'])
+    counts = {name: sum(r['counts'][name] for r in results) for name in OUTCOMES}
+    report: Dict[str, Any] = {
+        'strategy': 'http' if args.url else args.strategy,
+        'buyers': args.buyers,
+        'processes': 1 if args.url else args.processes,
+        'checkouts': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'checkouts_per_s': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        **counts,
+    }
+    if data_dir:
+        left = _stock_left(data_dir, args.sku)
+        report.update(stock=args.stock, stock_left=left,
+                      oversold=max(0, counts['sold'] - args.stock),
+                      consistent=left == args.stock - counts['sold'])
+        shutil.rmtree(data_dir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+    return 0 if report.get('oversold', 0) == 0 and report.get('consistent', True) else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
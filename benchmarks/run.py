@@ -0,0 +1,305 @@
+"""Latency/throughput benchmark for the /api endpoints.
+
+Runs each scenario against a data directory made by ``benchmarks.datagen``,
+either in-process through Flask's test client (default; the data set is copied
+to a scratch directory first so runs start from identical files) or over real
+HTTP against a running server (``--url``). Reports p50/p95/p99 latency and
+throughput per endpoint and writes them, with the git commit and data set
+sizes, to a JSON file that ``benchmarks.compare`` can diff.
+
+Usage:
+    python -m benchmarks.run --data benchmarks/.data/small
+    python -m benchmarks.run --data /tmp/big --url http://127.0.0.1:5000 --concurrency 16
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.cookiejar import CookieJar
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .datagen import load_manifest, user_email, user_id
+
+logger = logging.getLogger("benchmarks.run")
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+PRODUCT_QUERIES = [
+    '', 'category=Rings', 'category=Necklaces&sort=price_asc', 'sort=rating&limit=12',
+    'min_price=1000&max_price=5000&sort=price_desc', 'on_sale=1&in_stock=1&limit=24&offset=24',
+]
+
+
+class Client:
+    """Minimal request interface shared by the test-client and HTTP drivers."""
+
+    def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> int:
+        raise NotImplementedError
+
+    def login(self, index: int, manifest: Dict[str, Any]) -> None:
+        self.request('POST', '/api/login', {'email': user_email(index), 'password': manifest['password']})
+
+
+class TestClient(Client):
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> int:
+        return self.client.open(path, method=method, json=body).status_code
+
+    def login(self, index: int, manifest: Dict[str, Any]) -> None:
+        # Skip bcrypt during setup; the login scenario measures it on its own
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = user_id(manifest['seed'], index)
+
+
+class HttpClient(Client):
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+    def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> int:
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'} if data else {})
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+# A scenario returns (method, path, body) for request number ``i``; ``setup``
+# runs once per client before timing starts.
+Scenario = Tuple[Callable[[Client, int], None], Callable[[random.Random, int], Tuple[str, str, Optional[dict]]]]
+
+
+def scenarios(manifest: Dict[str, Any]) -> Dict[str, Scenario]:
+    users = manifest['counts']['users']
+    messages = manifest['messages']
+    run_id = int(time.time())
+
+    def no_setup(client: Client, worker: int) -> None:
+        pass
+
+    def login_as_someone(client: Client, worker: int) -> None:
+        client.login(worker % max(1, users), manifest)
+
+    def products(rng, i):
+        return 'GET', '/api/products' + ('?' + PRODUCT_QUERIES[i % len(PRODUCT_QUERIES)]
+                                         if PRODUCT_QUERIES[i % len(PRODUCT_QUERIES)] else ''), None
+
+    def chatbot_ask(rng, i):
+        return 'POST', '/api/chatbot/ask', {'message': rng.choice(messages)}
+
+    def login(rng, i):
+        return 'POST', '/api/login', {'email': user_email(rng.randrange(users)), 'password': manifest['password']}
+
+    def process_payment(rng, i):
+        items = [{'id': rng.randint(1, manifest['counts']['products']), 'quantity': 1}]
+        return 'POST', '/api/process-payment', {'method': 'card', 'items': items}
+
+    def orders(rng, i):
+        return 'GET', '/api/orders?limit=20', None
+
+    def subscribe(rng, i):
+        # Mostly new addresses (append path) with some existing ones (duplicate check)
+        if rng.random() < 0.2 and manifest['counts']['subscribers']:
+            email = f"subscriber{rng.randrange(manifest['counts']['subscribers'])}@bench.lunara.test"
+        else:
+            email = f"new{run_id}-{i}-{rng.getrandbits(32)}@bench.lunara.test"
+        return 'POST', '/api/subscribe', {'email': email}
+
+    return {
+        'products': (no_setup, products),
+        'chatbot_ask': (no_setup, chatbot_ask),
+        'login': (no_setup, login),
+        'process_payment': (login_as_someone, process_payment),
+        'orders': (login_as_someone, orders),
+        'subscribe': (no_setup, subscribe),
+    }
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_scenario(make_client: Callable[[], Client], scenario: Scenario, requests: int,
+                 concurrency: int, warmup: int, seed: int) -> Dict[str, Any]:
+    setup, build = scenario
+    clients = [make_client() for _ in range(concurrency)]
+    for worker, client in enumerate(clients):
+        setup(client, worker)
+        rng = random.Random(f"{seed}:warmup:{worker}")
+        for i in range(warmup // concurrency):
+            client.request(*build(rng, i))
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker_loop(worker: int) -> None:
+        client = clients[worker]
+        rng = random.Random(f"{seed}:run:{worker}")
+        local: List[float] = []
+        local_status: Dict[str, int] = {}
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            method, path, body = build(rng, i)
+            started = time.perf_counter()
+            try:
+                status = client.request(method, path, body)
+            except Exception as e:  # connection errors in HTTP mode
+                logger.debug("request failed: %s", e)
+                status = 0
+            local.append(time.perf_counter() - started)
+            local_status[str(status)] = local_status.get(str(status), 0) + 1
+        with lock:
+            latencies.extend(local)
+            for code, n in local_status.items():
+                statuses[code] = statuses.get(code, 0) + n
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker_loop, args=(w,)) for w in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [v * 1000 for v in latencies]
+    errors = sum(n for code, n in statuses.items() if not code.startswith(('2', '3')))
+    return {
+        'requests': len(ms),
+        'concurrency': concurrency,
+        'errors': errors,
+        'statuses': statuses,
+        'elapsed_s': round(elapsed, 4),
+        'throughput_rps': round(len(ms) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(ms) / len(ms), 3) if ms else 0.0,
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'max_ms': round(ms[-1], 3) if ms else 0.0,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=Path(__file__).resolve().parents[1], timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _make_app(data_dir: Path, bcrypt_rounds: int):
+    from lunara_app import create_app
+    from lunara_app.config import Config
+    logging.getLogger('lunara_app').setLevel(logging.WARNING)
+    # Every request comes from one address, so per-client rate limits would only measure 429s
+    return create_app(Config(DATA_DIR=str(data_dir), BCRYPT_ROUNDS=bcrypt_rounds, RATE_LIMIT_ENABLED=False))
+
+
+def print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    header = f"{'endpoint':<16}{'reqs':>7}{'err':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        print(f"{name:<16}{r['requests']:>7}{r['errors']:>6}{r['throughput_rps']:>10.1f}"
+              f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Lunara /api endpoints.")
+    parser.add_argument('--data', required=True, help="data directory created by benchmarks.datagen")
+    parser.add_argument('--url', help="benchmark a running server over HTTP instead of the test client")
+    parser.add_argument('--endpoints', help="comma-separated subset of scenarios to run")
+    parser.add_argument('--requests', type=int, default=500, help="timed requests per endpoint")
+    parser.add_argument('--warmup', type=int, default=50, help="untimed requests per endpoint")
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--in-place', action='store_true',
+                        help="test-client mode: write to --data directly instead of a scratch copy")
+    parser.add_argument('--output', help="result file (default: benchmarks/results/<time>-<commit>.json)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    data_dir = Path(args.data)
+    manifest = load_manifest(data_dir)
+    available = scenarios(manifest)
+    selected = args.endpoints.split(',') if args.endpoints else list(available)
+    unknown = [name for name in selected if name not in available]
+    if unknown:
+        parser.error(f"unknown endpoint(s) {', '.join(unknown)}; choose from {', '.join(available)}")
+
+    scratch = None
+    if args.url:
+        make_client: Callable[[], Client] = lambda: HttpClient(args.url)  # noqa: E731
+    else:
+        if not args.in_place:
+            scratch = tempfile.mkdtemp(prefix='lunara-bench-')
+            shutil.copytree(data_dir, scratch, dirs_exist_ok=True)
+            data_dir = Path(scratch)
+        started = time.perf_counter()
+        app = _make_app(data_dir, manifest['bcrypt_rounds'])
+        logger.info("App created in %.2fs", time.perf_counter() - started)
+        make_client = lambda: TestClient(app)  # noqa: E731
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for name in selected:
+            logger.info("Running %s (%d requests, concurrency %d)", name, args.requests, args.concurrency)
+            results[name] = run_scenario(make_client, available[name], args.requests,
+                                         max(1, args.concurrency), args.warmup, args.seed)
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'mode': 'http' if args.url else 'test_client',
+            'url': args.url,
+            'data': str(Path(args.data).resolve()),
+            'counts': manifest['counts'],
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'endpoints': results,
+    }
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{report['meta']['commit'] or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print_table(results)
+    print(f"\nResults written to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -38,8 +38,9 @@ def create_app(config: Optional[Config] = None) -> Flask:
 
     - Applies configuration
     - Initializes CORS
+    - Installs request metrics hooks and rate limits
     - Ensures data directory exists
-    - Initializes DB (if configured/available)
+    - Initializes DB lazily in the background (if configured/available)
     - Registers blueprints
     """
     _setup_logging()
@@ -50,6 +51,12 @@ def create_app(config: Optional[Config] = None) -> Flask:
     # Config
     app.config.from_object(config or Config())
 
+    # Client address and scheme as seen by the trusted proxies in front (rate limits key on it)
+    proxy_hops = int(app.config.get("TRUSTED_PROXY_HOPS", 0) or 0)
+    if proxy_hops > 0:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
+
     # Security: secret key via env with fallback for dev
     app.secret_key = app.config.get("SECRET_KEY")
 
@@ -57,18 +64,32 @@ def create_app(config: Optional[Config] = None) -> Flask:
     cors_origins = app.config.get("CORS_ORIGINS")
     CORS(app, resources={r"/api/*": {"origins": cors_origins or "*"}})
 
+    # Per-endpoint latency/count metrics (served at /api/metrics)
+    from .services import metrics
+    metrics.init_app(app)
+
+    # Token-bucket limits on the expensive endpoints (429 + Retry-After)
+    from .services import ratelimit
+    ratelimit.init_app(app)
+
     # Ensure data dir exists
     data_dir = Path(app.config.get("DATA_DIR", "data"))
     data_dir.mkdir(parents=True, exist_ok=True)
 
-    # Initialize DB and seed FAQs if possible
+    # Prepare the JSON fallback now; MySQL is set up (and watched) by a background probe
     try:
         from .services.db import init_db
         from .services.faq_service import FAQ_SEED
-        init_db(FAQ_SEED, app.config)
+        init_db(FAQ_SEED, app.config, background=True)
     except Exception as e:
         logging.getLogger(__name__).info("DB init skipped or failed: %s", e)
 
+    # Template helpers for fingerprinted static bundles and responsive images
+    from .services.assets import asset_url
+    from .services.images import image_srcset
+    app.add_template_global(asset_url)
+    app.add_template_global(image_srcset)
+
     # Blueprints
     from .blueprints.main import bp as main_bp
     from .blueprints.products import bp as products_bp
@@ -76,12 +97,18 @@ def create_app(config: Optional[Config] = None) -> Flask:
     from .blueprints.payments import bp as payments_bp
     from .blueprints.chatbot import bp as chatbot_bp
     from .blueprints.newsletter import bp as newsletter_bp
+    from .blueprints.assets import bp as assets_bp
+    from .blueprints.metrics import bp as metrics_bp
+    from .blueprints.support import bp as support_bp
 
     app.register_blueprint(main_bp)
+    app.register_blueprint(assets_bp)
     app.register_blueprint(products_bp, url_prefix="/api")
     app.register_blueprint(auth_bp, url_prefix="/api")
     app.register_blueprint(payments_bp, url_prefix="/api")
     app.register_blueprint(chatbot_bp, url_prefix="/api")
     app.register_blueprint(newsletter_bp, url_prefix="/api")
+    app.register_blueprint(metrics_bp, url_prefix="/api")
+    app.register_blueprint(support_bp, url_prefix="/api")
 
     return app
@@ -0,0 +1,40 @@
+from __future__ import annotations
+import mimetypes
+from flask import Blueprint, abort, current_app, request, send_from_directory
+from ..services.assets import dist_path
+from ..services.images import derived_path
+
+bp = Blueprint('assets', __name__)
+
+# Precompressed variants written by tools/build_assets.py, best first
+_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+@bp.get('/assets/<path:filename>')
+def serve_asset(filename: str):
+    """Serve a fingerprinted asset, picking a precompressed variant by Accept-Encoding."""
+    directory = dist_path(current_app.static_folder)
+    if filename.endswith(('.br', '.gz')):
+        abort(404)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    encoding = None
+    for name, suffix in _ENCODINGS:
+        if request.accept_encodings[name] and (directory / (filename + suffix)).is_file():
+            encoding, filename = name, filename + suffix
+            break
+
+    resp = send_from_directory(directory, filename, mimetype=mimetype, max_age=31536000, etag=True)
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    resp.headers['Vary'] = 'Accept-Encoding'
+    resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return resp
+
+
+@bp.get('/img/<path:filename>')
+def serve_image(filename: str):
+    """Serve a responsive image derivative; names embed the source hash, so they never change."""
+    resp = send_from_directory(derived_path(current_app.static_folder), filename, max_age=31536000, etag=True)
+    resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return resp
@@ -3,19 +3,26 @@ from dataclasses import asdict
 from datetime import datetime
 import uuid
 from flask import Blueprint, jsonify, request, session, current_app
-from ..services.db import load_json, save_json
+from ..services.passwords import PasswordQueueFull, get_hasher
+from ..services.users import create_user, find_user_by_email, find_user_by_id, update_user
 
 bp = Blueprint('auth', __name__)
 
 
 def hash_password(password: str) -> str:
-    import bcrypt
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return get_hasher(current_app.config).hash(password)
 
 
 def check_password(password: str, hashed: str) -> bool:
-    import bcrypt
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    return get_hasher(current_app.config).verify(password, hashed)
+
+
+@bp.errorhandler(PasswordQueueFull)
+def password_queue_full(e: PasswordQueueFull):
+    resp = jsonify({'success': False, 'message': 'We are experiencing high demand. Please try again shortly.'})
+    resp.status_code = 503
+    resp.headers['Retry-After'] = str(e.retry_after)
+    return resp
 
 
 @bp.post('/register')
@@ -30,10 +37,7 @@ def register():
     if len(password) < 6:
         return jsonify({'success': False, 'message': 'Password must be at least 6 characters'})
 
-    data_dir = current_app.config.get('DATA_DIR', 'data')
-    users = load_json(data_dir, 'users.json', [])
-
-    if any(u.get('email') == email for u in users):
+    if find_user_by_email(current_app.config, email):
         return jsonify({'success': False, 'message': 'Email already registered'})
 
     user = {
@@ -43,8 +47,8 @@ def register():
         'password': hash_password(password),
         'created_at': datetime.now().isoformat()
     }
-    users.append(user)
-    save_json(data_dir, 'users.json', users)
+    if create_user(current_app.config, user) is None:
+        return jsonify({'success': False, 'message': 'Email already registered'})
 
     session['user_id'] = user['id']
     return jsonify({'success': True, 'user': {'id': user['id'], 'name': user['name'], 'email': user['email']}})
@@ -56,11 +60,10 @@ def login():
     email = (data.get('email') or '').strip().lower()
     password = (data.get('password') or '')
 
-    data_dir = current_app.config.get('DATA_DIR', 'data')
-    users = load_json(data_dir, 'users.json', [])
-
-    user = next((u for u in users if u.get('email') == email), None)
-    if user and check_password(password, user.get('password', '')):
+    config = current_app.config
+    user = find_user_by_email(config, email)
+    if user and get_hasher(config).verify_and_maybe_rehash(
+            password, user.get('password', ''), lambda hashed: update_user(config, dict(user, password=hashed))):
         session['user_id'] = user['id']
         return jsonify({'success': True, 'user': {'id': user['id'], 'name': user['name'], 'email': user['email']}})
     return jsonify({'success': False, 'message': 'Invalid email or password'})
@@ -77,9 +80,7 @@ def current_user():
     if 'user_id' not in session:
         return jsonify({'success': False, 'message': 'Not logged in'})
 
-    data_dir = current_app.config.get('DATA_DIR', 'data')
-    users = load_json(data_dir, 'users.json', [])
-    user = next((u for u in users if u.get('id') == session['user_id']), None)
+    user = find_user_by_id(current_app.config, session['user_id'])
     if not user:
         return jsonify({'success': False, 'message': 'User not found'})
     return jsonify({'success': True, 'user': {'id': user['id'], 'name': user['name'], 'email': user['email']}})
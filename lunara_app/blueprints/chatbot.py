@@ -1,19 +1,36 @@
 from __future__ import annotations
-from flask import Blueprint, jsonify, request, session, current_app
-from ..services.faq_service import load_faqs, match_faq, detect_sentiment
-from ..services.db import save_ticket
+import hashlib
+from flask import Blueprint, Response, jsonify, request, session, current_app
+from ..services import metrics
+from ..services.cache import LRUCache
+from ..services.faq_service import MATCH_THRESHOLD, answer_message, load_faqs_versioned
+from ..services.tickets import enqueue_ticket
+from ..services.users import find_user_by_id
 
 bp = Blueprint('chatbot', __name__)
 
+# FAQ version -> (encoded /api/faqs body, etag)
+_FAQS_BODY = LRUCache(maxsize=8)
+metrics.register_collector(lambda: metrics.mapping_samples('lunara_faqs_body_cache', _FAQS_BODY.stats()))
+
 
 @bp.get('/faqs')
 def api_faqs():
-    faqs_list = load_faqs(current_app.config) or []
-    questions = [
-        {'question': f.get('question', ''), 'category': f.get('category', '')}
-        for f in faqs_list if f.get('question')
-    ]
-    return jsonify({'faqs': questions[:12]})
+    faqs_list, version = load_faqs_versioned(current_app.config)
+    cached = _FAQS_BODY.get(version)
+    if cached is None:
+        questions = [
+            {'question': f.get('question', ''), 'category': f.get('category', '')}
+            for f in faqs_list or [] if f.get('question')
+        ]
+        body = jsonify({'faqs': questions[:12]}).get_data()
+        cached = (body, hashlib.sha1(body).hexdigest())
+        _FAQS_BODY.set(version, cached)
+    body, etag = cached
+    resp = Response(status=304) if request.if_none_match.contains(etag) else Response(body, mimetype='application/json')
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
 
 
 @bp.post('/chatbot/ask')
@@ -25,10 +42,7 @@ def chatbot_ask():
 
     if 'user_id' in session:
         # Fetch user details only if provided and non-empty
-        from ..services.db import load_json
-        data_dir = current_app.config.get('DATA_DIR', 'data')
-        users = load_json(data_dir, 'users.json', [])
-        u = next((u for u in users if u.get('id') == session['user_id']), None)
+        u = find_user_by_id(current_app.config, session['user_id'])
         if u:
             user_name = user_name or u.get('name')
             user_email = user_email or u.get('email')
@@ -36,18 +50,15 @@ def chatbot_ask():
     if not message:
         return jsonify({'success': False, 'reply': "I didn't catch that. Could you type your question again?", 'matched': False})
 
-    sentiment = detect_sentiment(message)
-    faqs_list = load_faqs(current_app.config)
-    best_match, score = match_faq(message, faqs_list)
+    best_match, score, sentiment = answer_message(current_app.config, message)
 
-    threshold = 0.67
     ticket_id = None
 
-    if best_match and score >= threshold:
+    if best_match and score >= MATCH_THRESHOLD:
         reply = best_match.get('answer', "Here's what I found.")
         matched = True
         if sentiment == 'negative':
-            ticket_id = save_ticket(current_app.config, user_name or None, user_email or None, message, sentiment, status='open', source='chat-escalated')
+            ticket_id = enqueue_ticket(current_app.config, user_name or None, user_email or None, message, sentiment, status='open', source='chat-escalated')
             reply += f"\n\nI've also flagged this to our support team to assist you further. Your ticket ID is {ticket_id}."
     else:
         matched = False
@@ -55,7 +66,7 @@ def chatbot_ask():
             "I'm here to help! I couldn't find an exact answer to that. "
             "I've logged this for our support team and they'll follow up soon."
         )
-        ticket_id = save_ticket(current_app.config, user_name or None, user_email or None, message, sentiment, status='open', source='chat-unmatched')
+        ticket_id = enqueue_ticket(current_app.config, user_name or None, user_email or None, message, sentiment, status='open', source='chat-unmatched')
         reply += f" Your ticket ID is {ticket_id}."
 
     return jsonify({'success': True, 'reply': reply, 'matched': matched, 'ticket_id': ticket_id, 'sentiment': sentiment})
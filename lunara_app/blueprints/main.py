@@ -1,9 +1,64 @@
 from __future__ import annotations
-from flask import Blueprint, render_template
+import gzip
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Tuple
+
+from flask import Blueprint, Response, current_app, render_template_string, request
+from ..services.assets import manifest_version
+from ..services.catalog import CatalogQuery
+from ..services.images import load_image_manifest
+from .products import encoded_products
 
 bp = Blueprint('main', __name__)
 
+INDEX_TEMPLATE = 'index.html'
+
+# data_dir -> (version, html, gzipped html, etag)
+_PAGES: Dict[str, Tuple[tuple, bytes, bytes, str]] = {}
+_PAGES_LOCK = threading.Lock()
+
+
+def _rendered_index(data_dir: str) -> Tuple[bytes, bytes, str]:
+    """index.html with the default product list inlined, rendered once per catalog/template/asset version."""
+    products_body, products_etag, _ = encoded_products(data_dir, CatalogQuery())
+    path = Path(current_app.root_path) / current_app.template_folder / INDEX_TEMPLATE
+    st = path.stat()
+    version = ((st.st_mtime_ns, st.st_size), products_etag, manifest_version(current_app.static_folder),
+               load_image_manifest(current_app.static_folder)[0])
+    with _PAGES_LOCK:
+        cached = _PAGES.get(data_dir)
+    if cached and cached[0] == version:
+        return cached[1], cached[2], cached[3]
+
+    # Rendered from the file itself: Jinja's template cache is not reloaded outside debug mode.
+    # '<' only occurs inside JSON strings, where < is equivalent and cannot close the script tag
+    inline = products_body.decode('utf-8').replace('<', '\\u003c')
+    html = render_template_string(path.read_text(encoding='utf-8'), initial_products=inline).encode('utf-8')
+    compressed = gzip.compress(html, compresslevel=9, mtime=0)
+    etag = hashlib.sha1(html).hexdigest()
+    with _PAGES_LOCK:
+        _PAGES[data_dir] = (version, html, compressed, etag)
+    return html, compressed, etag
+
 
 @bp.route('/')
 def index():
-    return render_template('index.html')
+    """Storefront page; served pre-rendered (and pre-gzipped) until products or the template change."""
+    html, compressed, etag = _rendered_index(current_app.config.get('DATA_DIR', 'data'))
+    if request.if_none_match.contains(etag) or request.if_none_match.contains(etag + '-gz'):
+        resp = Response(status=304)
+        gzipped = bool(request.accept_encodings['gzip'])
+    elif request.accept_encodings['gzip']:
+        resp = Response(compressed, mimetype='text/html')
+        resp.headers['Content-Encoding'] = 'gzip'
+        gzipped = True
+    else:
+        resp = Response(html, mimetype='text/html')
+        gzipped = False
+    # Each encoding is a different representation, so it gets its own tag
+    resp.set_etag(etag + '-gz' if gzipped else etag)
+    resp.headers['Vary'] = 'Accept-Encoding'
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
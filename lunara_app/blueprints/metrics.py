@@ -0,0 +1,13 @@
+from __future__ import annotations
+from flask import Blueprint, Response
+from ..services import metrics
+from ..services.admin import admin_required
+
+bp = Blueprint('metrics', __name__)
+
+
+@bp.get('/metrics')
+@admin_required
+def prometheus_metrics():
+    """Request, storage and pool metrics of this process in Prometheus text format (ADMIN_TOKEN bearer)."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
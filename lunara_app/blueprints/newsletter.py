@@ -1,26 +1,63 @@
 from __future__ import annotations
-from flask import Blueprint, jsonify, request, current_app
-from ..services.db import load_json, save_json
+from datetime import datetime
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
+from ..services.admin import admin_required
+from ..services.subscribers import (
+    add_subscriber, decode_lines, export_csv, export_ndjson, import_subscribers, normalize_email,
+)
 
 bp = Blueprint('newsletter', __name__)
 
+_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
 
 @bp.post('/subscribe')
 def subscribe():
     data = request.get_json() or {}
-    email = (data.get('email') or '').strip().lower()
+    email = normalize_email(data.get('email'))
 
-    if not email or '@' not in email:
+    if not email:
         return jsonify({'success': False, 'message': 'Invalid email address'})
 
-    data_dir = current_app.config.get('DATA_DIR', 'data')
-    subscribers = load_json(data_dir, 'subscribers.json', [])
-
-    if email in subscribers:
+    record, created = add_subscriber(current_app.config, email)
+    if not created:
         return jsonify({'success': False, 'message': 'Email already subscribed'})
 
-    subscribers.append(email)
-    save_json(data_dir, 'subscribers.json', subscribers)
-
-    discount_code = f"LUNARA10-{email.split('@')[0][:3].upper()}"
-    return jsonify({'success': True, 'discount_code': discount_code})
+    return jsonify({'success': True, 'discount_code': record['discount_code']})
+
+
+def _requested_format(default: str = 'csv') -> str:
+    fmt = (request.args.get('format') or '').lower()
+    if not fmt:
+        mimetype = request.mimetype or ''
+        fmt = next((name for name, mime in _FORMATS.items() if mime == mimetype), default)
+    return fmt
+
+
+@bp.get('/subscribers/export')
+@admin_required
+def export_subscribers():
+    """Stream all subscribers as CSV (default) or NDJSON (?format=ndjson)."""
+    fmt = _requested_format()
+    if fmt not in _FORMATS:
+        return jsonify({'success': False, 'message': 'format must be csv or ndjson'}), 400
+    body = export_ndjson(current_app.config) if fmt == 'ndjson' else export_csv(current_app.config)
+    resp = Response(stream_with_context(body), mimetype=_FORMATS[fmt])
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    resp.headers['Content-Disposition'] = f'attachment; filename="subscribers-{stamp}.{fmt}"'
+    return resp
+
+
+@bp.post('/subscribers/import')
+@admin_required
+def import_subscribers_endpoint():
+    """Add subscribers from a CSV or NDJSON request body (by Content-Type or ?format=), read as a stream."""
+    fmt = _requested_format()
+    if fmt not in _FORMATS:
+        return jsonify({'success': False, 'message': 'format must be csv or ndjson'}), 400
+    chunks = iter(lambda: request.stream.read(64 * 1024), b'')
+    try:
+        counts = import_subscribers(current_app.config, decode_lines(chunks), fmt=fmt)
+    except (UnicodeDecodeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Could not parse upload: {e}'}), 400
+    return jsonify({'success': True, **counts})
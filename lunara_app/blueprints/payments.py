@@ -2,62 +2,124 @@ from __future__ import annotations
 from datetime import datetime
 import uuid
 from flask import Blueprint, jsonify, request, session, current_app
-from ..services.db import load_json, save_json
+from ..services.idempotency import idempotent
+from ..services.inventory import OutOfStock, get_inventory
+from ..services.orders import UnknownProduct, expand_order, get_price_index, orders_store, price_items
+from ..services.pagination import InvalidCursor, decode_cursor, encode_cursor, parse_limit
 
 bp = Blueprint('payments', __name__)
 
 
 @bp.post('/process-payment')
+@idempotent
 def process_payment():
+    """Place and pay for an order; send an Idempotency-Key header to make retries safe."""
     data = request.get_json() or {}
     user_id = session.get('user_id', 'guest')
 
     method = data.get('method')
-    amount = float(data.get('amount') or 0)
     items = data.get('items') or []
+    if not items:
+        return jsonify({'success': False, 'message': 'Invalid order details'})
+    try:
+        quantities = _quantities(items)
+        amount = float(data['amount']) if data.get('amount') is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({'success': False, 'message': 'Invalid order details'})
 
-    if amount <= 0 or not items:
+    # Priced from the catalog; the client's amount is only checked against it
+    index = get_price_index(current_app.config.get('DATA_DIR', 'data'))
+    try:
+        lines, total = price_items(quantities, index)
+    except UnknownProduct:
         return jsonify({'success': False, 'message': 'Invalid order details'})
+    if amount is not None and abs(amount - total) > 0.005:
+        return jsonify({'success': False, 'price_changed': True, 'total': total,
+                        'message': f'Prices have changed since these items were added; the total is now {total}.'})
+
+    # Hold the stock for the duration of the payment; released again if it fails
+    inventory = get_inventory(current_app.config)
+    try:
+        reservation = inventory.reserve(quantities)
+    except OutOfStock as e:
+        name = (index.product(e.product_id) or {}).get('name') or 'this item'
+        message = f"Sorry, {name} is sold out." if e.available <= 0 else \
+            f"Sorry, only {e.available} of {name} left in stock."
+        return jsonify({'success': False, 'out_of_stock': True, 'product_id': e.product_id, 'message': message})
 
-    # Mock processing (90% success)
-    import random
-    if random.random() >= 0.1:
-        order_id = str(uuid.uuid4())
-        order = {
-            'id': order_id,
-            'user_id': user_id,
-            'items': items,
-            'total': amount,
-            'status': 'confirmed',
-            'payment_method': method,
-            'created_at': datetime.now().isoformat()
-        }
-        data_dir = current_app.config.get('DATA_DIR', 'data')
-        orders = load_json(data_dir, 'orders.json', [])
-        orders.append(order)
-        save_json(data_dir, 'orders.json', orders)
+    paid = False
+    try:
+        # Mock processing (90% success)
+        import random
+        if random.random() >= 0.1:
+            order_id = str(uuid.uuid4())
+            order = {
+                'id': order_id,
+                'user_id': user_id,
+                'items': lines,
+                'total': total,
+                'status': 'confirmed',
+                'payment_method': method,
+                'created_at': datetime.now().isoformat()
+            }
+            orders_store(current_app.config).append(order)
+            paid = True
+    finally:
+        if paid:
+            inventory.commit(reservation.id)
+        else:
+            inventory.release(reservation.id)
+    if paid:
         return jsonify({'success': True, 'orderId': order_id})
 
     return jsonify({'success': False, 'message': 'Payment declined. Please check your payment details.'})
 
 
+def _quantities(items) -> dict:
+    """{product id (as a string): total quantity} for the cart; raises ValueError on bad items."""
+    quantities: dict = {}
+    for item in items:
+        product_id = item.get('id')
+        quantity = int(item.get('quantity') or 1)
+        if product_id is None or quantity <= 0:
+            raise ValueError("invalid item")
+        quantities[str(product_id)] = quantities.get(str(product_id), 0) + quantity
+    return quantities
+
+
 @bp.get('/order/<order_id>')
 def get_order(order_id: str):
     if 'user_id' not in session:
         return jsonify({'success': False, 'message': 'Please log in to view your orders'})
-    data_dir = current_app.config.get('DATA_DIR', 'data')
-    orders = load_json(data_dir, 'orders.json', [])
-    order = next((o for o in orders if o.get('id') == order_id and o.get('user_id') == session['user_id']), None)
-    if order:
-        return jsonify({'success': True, 'order': order})
+    order = orders_store(current_app.config).get(order_id)
+    if order and order.get('user_id') == session['user_id']:
+        index = get_price_index(current_app.config.get('DATA_DIR', 'data'))
+        return jsonify({'success': True, 'order': expand_order(order, index)})
     return jsonify({'success': False, 'message': 'Order not found'})
 
 
 @bp.get('/orders')
 def get_orders():
+    """Newest-first page of the user's orders: ?limit=N&cursor=<next_cursor>."""
     if 'user_id' not in session:
         return jsonify({'success': False, 'message': 'Please log in to view your orders'})
-    data_dir = current_app.config.get('DATA_DIR', 'data')
-    orders = load_json(data_dir, 'orders.json', [])
-    user_orders = [o for o in orders if o.get('user_id') == session['user_id']]
-    return jsonify({'success': True, 'orders': user_orders})
+    limit = parse_limit(request.args.get('limit'))
+    try:
+        cursor = decode_cursor(request.args.get('cursor'))
+        end = int(cursor['before']) if cursor else None
+    except (InvalidCursor, KeyError, TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+
+    store = orders_store(current_app.config)
+    _, total = store.lookup_range('user_id', session['user_id'], 0, 0)
+    if end is None:
+        end = total
+    elif not 0 <= end <= total:
+        return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+    start = max(0, end - limit)
+    page, _ = store.lookup_range('user_id', session['user_id'], start, end)
+    page.reverse()
+    index = get_price_index(current_app.config.get('DATA_DIR', 'data'))
+    page = [expand_order(order, index) for order in page]
+    next_cursor = encode_cursor({'before': start}) if start > 0 else None
+    return jsonify({'success': True, 'orders': page, 'next_cursor': next_cursor})
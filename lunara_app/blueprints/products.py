@@ -1,16 +1,92 @@
 from __future__ import annotations
-from flask import Blueprint, jsonify, request, current_app
-from ..services.db import load_json
+import hashlib
+import math
+from flask import Blueprint, Response, jsonify, request, current_app
+from ..services import metrics
+from ..services.cache import LRUCache
+from ..services.catalog import SORTS, CatalogQuery, get_catalog
+from ..services.images import load_image_manifest, with_srcsets
 
 bp = Blueprint('products', __name__)
 
+# (data_dir, query) -> ((catalog version, image manifest version), encoded body, etag, total)
+_BODY_CACHE = LRUCache(maxsize=512)
+metrics.register_collector(lambda: metrics.mapping_samples('lunara_products_body_cache', _BODY_CACHE.stats()))
+
+_TRUE = {'1', 'true', 'yes', 'on'}
+MAX_LIMIT = 100  # per page when limit is given; without it the whole (filtered) catalog is returned
+
+
+def _parse_query(args) -> CatalogQuery:
+    """Build a CatalogQuery from request args; raises ValueError on bad input."""
+    def number(name):
+        value = args.get(name)
+        if value in (None, ''):
+            return None
+        value = float(value)
+        if not math.isfinite(value):
+            raise ValueError(f"{name} must be a finite number")
+        return value
+
+    sort = args.get('sort') or None
+    if sort is not None and sort not in SORTS:
+        raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+    limit = args.get('limit')
+    limit = int(limit) if limit not in (None, '') else None
+    offset = int(args.get('offset') or 0)
+    if (limit is not None and limit < 0) or offset < 0:
+        raise ValueError("limit and offset must be non-negative")
+    if limit is not None:
+        limit = min(limit, MAX_LIMIT)
+    return CatalogQuery(
+        category=args.get('category', 'all'),
+        min_price=number('min_price'),
+        max_price=number('max_price'),
+        min_rating=number('min_rating'),
+        on_sale=(args.get('on_sale') or '').lower() in _TRUE,
+        in_stock=(args.get('in_stock') or '').lower() in _TRUE,
+        sort=sort,
+        limit=limit,
+        offset=offset,
+    )
+
+
+def encoded_products(data_dir: str, query: CatalogQuery):
+    """(JSON body, etag, total) for ``query``, cached per catalog and image manifest version."""
+    catalog, catalog_version = get_catalog(data_dir)
+    images_version, images = load_image_manifest(current_app.static_folder)
+    version = (catalog_version, images_version)
+    cache_key = (data_dir, query)
+    cached = _BODY_CACHE.get(cache_key)
+    if cached and cached[0] == version:
+        return cached[1], cached[2], cached[3]
+
+    payload, total = catalog.query(query)
+    body = jsonify(with_srcsets(payload, images)).get_data()
+    etag = hashlib.sha1(body).hexdigest()
+    _BODY_CACHE.set(cache_key, (version, body, etag, total))
+    return body, etag, total
+
 
 @bp.get('/products')
 def get_products():
-    category = request.args.get('category', 'all')
+    """Product list, optionally filtered/sorted/paginated.
+
+    Query args: category, min_price, max_price, min_rating, on_sale, in_stock,
+    sort (price_asc|price_desc|rating|reviews), limit, offset. The body stays a
+    JSON array; the match count before limit/offset is sent as X-Total-Count.
+    """
+    try:
+        query = _parse_query(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid query: {e}'}), 400
     data_dir = current_app.config.get('DATA_DIR', 'data')
-    products = load_json(data_dir, 'products.json', [])
-    if category == 'all':
-        return jsonify(products)
-    filtered = [p for p in products if p.get('category') == category]
-    return jsonify(filtered)
+    body, etag, total = encoded_products(data_dir, query)
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype='application/json')
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Total-Count'] = str(total)
+    return resp
@@ -0,0 +1,48 @@
+from __future__ import annotations
+from datetime import datetime
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from ..services.admin import admin_required
+from ..services.pagination import InvalidCursor, decode_cursor, encode_cursor, parse_limit
+from ..services.ticket_query import TicketQuery, export_ndjson, query_tickets
+
+bp = Blueprint('support', __name__)
+
+
+def _ticket_query():
+    try:
+        return TicketQuery.from_args(request.args), None
+    except ValueError as e:
+        return None, (jsonify({'success': False, 'message': str(e)}), 400)
+
+
+@bp.get('/support/tickets')
+@admin_required
+def list_tickets():
+    """Newest-first page of tickets filtered by status/source/sentiment (comma lists) and since/until:
+    ?status=open&sentiment=negative&since=2025-01-01&limit=N&cursor=<next_cursor>."""
+    query, error = _ticket_query()
+    if error:
+        return error
+    limit = parse_limit(request.args.get('limit'), default=50, maximum=500)
+    try:
+        cursor = decode_cursor(request.args.get('cursor'))
+        before = int(cursor['before']) if cursor else None
+    except (InvalidCursor, KeyError, TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+
+    page, next_before = query_tickets(current_app.config, query, limit=limit, before=before)
+    next_cursor = encode_cursor({'before': next_before}) if next_before is not None else None
+    return jsonify({'success': True, 'tickets': page, 'next_cursor': next_cursor})
+
+
+@bp.get('/support/tickets/export')
+@admin_required
+def export_tickets():
+    """Stream every matching ticket as NDJSON (same filters as /support/tickets, no pagination)."""
+    query, error = _ticket_query()
+    if error:
+        return error
+    resp = Response(stream_with_context(export_ndjson(current_app.config, query)), mimetype='application/x-ndjson')
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    resp.headers['Content-Disposition'] = f'attachment; filename="support-tickets-{stamp}.ndjson"'
+    return resp
@@ -14,6 +14,13 @@ class Config:
     # Data directory for JSON fallbacks/local storage
     DATA_DIR: str = os.environ.get("DATA_DIR", "data")
 
+    # Record storage for orders/tickets: "journal" (append-only JSONL + snapshots)
+    # or "json" (rewrite the whole file on every write)
+    STORAGE_MODE: str = os.environ.get("STORAGE_MODE", "journal")
+    JOURNAL_FSYNC_EVERY: int = int(os.environ.get("JOURNAL_FSYNC_EVERY", "16"))
+    JOURNAL_FSYNC_INTERVAL: float = float(os.environ.get("JOURNAL_FSYNC_INTERVAL", "1.0"))
+    JOURNAL_COMPACT_EVERY: int = int(os.environ.get("JOURNAL_COMPACT_EVERY", "1000"))
+
     # MySQL configuration (optional)
     MYSQL_HOST: str = os.environ.get("MYSQL_HOST", "localhost")
     MYSQL_USER: str = os.environ.get("MYSQL_USER", "root")
@@ -21,6 +28,90 @@ class Config:
     MYSQL_DB: str = os.environ.get("MYSQL_DB", "lunara")
     MYSQL_PORT: int = int(os.environ.get("MYSQL_PORT", "3306"))
     MYSQL_AUTH_PLUGIN: str = os.environ.get("MYSQL_AUTH_PLUGIN", "mysql_native_password")
+    MYSQL_POOL_SIZE: int = int(os.environ.get("MYSQL_POOL_SIZE", "5"))
+    MYSQL_POOL_MAX_OVERFLOW: int = int(os.environ.get("MYSQL_POOL_MAX_OVERFLOW", "10"))
+    MYSQL_POOL_TIMEOUT: float = float(os.environ.get("MYSQL_POOL_TIMEOUT", "5.0"))
+    MYSQL_POOL_RECYCLE: int = int(os.environ.get("MYSQL_POOL_RECYCLE", "1800"))
+    MYSQL_POOL_PRE_PING: bool = os.environ.get("MYSQL_POOL_PRE_PING", "1") == "1"
+    # Outage handling: MYSQL_BREAKER_FAILURES consecutive errors open the circuit breaker
+    # (requests use JSON) for MYSQL_BREAKER_RESET seconds; a background probe retries
+    # every MYSQL_PROBE_INTERVAL seconds and switches back once the server answers
+    MYSQL_CONNECT_TIMEOUT: int = int(os.environ.get("MYSQL_CONNECT_TIMEOUT", "3"))
+    MYSQL_BREAKER_FAILURES: int = int(os.environ.get("MYSQL_BREAKER_FAILURES", "3"))
+    MYSQL_BREAKER_RESET: float = float(os.environ.get("MYSQL_BREAKER_RESET", "10"))
+    MYSQL_PROBE_INTERVAL: float = float(os.environ.get("MYSQL_PROBE_INTERVAL", "5"))
+
+    # Password hashing: bcrypt cost and the bounded worker pool that runs it
+    BCRYPT_ROUNDS: int = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+    PASSWORD_WORKERS: int = int(os.environ.get("PASSWORD_WORKERS", str(max(2, os.cpu_count() or 1))))
+    PASSWORD_QUEUE_LIMIT: int = int(os.environ.get("PASSWORD_QUEUE_LIMIT", "32"))
+
+    # Chatbot: answers cached per normalized message until the FAQ set changes
+    # (MySQL FAQs are re-checked with CHECKSUM TABLE every FAQ_VERSION_TTL seconds)
+    CHATBOT_CACHE_SIZE: int = int(os.environ.get("CHATBOT_CACHE_SIZE", "1024"))
+    CHATBOT_CACHE_TTL: float = float(os.environ.get("CHATBOT_CACHE_TTL", "300"))
+    FAQ_VERSION_TTL: float = float(os.environ.get("FAQ_VERSION_TTL", "5"))
+
+    # Support tickets: ids are reserved TICKET_ID_BLOCK at a time and tickets are
+    # written by a background batch writer (TICKET_WRITE_BEHIND=0 writes inline)
+    TICKET_WRITE_BEHIND: bool = os.environ.get("TICKET_WRITE_BEHIND", "1") == "1"
+    TICKET_QUEUE_SIZE: int = int(os.environ.get("TICKET_QUEUE_SIZE", "1000"))
+    TICKET_BATCH_SIZE: int = int(os.environ.get("TICKET_BATCH_SIZE", "100"))
+    TICKET_FLUSH_LINGER: float = float(os.environ.get("TICKET_FLUSH_LINGER", "0.05"))
+    TICKET_ID_BLOCK: int = int(os.environ.get("TICKET_ID_BLOCK", "16"))
+
+    # Inventory: checkouts reserve stock from in-memory counters (INVENTORY_LOCK_STRIPES locks)
+    # leased INVENTORY_LEASE units at a time from data/inventory.json; unpaid reservations
+    # expire after INVENTORY_RESERVATION_TTL seconds and stock levels are written back to
+    # products.json every INVENTORY_FLUSH_INTERVAL seconds
+    INVENTORY_LOCK_STRIPES: int = int(os.environ.get("INVENTORY_LOCK_STRIPES", "64"))
+    INVENTORY_LEASE: int = int(os.environ.get("INVENTORY_LEASE", "10"))
+    INVENTORY_RESERVATION_TTL: float = float(os.environ.get("INVENTORY_RESERVATION_TTL", "900"))
+    INVENTORY_FLUSH_INTERVAL: float = float(os.environ.get("INVENTORY_FLUSH_INTERVAL", "1.0"))
+
+    # Idempotency-Key: responses are replayed for IDEMPOTENCY_TTL seconds from an in-memory
+    # cache (IDEMPOTENCY_CACHE_SIZE entries) and, with IDEMPOTENCY_SHARED, from files under
+    # data/idempotency/ so every worker process sees them; duplicates of a request still
+    # running wait up to IDEMPOTENCY_WAIT seconds for its result
+    IDEMPOTENCY_TTL: float = float(os.environ.get("IDEMPOTENCY_TTL", "86400"))
+    IDEMPOTENCY_CACHE_SIZE: int = int(os.environ.get("IDEMPOTENCY_CACHE_SIZE", "10000"))
+    IDEMPOTENCY_SHARED: bool = os.environ.get("IDEMPOTENCY_SHARED", "1") == "1"
+    IDEMPOTENCY_WAIT: float = float(os.environ.get("IDEMPOTENCY_WAIT", "30"))
+
+    # Rate limits for the CPU-heavy endpoints: "<endpoint>=<requests>/<seconds>,..." token
+    # buckets per client IP and per logged-in user. Buckets are per process (at most
+    # RATE_LIMIT_MAX_KEYS, idle ones evicted first) unless RATE_LIMIT_REDIS_URL is set
+    RATE_LIMIT_ENABLED: bool = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+    RATE_LIMITS: str = os.environ.get(
+        "RATE_LIMITS",
+        "auth.login=10/60,auth.register=5/60,chatbot.chatbot_ask=30/60,newsletter.subscribe=5/60",
+    )
+    RATE_LIMIT_MAX_KEYS: int = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "100000"))
+    RATE_LIMIT_REDIS_URL: str = os.environ.get("RATE_LIMIT_REDIS_URL", "")
+    # Reverse proxies in front of the app whose X-Forwarded-For/-Proto headers are trusted
+    # (1 behind a single platform router or nginx); 0 uses the socket peer address, since
+    # without a proxy those headers are client-controlled
+    TRUSTED_PROXY_HOPS: int = int(os.environ.get("TRUSTED_PROXY_HOPS", "0"))
+
+    # Production server (python -m lunara_app.serve): worker processes forked from
+    # a preloaded master, each running WEB_THREADS request threads
+    WEB_HOST: str = os.environ.get("WEB_HOST", "0.0.0.0")
+    WEB_PORT: int = int(os.environ.get("PORT", "5000"))
+    WEB_WORKERS: int = int(os.environ.get("WEB_WORKERS", str(os.cpu_count() or 1)))
+    WEB_THREADS: int = int(os.environ.get("WEB_THREADS", "4"))
+    WEB_TIMEOUT: int = int(os.environ.get("WEB_TIMEOUT", "30"))
+    WEB_GRACEFUL_TIMEOUT: int = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", "30"))
+    WEB_KEEPALIVE: int = int(os.environ.get("WEB_KEEPALIVE", "5"))
+    WEB_MAX_REQUESTS: int = int(os.environ.get("WEB_MAX_REQUESTS", "0"))
+
+    # Instrumentation: log requests slower than METRICS_SLOW_REQUEST_MS (0 = off) and
+    # cProfile a METRICS_PROFILE_RATE fraction of requests into METRICS_PROFILE_DIR
+    METRICS_SLOW_REQUEST_MS: float = float(os.environ.get("METRICS_SLOW_REQUEST_MS", "0"))
+    METRICS_PROFILE_RATE: float = float(os.environ.get("METRICS_PROFILE_RATE", "0"))
+    METRICS_PROFILE_DIR: str = os.environ.get("METRICS_PROFILE_DIR", "profiles")
+
+    # Bearer token for operator endpoints (subscriber import/export); unset disables them
+    ADMIN_TOKEN: str | None = os.environ.get("ADMIN_TOKEN")
 
     # CORS
     CORS_ORIGINS: str | None = os.environ.get("CORS_ORIGINS")
@@ -0,0 +1,147 @@
+"""Production entry point: ``python -m lunara_app.serve``.
+
+Builds the app once in a master process, warms the product catalog, FAQ index
+and template caches, then forks ``WEB_WORKERS`` gunicorn workers running
+``WEB_THREADS`` threads each, so the warmed data is shared copy-on-write
+instead of being rebuilt per worker. Workers are supervised and restarted by
+the master:
+
+- ``kill -HUP <master>`` gracefully replaces the workers (in-flight requests finish)
+- ``kill -USR2 <master>`` then ``kill -TERM <old master>`` upgrades to new code
+  without dropping connections
+- ``kill -TERM <master>`` drains workers for up to ``WEB_GRACEFUL_TIMEOUT`` seconds
+
+gunicorn is POSIX only; elsewhere (or if it is not installed) the app falls
+back to waitress, and finally to the threaded development server.
+"""
+from __future__ import annotations
+import argparse
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from flask import Flask
+
+try:
+    from gunicorn.app.base import BaseApplication  # type: ignore
+    GUNICORN_AVAILABLE = True
+except Exception:  # pragma: no cover - optional dependency / Windows
+    BaseApplication = object  # type: ignore
+    GUNICORN_AVAILABLE = False
+
+from . import create_app
+from .config import Config
+
+logger = logging.getLogger("lunara_app.serve")
+
+
+def warm_up(app: Flask) -> None:
+    """Load products, FAQs and static manifests and render the hot endpoints once."""
+    from .services.assets import load_manifest
+    from .services.catalog import get_catalog
+    from .services.db import dispose_pools
+    from .services.faq_service import get_faq_index, load_faqs
+    from .services.images import load_image_manifest
+    from .services.tickets import get_ticket_writer
+
+    started = time.perf_counter()
+    with app.app_context():
+        catalog, _ = get_catalog(app.config.get('DATA_DIR', 'data'))
+        faqs = load_faqs(app.config) or []
+        get_faq_index(faqs)
+        load_manifest(app.static_folder)
+        load_image_manifest(app.static_folder)
+    client = app.test_client()
+    for path in ('/', '/api/products', '/api/faqs'):
+        status = client.get(path).status_code
+        if status != 200:
+            logger.warning("Warm-up request %s returned %s", path, status)
+    try:
+        get_ticket_writer(app.config).replay_parked()
+    except Exception as e:
+        logger.warning("Parked tickets could not be stored yet (%s); workers will retry", e)
+    # Connections opened while warming must not be shared by forked workers
+    dispose_pools()
+    logger.info("Warmed %d products and %d FAQs in %.0f ms",
+                len(catalog.by_id), len(faqs), (time.perf_counter() - started) * 1000)
+
+
+def gunicorn_options(config: Config, bind: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        'bind': bind or f"{config.WEB_HOST}:{config.WEB_PORT}",
+        'workers': max(1, config.WEB_WORKERS),
+        'threads': max(1, config.WEB_THREADS),
+        'worker_class': 'gthread',
+        'preload_app': True,
+        'timeout': config.WEB_TIMEOUT,
+        'graceful_timeout': config.WEB_GRACEFUL_TIMEOUT,
+        'keepalive': config.WEB_KEEPALIVE,
+        'max_requests': config.WEB_MAX_REQUESTS,
+        'max_requests_jitter': config.WEB_MAX_REQUESTS // 10,
+        'accesslog': '-',
+        'worker_exit': _worker_exit,
+    }
+
+
+def _worker_exit(server, worker) -> None:
+    # Persist tickets still waiting in the write-behind queue and hand leased stock
+    # back to the inventory ledger before the worker goes away
+    from .services.inventory import close_inventories
+    from .services.tickets import close_ticket_writers
+    close_ticket_writers()
+    close_inventories()
+
+
+class LunaraApplication(BaseApplication):  # type: ignore[misc, valid-type]
+    """gunicorn application that loads (and warms) the Flask app in the master."""
+
+    def __init__(self, app: Flask, options: Dict[str, Any]):
+        self.application = app
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self) -> Flask:
+        return self.application
+
+
+def _serve_fallback(app: Flask, config: Config, host: str, port: int) -> None:
+    threads = max(1, config.WEB_WORKERS) * max(1, config.WEB_THREADS)
+    try:
+        from waitress import serve  # type: ignore
+    except Exception:
+        logger.warning("Neither gunicorn nor waitress is installed; using the threaded development server")
+        app.run(host=host, port=port, threaded=True)
+        return
+    logger.info("gunicorn unavailable; serving with waitress (%d threads)", threads)
+    serve(app, host=host, port=port, threads=threads)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    config = Config()
+    parser = argparse.ArgumentParser(description="Run Lunara with a preforking production server.")
+    parser.add_argument('--host', default=config.WEB_HOST)
+    parser.add_argument('--port', type=int, default=config.WEB_PORT)
+    parser.add_argument('--workers', type=int, default=config.WEB_WORKERS)
+    parser.add_argument('--threads', type=int, default=config.WEB_THREADS)
+    args = parser.parse_args(argv)
+    config.WEB_HOST, config.WEB_PORT = args.host, args.port
+    config.WEB_WORKERS, config.WEB_THREADS = args.workers, args.threads
+
+    app = create_app(config)
+    warm_up(app)
+    if not GUNICORN_AVAILABLE:
+        _serve_fallback(app, config, args.host, args.port)
+        return 0
+    options = gunicorn_options(config)
+    logger.info("Starting %d worker(s) x %d thread(s) on %s", options['workers'], options['threads'], options['bind'])
+    LunaraApplication(app, options).run()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
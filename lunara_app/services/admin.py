@@ -0,0 +1,20 @@
+"""Guard for operator-only endpoints (bulk import/export and similar)."""
+from __future__ import annotations
+import hmac
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+
+def admin_required(view):
+    """Require ``Authorization: Bearer <ADMIN_TOKEN>``; the endpoints are disabled while ADMIN_TOKEN is unset."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get('ADMIN_TOKEN')
+        if not token:
+            return jsonify({'success': False, 'message': 'Admin API is disabled'}), 403
+        supplied = request.headers.get('Authorization', '')
+        if not supplied.startswith('Bearer ') or not hmac.compare_digest(supplied[7:].strip().encode(), token.encode()):
+            return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+        return view(*args, **kwargs)
+    return wrapper
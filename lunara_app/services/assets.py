@@ -0,0 +1,60 @@
+"""Fingerprinted static asset lookup.
+
+``python -m lunara_app.tools.build_assets`` writes minified, content-hashed
+copies of the site's JS/CSS (plus .gz/.br variants) to ``static/dist`` together
+with ``manifest.json`` mapping logical names to hashed paths. ``asset_url``
+resolves a logical name through that manifest and falls back to the plain
+static URL when no build has been run.
+"""
+from __future__ import annotations
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from flask import current_app, url_for
+
+DIST_DIR = 'dist'
+MANIFEST_FILE = 'manifest.json'
+
+_MANIFEST: Tuple[Optional[Tuple[int, int]], Dict[str, str]] = (None, {})
+_MANIFEST_LOCK = threading.Lock()
+
+
+def dist_path(static_folder: str) -> Path:
+    return Path(static_folder) / DIST_DIR
+
+
+def load_manifest(static_folder: str) -> Dict[str, str]:
+    """Manifest for ``static_folder``, re-read only when the file changes."""
+    global _MANIFEST
+    path = dist_path(static_folder) / MANIFEST_FILE
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return {}
+    version = (st.st_mtime_ns, st.st_size)
+    with _MANIFEST_LOCK:
+        if _MANIFEST[0] == version:
+            return _MANIFEST[1]
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    with _MANIFEST_LOCK:
+        _MANIFEST = (version, manifest)
+    return manifest
+
+
+def manifest_version(static_folder: str) -> Optional[Tuple[int, int]]:
+    load_manifest(static_folder)
+    return _MANIFEST[0]
+
+
+def asset_url(name: str) -> str:
+    """URL for a static asset, preferring its fingerprinted build output."""
+    hashed = load_manifest(current_app.static_folder).get(name)
+    if hashed:
+        return url_for('assets.serve_asset', filename=hashed)
+    return url_for('static', filename=name)
@@ -0,0 +1,86 @@
+"""Circuit breaker for calls to an unreliable backend (MySQL).
+
+closed    — calls go through; ``failure_threshold`` consecutive failures open it
+open      — calls are refused immediately (callers fall back) for ``reset_timeout`` seconds
+half_open — one trial call is let through; success closes the breaker, failure re-opens it
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import Any, Dict
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the backend while the breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 10.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {'opened': 0, 'rejected': 0, 'failures': 0, 'successes': 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now (reserves the single half-open trial)."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._stats['rejected'] += 1
+            return False
+
+    def check(self) -> None:
+        """Like ``allow`` but raises CircuitOpenError."""
+        if not self.allow():
+            raise CircuitOpenError("Circuit breaker is open")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._stats['successes'] += 1
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._stats['failures'] += 1
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._stats['opened'] += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def reset(self) -> None:
+        """Close the breaker, e.g. after an out-of-band health check succeeded."""
+        self.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._maybe_half_open()
+            return dict(self._stats, state=self._state, consecutive_failures=self._failures,
+                        open=int(self._state == OPEN), half_open=int(self._state == HALF_OPEN))
@@ -0,0 +1,61 @@
+"""Small in-process caches shared by the blueprints."""
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """Thread-safe, size-bounded least-recently-used mapping with hit/miss counters.
+
+    With ``ttl`` (seconds) entries also expire that long after being set.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = None):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl) if ttl else None
+        self._data: "OrderedDict[Hashable, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'size': len(self._data), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses,
+                    'ttl': self.ttl or 0}
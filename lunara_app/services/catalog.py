@@ -0,0 +1,149 @@
+"""Product catalog query engine.
+
+The catalog is built once per version of ``products.json``: products are grouped
+per category, and each scope ("all" plus every category) keeps product
+positions sorted by price, rating and review count. Price and rating ranges are
+resolved with bisect on those arrays, the narrower one drives the scan, and the
+remaining filters are applied to that slice only.
+"""
+from __future__ import annotations
+import threading
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .db import load_json_versioned
+
+PRODUCTS_JSON_FILE = 'products.json'
+
+SORTS = ('price_asc', 'price_desc', 'rating', 'reviews')
+
+
+def _num(value, default: float = 0.0) -> float:
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass(frozen=True)
+class CatalogQuery:
+    category: str = 'all'
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_rating: Optional[float] = None
+    on_sale: bool = False
+    in_stock: bool = False
+    sort: Optional[str] = None
+    limit: Optional[int] = None
+    offset: int = 0
+
+
+class _Scope:
+    """Sorted views over one set of product positions."""
+
+    def __init__(self, products: List[Dict[str, Any]], positions: List[int]):
+        self.positions = positions
+        by_price = sorted(positions, key=lambda i: _num(products[i].get('price')))
+        self.price_pos = by_price
+        self.price_keys = [_num(products[i].get('price')) for i in by_price]
+        by_rating = sorted(positions, key=lambda i: _num(products[i].get('rating')))
+        self.rating_pos = by_rating
+        self.rating_keys = [_num(products[i].get('rating')) for i in by_rating]
+        self.rating_desc = sorted(positions, key=lambda i: -_num(products[i].get('rating')))
+        self.reviews_desc = sorted(positions, key=lambda i: -_num(products[i].get('reviews')))
+
+
+class Catalog:
+    def __init__(self, products: List[Dict[str, Any]]):
+        self.products = products
+        self.by_id: Dict[Any, Dict[str, Any]] = {p.get('id'): p for p in products}
+        grouped: Dict[str, List[int]] = {}
+        for i, p in enumerate(products):
+            grouped.setdefault(p.get('category'), []).append(i)
+        self.scopes: Dict[str, _Scope] = {'all': _Scope(products, list(range(len(products))))}
+        for category, positions in grouped.items():
+            if category is not None and category != 'all':
+                self.scopes[category] = _Scope(products, positions)
+
+    def query(self, q: CatalogQuery) -> Tuple[List[Dict[str, Any]], int]:
+        """Return (page of products, total matches before limit/offset)."""
+        scope = self.scopes.get(q.category)
+        if scope is None:
+            return [], 0
+        products = self.products
+
+        candidates: List[int] = scope.positions
+        price_sorted = False
+        if q.min_price is not None or q.max_price is not None:
+            lo = bisect_left(scope.price_keys, q.min_price) if q.min_price is not None else 0
+            hi = bisect_right(scope.price_keys, q.max_price) if q.max_price is not None else len(scope.price_keys)
+            candidates = scope.price_pos[lo:hi]
+            price_sorted = True
+        if q.min_rating is not None:
+            lo = bisect_left(scope.rating_keys, q.min_rating)
+            if len(scope.rating_keys) - lo < len(candidates):
+                # Rating slice is narrower: drive from it and re-check the price bounds
+                candidates = scope.rating_pos[lo:]
+                price_sorted = False
+
+        def keep(i: int) -> bool:
+            p = products[i]
+            price = _num(p.get('price'))
+            if q.min_price is not None and price < q.min_price:
+                return False
+            if q.max_price is not None and price > q.max_price:
+                return False
+            if q.min_rating is not None and _num(p.get('rating')) < q.min_rating:
+                return False
+            if q.on_sale and not p.get('originalPrice'):
+                return False
+            if q.in_stock and _num(p.get('inventory')) <= 0:
+                return False
+            return True
+
+        if q.sort and candidates is scope.positions:
+            # No range narrowed the scan: walk the precomputed order for this sort
+            order = {
+                'price_asc': scope.price_pos,
+                'price_desc': scope.price_pos[::-1],
+                'rating': scope.rating_desc,
+                'reviews': scope.reviews_desc,
+            }[q.sort]
+            matched = [i for i in order if keep(i)]
+        else:
+            matched = [i for i in candidates if keep(i)]
+            by_price = q.sort in ('price_asc', 'price_desc')
+            if candidates is not scope.positions and not (by_price and price_sorted):
+                matched.sort()  # back to catalog order so ties keep it
+            if by_price:
+                if not price_sorted:
+                    matched.sort(key=lambda i: _num(products[i].get('price')))
+                if q.sort == 'price_desc':
+                    matched.reverse()
+            elif q.sort == 'rating':
+                matched.sort(key=lambda i: -_num(products[i].get('rating')))
+            elif q.sort == 'reviews':
+                matched.sort(key=lambda i: -_num(products[i].get('reviews')))
+
+        total = len(matched)
+        start = max(0, q.offset)
+        end = start + q.limit if q.limit is not None else None
+        return [products[i] for i in matched[start:end]], total
+
+
+_CATALOGS: Dict[str, Tuple[Tuple[int, int], Catalog]] = {}
+_CATALOGS_LOCK = threading.Lock()
+
+
+def get_catalog(data_dir: str) -> Tuple[Catalog, Tuple[int, int]]:
+    """Return (catalog, products.json version), rebuilding when the file changes."""
+    products, version = load_json_versioned(data_dir, PRODUCTS_JSON_FILE, [])
+    with _CATALOGS_LOCK:
+        cached = _CATALOGS.get(data_dir)
+        if cached is not None and cached[0] == version:
+            return cached[1], version
+    catalog = Catalog(products)
+    with _CATALOGS_LOCK:
+        _CATALOGS[data_dir] = (version, catalog)
+    return catalog, version
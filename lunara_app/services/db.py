@@ -1,13 +1,25 @@
 """Database utilities with graceful fallback to JSON storage.
 - Uses MySQL if driver and connection succeed.
 - Falls back to JSON files in data directory if not.
+- A circuit breaker per server fails fast while MySQL is down, and a background
+  health probe initializes the schema lazily and re-enables MySQL once it recovers.
 """
 from __future__ import annotations
 import json
+import logging
 import os
-from datetime import datetime
+import threading
+import time
+from collections import deque
+from collections.abc import Mapping
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from . import metrics
+from .breaker import CLOSED, OPEN, CircuitBreaker
+from .filelock import atomic_write_json, file_lock
+from .journal import get_store
 
 try:
     import mysql.connector  # type: ignore
@@ -18,22 +30,319 @@ except Exception:  # pragma: no cover - driver not present in many envs
     Error = Exception  # type: ignore
     MYSQL_DRIVER_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
+TICKETS_JSON_FILE = "support_tickets.json"
+
+JSON_IO_SECONDS = metrics.histogram('lunara_json_io_seconds', 'Time spent reading or writing JSON documents.',
+                                    ('op', 'file'))
+JSON_IO_BYTES = metrics.counter('lunara_json_io_bytes_total', 'Bytes read or written by the JSON helpers.',
+                                ('op', 'file'))
+MYSQL_CONNECT_SECONDS = metrics.histogram('lunara_mysql_connect_seconds',
+                                          'Time to check out a pooled MySQL connection.')
+MYSQL_QUERY_SECONDS = metrics.histogram('lunara_mysql_query_seconds', 'MySQL statement time by operation.',
+                                        ('query',))
+
 
 class DBState:
+    # True once the schema has been created on the configured server; while the
+    # breaker is open callers still fall back to JSON (see mysql_ready)
     available: bool = False
 
 
-def get_db_connection(config: Dict[str, Any]):
-    if not MYSQL_DRIVER_AVAILABLE:
-        raise Error("MySQL driver not available")
-    return mysql.connector.connect(
-        host=config.get("MYSQL_HOST"),
-        user=config.get("MYSQL_USER"),
-        password=config.get("MYSQL_PASSWORD"),
-        database=config.get("MYSQL_DB"),
-        port=int(config.get("MYSQL_PORT", 3306)),
-        auth_plugin=config.get("MYSQL_AUTH_PLUGIN", "mysql_native_password"),
-    )
+class PoolTimeoutError(Error):  # type: ignore[misc, valid-type]
+    """Raised when no pooled connection became free within the checkout timeout."""
+
+
+class PooledConnection:
+    """Proxy around a driver connection; ``close()`` returns it to the pool."""
+
+    def __init__(self, pool: "ConnectionPool", raw, created_at: float):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._breaker: Optional[CircuitBreaker] = None
+
+    def __getattr__(self, name: str):
+        if self._raw is None:
+            raise Error("Connection already returned to the pool")
+        return getattr(self._raw, name)
+
+    def close(self) -> None:
+        self._settle(failed=False)
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool._checkin(raw, self._created_at)
+
+    def invalidate(self) -> None:
+        """Close the underlying connection instead of reusing it."""
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool._discard(raw)
+
+    def _settle(self, failed: bool) -> None:
+        breaker, self._breaker = self._breaker, None
+        if breaker is not None:
+            if failed:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            # Only driver errors count against the server; application errors mean it answered
+            self._settle(failed=issubclass(exc_type, Error))
+            self.invalidate()
+        else:
+            self.close()
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool with pre-ping and age-based recycling.
+
+    Up to ``size`` idle connections are kept; ``max_overflow`` extra ones may be
+    opened under load and are closed when returned. Checkout waits at most
+    ``timeout`` seconds for a free slot. ``connect`` is any zero-argument
+    callable returning a DB-API connection, so a fake connector can stand in.
+    """
+
+    def __init__(self, connect: Callable[[], Any], size: int = 5, max_overflow: int = 10,
+                 timeout: float = 5.0, recycle: float = 1800.0, pre_ping: bool = True):
+        self._connect = connect
+        self.size = max(1, int(size))
+        self.max_overflow = max(0, int(max_overflow))
+        self.timeout = float(timeout)
+        self.recycle = float(recycle)
+        self.pre_ping = bool(pre_ping)
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._open = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0, 'created': 0, 'reused': 0, 'recycled': 0,
+            'ping_failures': 0, 'waits': 0, 'timeouts': 0, 'connect_errors': 0,
+        }
+
+    def connect(self) -> PooledConnection:
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    raw, created_at = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    raw, created_at = None, 0.0
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeoutError(f"No pooled connection available within {self.timeout}s")
+                self._stats['waits'] += 1
+                self._cond.wait(remaining)
+            self._stats['checkouts'] += 1
+
+        if raw is not None and not self._usable(raw, created_at):
+            raw = None
+        if raw is None:
+            try:
+                raw = self._connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._stats['connect_errors'] += 1
+                    self._cond.notify()
+                raise
+            created_at = time.monotonic()
+            with self._cond:
+                self._stats['created'] += 1
+        else:
+            with self._cond:
+                self._stats['reused'] += 1
+        return PooledConnection(self, raw, created_at)
+
+    def _usable(self, raw, created_at: float) -> bool:
+        if self.recycle > 0 and time.monotonic() - created_at > self.recycle:
+            self._close_quietly(raw)
+            with self._cond:
+                self._stats['recycled'] += 1
+            return False
+        if self.pre_ping:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                self._close_quietly(raw)
+                with self._cond:
+                    self._stats['ping_failures'] += 1
+                return False
+        return True
+
+    def _checkin(self, raw, created_at: float) -> None:
+        try:
+            raw.rollback()  # never hand out a connection with an open transaction
+        except Exception:
+            self._discard(raw)
+            return
+        with self._cond:
+            if len(self._idle) < self.size:
+                self._idle.append((raw, created_at))
+                raw = None
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if raw is not None:
+            self._close_quietly(raw)
+
+    def _discard(self, raw) -> None:
+        self._close_quietly(raw)
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(raw) -> None:
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def dispose(self) -> None:
+        """Close all idle connections (checked-out ones close on return)."""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for raw, _ in idle:
+            self._close_quietly(raw)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            idle = len(self._idle)
+            return dict(self._stats, size=self.size, max_overflow=self.max_overflow,
+                        open=self._open, idle=idle, checked_out=self._open - idle)
+
+
+def _as_mapping(config) -> Mapping:
+    return config if isinstance(config, Mapping) else vars(config)
+
+
+def _connection_params(config: Mapping) -> Dict[str, Any]:
+    return {
+        'host': config.get("MYSQL_HOST"),
+        'user': config.get("MYSQL_USER"),
+        'password': config.get("MYSQL_PASSWORD"),
+        'database': config.get("MYSQL_DB"),
+        'port': int(config.get("MYSQL_PORT", 3306)),
+        'auth_plugin': config.get("MYSQL_AUTH_PLUGIN", "mysql_native_password"),
+        'connection_timeout': int(config.get("MYSQL_CONNECT_TIMEOUT", 3)),
+    }
+
+
+def _pool_key(params: Mapping) -> str:
+    return f"{params['user']}@{params['host']}:{params['port']}/{params['database']}"
+
+
+_POOLS: Dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def get_pool(config, connect: Optional[Callable[[], Any]] = None) -> ConnectionPool:
+    """Return the process-wide pool for the configured MySQL server.
+
+    ``connect`` overrides the driver (e.g. a fake connector) when the pool is first created.
+    """
+    config = _as_mapping(config)
+    params = _connection_params(config)
+    key = _pool_key(params)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            if connect is None:
+                if not MYSQL_DRIVER_AVAILABLE:
+                    raise Error("MySQL driver not available")
+                connect = lambda: mysql.connector.connect(**params)  # noqa: E731
+            pool = ConnectionPool(
+                connect,
+                size=int(config.get("MYSQL_POOL_SIZE", 5)),
+                max_overflow=int(config.get("MYSQL_POOL_MAX_OVERFLOW", 10)),
+                timeout=float(config.get("MYSQL_POOL_TIMEOUT", 5.0)),
+                recycle=float(config.get("MYSQL_POOL_RECYCLE", 1800)),
+                pre_ping=bool(config.get("MYSQL_POOL_PRE_PING", True)),
+            )
+            _POOLS[key] = pool
+        return pool
+
+
+def pool_metrics() -> Dict[str, Dict[str, Any]]:
+    """Per-pool counters keyed by ``user@host:port/db``."""
+    with _POOLS_LOCK:
+        pools = dict(_POOLS)
+    return {key: pool.metrics() for key, pool in pools.items()}
+
+
+def dispose_pools() -> None:
+    """Close and forget every pool, e.g. in a master process before it forks workers."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.dispose()
+
+
+def get_breaker(config) -> CircuitBreaker:
+    """Return the circuit breaker for the configured MySQL server (kept across dispose_pools)."""
+    config = _as_mapping(config)
+    key = _pool_key(_connection_params(config))
+    with _POOLS_LOCK:
+        breaker = _BREAKERS.get(key)
+        if breaker is None:
+            breaker = _BREAKERS[key] = CircuitBreaker(
+                failure_threshold=int(config.get("MYSQL_BREAKER_FAILURES", 3)),
+                reset_timeout=float(config.get("MYSQL_BREAKER_RESET", 10.0)),
+            )
+        return breaker
+
+
+def mysql_ready(config) -> bool:
+    """True if MySQL should be tried: schema initialized and breaker not open."""
+    return DBState.available and get_breaker(config).state != OPEN
+
+
+def _pool_samples() -> List[metrics.Sample]:
+    samples: List[metrics.Sample] = []
+    for key, stats in pool_metrics().items():
+        samples.extend(metrics.mapping_samples('lunara_mysql_pool', stats, {'pool': key}))
+    with _POOLS_LOCK:
+        breakers = dict(_BREAKERS)
+    for key, breaker in breakers.items():
+        stats = dict(breaker.stats(), available=int(DBState.available))
+        samples.extend(metrics.mapping_samples('lunara_mysql_breaker', stats, {'pool': key}))
+    return samples
+
+
+metrics.register_collector(_pool_samples)
+
+
+def get_db_connection(config) -> PooledConnection:
+    """Check out a pooled connection; call ``close()`` to return it.
+
+    Raises CircuitOpenError without touching the network while the breaker is
+    open. Failed checkouts, and driver errors raised inside ``with conn:``,
+    count towards opening it.
+    """
+    breaker = get_breaker(config)
+    breaker.check()
+    try:
+        with MYSQL_CONNECT_SECONDS.time():
+            conn = get_pool(config).connect()
+    except Exception:
+        breaker.record_failure()
+        raise
+    conn._breaker = breaker
+    return conn
 
 
 def ensure_data_dir(data_dir: str) -> Path:
@@ -42,115 +351,351 @@ def ensure_data_dir(data_dir: str) -> Path:
     return p
 
 
+class CorruptJSONError(ValueError):
+    """A JSON store exists but cannot be parsed; it is left untouched for inspection."""
+
+
+def _load_file_versioned(path: Path) -> Tuple[Any, Tuple[int, int]]:
+    """Parse ``path``, recording read time and size; returns (data, (mtime_ns, size)).
+
+    The version comes from the descriptor that was read, so it always belongs
+    to the returned data even if the file is replaced meanwhile.
+    """
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        raw = f.read()
+    data = json.loads(raw)
+    JSON_IO_SECONDS.observe(time.perf_counter() - started, op='load', file=path.name)
+    JSON_IO_BYTES.inc(len(raw), op='load', file=path.name)
+    return data, (st.st_mtime_ns, st.st_size)
+
+
+def _load_file(path: Path):
+    """Parse ``path``, recording read time and size."""
+    return _load_file_versioned(path)[0]
+
+
+def _write_file(path: Path, data) -> None:
+    """Atomically write ``path``, recording write time and size."""
+    started = time.perf_counter()
+    atomic_write_json(path, data)
+    JSON_IO_SECONDS.observe(time.perf_counter() - started, op='save', file=path.name)
+    JSON_IO_BYTES.inc(path.stat().st_size, op='save', file=path.name)
+
+
+def _read_json(path: Path, default):
+    try:
+        return _load_file(path)
+    except FileNotFoundError:
+        return default
+    except json.JSONDecodeError as e:
+        raise CorruptJSONError(f"{path}: {e}") from e
+
+
 def load_json(data_dir: str, filename: str, default):
+    """Read a JSON document; creates it with ``default`` if missing.
+
+    A corrupt file is logged and ``default`` is returned, but the file is never
+    overwritten, so a concurrent or half-finished write cannot wipe real data.
+    """
     path = ensure_data_dir(data_dir) / filename
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return _load_file(path)
     except FileNotFoundError:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(default, f, indent=2, ensure_ascii=False)
-        return default
+        with file_lock(path):
+            if not path.exists():
+                _write_file(path, default)
+        return _read_json(path, default)
     except json.JSONDecodeError:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(default, f, indent=2, ensure_ascii=False)
+        logger.error("Could not parse %s; serving defaults without modifying the file", path)
         return default
 
 
 def save_json(data_dir: str, filename: str, data):
+    """Atomically replace a JSON document under its cross-process lock."""
     path = ensure_data_dir(data_dir) / filename
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    with file_lock(path):
+        _write_file(path, data)
+    invalidate_json_cache(path)
 
 
-def init_db(faq_seed: List[Dict[str, Any]], config) -> None:
-    """Create tables and seed FAQs if using MySQL; otherwise ensure JSON files exist."""
-    from .faq_service import FAQ_JSON_FILE
+@contextmanager
+def json_transaction(data_dir: str, filename: str, default) -> Iterator[Any]:
+    """Read-modify-write a JSON document under an exclusive cross-process lock.
 
-    data_dir = config.get("DATA_DIR", "data")
+    Mutate the yielded document in place; it is written back atomically when the
+    block exits normally and discarded if the block raises::
+
+        with json_transaction(data_dir, 'settings.json', {}) as settings:
+            settings['banner'] = text
+    """
+    path = ensure_data_dir(data_dir) / filename
+    with file_lock(path):
+        data = _read_json(path, default)
+        yield data
+        _write_file(path, data)
+    invalidate_json_cache(path)
+
+
+# Parsed documents keyed by resolved path, revalidated by (mtime_ns, size).
+_JSON_CACHE: Dict[Path, Tuple[Tuple[int, int], Any]] = {}
+_JSON_CACHE_LOCK = threading.Lock()
+
+
+def _file_version(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def load_json_versioned(data_dir: str, filename: str, default) -> Tuple[Any, Tuple[int, int]]:
+    """Like load_json, but served from an in-process cache while the file is unchanged.
+
+    Returns ``(data, version)`` where version is the file's (mtime_ns, size).
+    The returned document is shared between callers and must be treated as read-only.
+    """
+    path = (ensure_data_dir(data_dir) / filename).resolve()
+    version = _file_version(path)
+    with _JSON_CACHE_LOCK:
+        cached = _JSON_CACHE.get(path)
+    if cached is not None and version is not None and cached[0] == version:
+        return cached[1], version
 
     try:
-        conn = get_db_connection(config.__dict__ if hasattr(config, "__dict__") else config)
-        cur = conn.cursor()
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS faqs (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                category VARCHAR(100) NOT NULL,
-                question TEXT NOT NULL,
-                answer TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """
-        )
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS support_tickets (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(255),
-                email VARCHAR(255),
-                question TEXT NOT NULL,
-                sentiment VARCHAR(32),
-                status VARCHAR(32) DEFAULT 'open',
-                source VARCHAR(32) DEFAULT 'chat',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """
-        )
+        data, version = _load_file_versioned(path)
+    except (FileNotFoundError, json.JSONDecodeError):
+        # Created with ``default`` or corrupt (logged): served uncached
+        return load_json(data_dir, filename, default), version or (0, 0)
+    with _JSON_CACHE_LOCK:
+        _JSON_CACHE[path] = (version, data)
+    return data, version
+
+
+def load_json_cached(data_dir: str, filename: str, default):
+    """Read-only cached variant of load_json (see load_json_versioned)."""
+    return load_json_versioned(data_dir, filename, default)[0]
+
+
+def invalidate_json_cache(path: Optional[Path] = None) -> None:
+    with _JSON_CACHE_LOCK:
+        if path is None:
+            _JSON_CACHE.clear()
+        else:
+            _JSON_CACHE.pop(Path(path).resolve(), None)
+
+
+def _create_schema(conn, faq_seed: List[Dict[str, Any]]) -> None:
+    """Create the MySQL tables if missing and seed FAQs into an empty table."""
+    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS faqs (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            category VARCHAR(100) NOT NULL,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS support_tickets (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255),
+            email VARCHAR(255),
+            question TEXT NOT NULL,
+            sentiment VARCHAR(32),
+            status VARCHAR(32) DEFAULT 'open',
+            source VARCHAR(32) DEFAULT 'chat',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """
+    )
+    # Single-row sequence so ticket ids can be handed out before the
+    # (batched) insert; see services.tickets
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS support_ticket_seq (
+            id TINYINT PRIMARY KEY,
+            next_id BIGINT NOT NULL
+        ) ENGINE=InnoDB;
+        """
+    )
+    cur.execute(
+        "INSERT IGNORE INTO support_ticket_seq (id, next_id) "
+        "SELECT 1, COALESCE(MAX(id), 0) + 1 FROM support_tickets"
+    )
+    conn.commit()
+
+    # Seed FAQs if empty
+    cur.execute("SELECT COUNT(*) FROM faqs")
+    (count,) = cur.fetchone()
+    if count == 0:
+        insert_sql = "INSERT INTO faqs (category, question, answer) VALUES (%s, %s, %s)"
+        cur.executemany(insert_sql, [(f['category'], f['question'], f['answer']) for f in faq_seed])
         conn.commit()
+    cur.close()
 
-        # Seed FAQs if empty
-        cur.execute("SELECT COUNT(*) FROM faqs")
-        (count,) = cur.fetchone()
-        if count == 0:
-            insert_sql = "INSERT INTO faqs (category, question, answer) VALUES (%s, %s, %s)"
-            cur.executemany(insert_sql, [(f['category'], f['question'], f['answer']) for f in faq_seed])
-            conn.commit()
-        cur.close()
-        conn.close()
+
+def _ensure_json_fallback(faq_seed: List[Dict[str, Any]], config) -> None:
+    from .faq_service import FAQ_JSON_FILE
+
+    data_dir = config.get("DATA_DIR", "data")
+    faqs = load_json(data_dir, FAQ_JSON_FILE, faq_seed)
+    if not faqs:
+        save_json(data_dir, FAQ_JSON_FILE, faq_seed)
+    # Ensure basic ticket store exists
+    get_store(config, TICKETS_JSON_FILE)
+
+
+class HealthProbe:
+    """Daemon thread that sets up MySQL lazily and re-enables it after outages.
+
+    Every ``interval`` seconds, unless MySQL is already in use with a closed
+    breaker, the probe connects directly through the pool (bypassing the
+    breaker): it creates the schema the first time the server answers and
+    otherwise runs ``SELECT 1``. On success ``DBState.available`` is set and
+    the breaker is closed, so requests switch back from JSON without waiting
+    for a half-open trial. Tickets and FAQs written to JSON meanwhile stay there.
+    """
+
+    def __init__(self, config, faq_seed: List[Dict[str, Any]], interval: float = 5.0):
+        self.config = config
+        self.faq_seed = faq_seed
+        self.interval = max(0.1, float(interval))
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._healthy: Optional[bool] = None
+
+    def start(self) -> None:
+        # Threads do not survive fork(); each process runs its own probe
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, name='mysql-health-probe', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and self._pid == os.getpid() and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        stop = self._stop
+        while not stop.is_set():
+            try:
+                self.check()
+            except Exception:  # pragma: no cover - never let the probe thread die
+                logger.exception("MySQL health probe failed unexpectedly")
+            stop.wait(self.interval)
+
+    def check(self) -> bool:
+        """Probe once; returns whether MySQL is usable afterwards."""
+        breaker = get_breaker(self.config)
+        if DBState.available and breaker.state == CLOSED:
+            return True
+        try:
+            with get_pool(self.config).connect() as conn:
+                if DBState.available:
+                    cur = conn.cursor()
+                    cur.execute("SELECT 1")
+                    cur.fetchall()
+                    cur.close()
+                else:
+                    _create_schema(conn, self.faq_seed)
+        except Exception as e:
+            if self._healthy is not False:
+                logger.warning("MySQL unavailable (%s); using JSON storage and probing every %gs", e, self.interval)
+            self._healthy = False
+            return False
+        logger.info("MySQL %s; using MySQL storage",
+                    "recovered" if DBState.available else "schema ready")
+        DBState.available = True
+        breaker.reset()
+        self._healthy = True
+        return True
+
+
+_PROBES: Dict[str, HealthProbe] = {}
+
+
+def start_health_probe(faq_seed: List[Dict[str, Any]], config) -> Optional[HealthProbe]:
+    """Start (once per server and process) the background probe; None without a driver."""
+    if not MYSQL_DRIVER_AVAILABLE:
+        return None
+    config = _as_mapping(config)
+    key = _pool_key(_connection_params(config))
+    with _POOLS_LOCK:
+        probe = _PROBES.get(key)
+        if probe is None:
+            probe = _PROBES[key] = HealthProbe(config, faq_seed, float(config.get("MYSQL_PROBE_INTERVAL", 5.0)))
+    probe.start()
+    return probe
+
+
+def stop_health_probes() -> None:
+    with _POOLS_LOCK:
+        probes = list(_PROBES.values())
+        _PROBES.clear()
+    for probe in probes:
+        probe.stop()
+
+
+def _forget_pools_after_fork() -> None:
+    """Give a forked child its own (empty) pools.
+
+    The inherited connections share their sockets with the parent, so they are
+    dropped without being closed: closing them would end the parent's sessions.
+    """
+    global _POOLS, _POOLS_LOCK
+    _POOLS = {}
+    _POOLS_LOCK = threading.Lock()  # another thread may have held it at fork time
+
+
+def _restart_probes_after_fork() -> None:
+    for probe in list(_PROBES.values()):
+        probe.start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_pools_after_fork)
+    os.register_at_fork(after_in_child=_restart_probes_after_fork)
+
+
+def init_db(faq_seed: List[Dict[str, Any]], config, background: bool = False) -> None:
+    """Create tables and seed FAQs if using MySQL; otherwise ensure JSON files exist.
+
+    With ``background=True`` (the web app) only the JSON fallback is prepared
+    here; the MySQL setup runs on the health probe thread, so startup never
+    waits on a slow or unreachable server and requests use JSON until it is ready.
+    """
+    if background:
+        _ensure_json_fallback(faq_seed, config)
+        start_health_probe(faq_seed, config)
+        return
+    try:
+        with get_db_connection(config) as conn:
+            _create_schema(conn, faq_seed)
         DBState.available = True
     except Exception:
         # Fallback to JSON storage
         DBState.available = False
-        # Ensure JSON files exist
-        faqs = load_json(data_dir, FAQ_JSON_FILE, faq_seed)
-        if not faqs:
-            save_json(data_dir, FAQ_JSON_FILE, faq_seed)
-        # Ensure basic ticket store exists
-        load_json(data_dir, "support_tickets.json", [])
+        _ensure_json_fallback(faq_seed, config)
 
 
 def save_ticket(config, name: Optional[str], email: Optional[str], question: str, sentiment: str,
                 status: str = 'open', source: str = 'chat') -> Optional[int]:
-    data_dir = config.get("DATA_DIR", "data")
-
-    if DBState.available:
-        try:
-            conn = get_db_connection(config.__dict__ if hasattr(config, "__dict__") else config)
-            cur = conn.cursor()
-            cur.execute(
-                "INSERT INTO support_tickets (name, email, question, sentiment, status, source) VALUES (%s, %s, %s, %s, %s, %s)",
-                (name, email, question, sentiment, status, source)
-            )
-            conn.commit()
-            ticket_id = cur.lastrowid
-            cur.close()
-            conn.close()
-            return int(ticket_id)
-        except Exception:
-            pass
+    """Create a ticket synchronously and return its id (see services.tickets for the queued path)."""
+    from .tickets import build_ticket, get_id_allocator, write_tickets
 
-    tickets = load_json(data_dir, "support_tickets.json", [])
-    new_ticket = {
-        'id': len(tickets) + 1,
-        'name': name,
-        'email': email,
-        'question': question,
-        'sentiment': sentiment,
-        'status': status,
-        'source': source,
-        'created_at': datetime.now().isoformat()
-    }
-    tickets.append(new_ticket)
-    save_json(data_dir, "support_tickets.json", tickets)
-    return int(new_ticket['id'])
+    ticket = build_ticket(get_id_allocator(config).next_id(), name, email, question, sentiment, status, source)
+    write_tickets(config, [ticket])
+    return int(ticket['id'])
@@ -1,19 +1,30 @@
 """FAQ and chatbot helper utilities.
 Provides:
 - FAQ seed data
-- Normalization and fuzzy matching
+- Normalization and fuzzy matching (backed by a precomputed FaqIndex)
 - Loading FAQs from DB or JSON fallback
 - Simple sentiment detection
 """
 from __future__ import annotations
 import difflib
+import heapq
 import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
 from typing import Any, Dict, List, Optional, Tuple
 
-from .db import DBState, get_db_connection, load_json
+from . import metrics
+from .cache import LRUCache
+from .db import MYSQL_QUERY_SECONDS, get_db_connection, load_json_versioned, mysql_ready
 
 FAQ_JSON_FILE = 'faqs.json'
 
+# Minimum match_faq score for the chatbot to answer from an FAQ
+MATCH_THRESHOLD = 0.67
+
+FAQ_MATCH_SECONDS = metrics.histogram('lunara_faq_match_seconds', 'Time to score a chat message against the FAQs.')
+
 FAQ_SEED: List[Dict[str, str]] = [
     {"category": "General Questions", "question": "Do you ship internationally?", "answer": "Yes, we ship worldwide. Shipping charges and delivery times vary by country and are shown at checkout."},
     {"category": "General Questions", "question": "What are the delivery charges?", "answer": "Delivery is free within India for orders above ₹1,000. For international orders, charges depend on location and weight."},
@@ -70,20 +81,171 @@ def detect_sentiment(message: str) -> str:
     return 'neutral'
 
 
-def load_faqs(config) -> List[Dict[str, str]]:
-    data_dir = config.get("DATA_DIR", "data")
-    if DBState.available:
-        try:
-            conn = get_db_connection(config.__dict__ if hasattr(config, "__dict__") else config)
+# (checked_at, version, rows) for the FAQ set last read from MySQL
+_MYSQL_FAQS: Optional[Tuple[float, Any, List[Dict[str, Any]]]] = None
+_MYSQL_FAQS_LOCK = threading.Lock()
+
+
+def _load_mysql_faqs(config) -> Tuple[List[Dict[str, Any]], Any]:
+    """FAQ rows plus a version from ``CHECKSUM TABLE faqs``.
+
+    The checksum is polled at most every ``FAQ_VERSION_TTL`` seconds and the rows
+    are only re-selected when it changes, so an unchanged table costs no query.
+    """
+    global _MYSQL_FAQS
+    now = time.monotonic()
+    state = _MYSQL_FAQS
+    if state is not None and now - state[0] < float(config.get("FAQ_VERSION_TTL", 5.0)):
+        return state[2], state[1]
+    with get_db_connection(config) as conn:
+        cur = conn.cursor()
+        with MYSQL_QUERY_SECONDS.time(query='faqs_checksum'):
+            cur.execute("CHECKSUM TABLE faqs")
+            row = cur.fetchone()
+        cur.close()
+        version = ('mysql', row[1] if row else None)
+        if state is not None and state[1] == version:
+            rows = state[2]
+        else:
             cur = conn.cursor(dictionary=True)
-            cur.execute("SELECT id, category, question, answer FROM faqs")
-            rows = cur.fetchall()
+            with MYSQL_QUERY_SECONDS.time(query='load_faqs'):
+                cur.execute("SELECT id, category, question, answer FROM faqs")
+                rows = cur.fetchall()
             cur.close()
-            conn.close()
-            return rows
+    with _MYSQL_FAQS_LOCK:
+        _MYSQL_FAQS = (now, version, rows)
+    return rows, version
+
+
+def load_faqs_versioned(config) -> Tuple[List[Dict[str, str]], Any]:
+    """Return (faqs, version); the version changes whenever the FAQ set does."""
+    data_dir = config.get("DATA_DIR", "data")
+    if mysql_ready(config):
+        try:
+            return _load_mysql_faqs(config)
         except Exception:
             pass
-    return load_json(data_dir, FAQ_JSON_FILE, FAQ_SEED)
+    # Shared, read-only list: unchanged files keep their identity, which lets
+    # get_faq_index reuse the index without fingerprinting the questions.
+    faqs, version = load_json_versioned(data_dir, FAQ_JSON_FILE, FAQ_SEED)
+    return faqs, ('json', data_dir, version)
+
+
+def load_faqs(config) -> List[Dict[str, str]]:
+    return load_faqs_versioned(config)[0]
+
+
+def _overlap_bonus(overlap: int) -> float:
+    return min(overlap * 0.02, 0.1)
+
+
+class FaqIndex:
+    """Search structures precomputed once per FAQ set.
+
+    Holds normalized questions, their token sets and character counts, and an
+    inverted token -> FAQ positions map. A query is scored with a cheap upper
+    bound (difflib's quick_ratio plus the token-overlap bonus) and the exact
+    SequenceMatcher ratio only runs on the most promising candidates, best
+    bound first, stopping once no remaining bound can beat the best score.
+
+    Sets of up to ``full_scan_limit`` FAQs are bounded over every question, so
+    results are identical to a linear scan. Larger sets are pruned to FAQs that
+    share a token with the message and to at most ``top_k`` exact comparisons.
+    """
+
+    def __init__(self, faqs_list: List[Dict[str, str]], top_k: int = 50,
+                 full_scan_limit: int = 256, candidate_limit: int = 2000):
+        self.top_k = top_k
+        self.full_scan_limit = full_scan_limit
+        self.candidate_limit = candidate_limit
+        self.questions = [normalize_text(f.get('question', '')) for f in faqs_list]
+        self.tokens = [frozenset(q.split()) for q in self.questions]
+        self.char_counts = [Counter(q) for q in self.questions]
+        inverted: Dict[str, List[int]] = defaultdict(list)
+        for idx, toks in enumerate(self.tokens):
+            for tok in toks:
+                inverted[tok].append(idx)
+        self.inverted = dict(inverted)
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def _candidates(self, tokens) -> Tuple[List[int], bool]:
+        n = len(self.questions)
+        if n <= self.full_scan_limit:
+            return list(range(n)), True
+        hits: Dict[int, int] = defaultdict(int)
+        for tok in tokens:
+            for idx in self.inverted.get(tok, ()):
+                hits[idx] += 1
+        if not hits:
+            return list(range(n)), False
+        if len(hits) > self.candidate_limit:
+            return heapq.nlargest(self.candidate_limit, hits, key=hits.__getitem__), False
+        return list(hits), False
+
+    def search(self, text: str) -> Tuple[Optional[int], float]:
+        """Return (position, score) of the best FAQ for already-normalized text."""
+        if not text:
+            return None, 0.0
+        tokens = set(text.split())
+        counts = Counter(text)
+        la = len(text)
+        candidates, exhaustive = self._candidates(tokens)
+
+        bounded = []
+        for idx in candidates:
+            q_counts = self.char_counts[idx]
+            matches = sum(min(c, q_counts[ch]) for ch, c in counts.items())
+            overlap = len(tokens & self.tokens[idx])
+            ub = 2.0 * matches / (la + len(self.questions[idx])) + _overlap_bonus(overlap)
+            bounded.append((-ub, idx, overlap))
+        bounded.sort()
+
+        best_idx: Optional[int] = None
+        best_score = 0.0
+        evaluated = 0
+        for neg_ub, idx, overlap in bounded:
+            ub = -neg_ub
+            if ub < best_score:
+                break
+            if ub == best_score and best_idx is not None and idx > best_idx:
+                continue
+            if not exhaustive and evaluated >= self.top_k:
+                break
+            evaluated += 1
+            score = difflib.SequenceMatcher(None, text, self.questions[idx]).ratio() + _overlap_bonus(overlap)
+            # Ties go to the earlier FAQ, as with a front-to-back scan
+            if score > best_score or (score == best_score and best_idx is not None and idx < best_idx):
+                best_idx, best_score = idx, score
+        return best_idx, best_score
+
+
+_INDEX_CACHE: "OrderedDict[Tuple[str, ...], FaqIndex]" = OrderedDict()
+_INDEX_CACHE_SIZE = 8
+_INDEX_LOCK = threading.Lock()
+_LAST_INDEXED: Tuple[Optional[List[Dict[str, str]]], Optional[FaqIndex]] = (None, None)
+
+
+def get_faq_index(faqs_list: List[Dict[str, str]]) -> FaqIndex:
+    """Return the FaqIndex for this FAQ set, building it once per distinct set of questions."""
+    global _LAST_INDEXED
+    last_list, last_index = _LAST_INDEXED
+    if faqs_list is last_list and last_index is not None:
+        return last_index
+
+    key = tuple(f.get('question', '') for f in faqs_list)
+    with _INDEX_LOCK:
+        index = _INDEX_CACHE.get(key)
+        if index is None:
+            index = FaqIndex(faqs_list)
+            _INDEX_CACHE[key] = index
+            while len(_INDEX_CACHE) > _INDEX_CACHE_SIZE:
+                _INDEX_CACHE.popitem(last=False)
+        else:
+            _INDEX_CACHE.move_to_end(key)
+        _LAST_INDEXED = (faqs_list, index)
+    return index
 
 
 def match_faq(user_message: str, faqs_list: List[Dict[str, str]]):
@@ -91,15 +253,48 @@ def match_faq(user_message: str, faqs_list: List[Dict[str, str]]):
     text = normalize_text(user_message)
     if not text:
         return None, 0.0
+    with FAQ_MATCH_SECONDS.time():
+        idx, score = get_faq_index(faqs_list).search(text)
+    if idx is None:
+        return None, 0.0
+    return faqs_list[idx], score
+
+
+_ANSWER_CACHE: Optional[LRUCache] = None
+_ANSWER_CACHE_VERSION: Any = None
+_ANSWER_CACHE_LOCK = threading.Lock()
+
+
+def _answer_cache(config, version: Any) -> LRUCache:
+    """The process-wide answer cache, emptied whenever the FAQ version changes."""
+    global _ANSWER_CACHE, _ANSWER_CACHE_VERSION
+    with _ANSWER_CACHE_LOCK:
+        if _ANSWER_CACHE is None:
+            _ANSWER_CACHE = LRUCache(maxsize=int(config.get("CHATBOT_CACHE_SIZE", 1024)),
+                                     ttl=float(config.get("CHATBOT_CACHE_TTL", 300)))
+        if _ANSWER_CACHE_VERSION != version:
+            _ANSWER_CACHE.clear()
+            _ANSWER_CACHE_VERSION = version
+        return _ANSWER_CACHE
+
+
+def answer_message(config, message: str) -> Tuple[Optional[Dict[str, str]], float, str]:
+    """(best FAQ, score, sentiment) for a chat message, cached by normalized text and FAQ version."""
+    faqs_list, version = load_faqs_versioned(config)
+    key = (version, normalize_text(message))
+    cache = _answer_cache(config, version)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    best_match, score = match_faq(message, faqs_list or [])
+    result = (best_match, score, detect_sentiment(message))
+    cache.set(key, result)
+    return result
+
+
+def answer_cache_stats() -> Dict[str, Any]:
+    cache = _ANSWER_CACHE
+    return cache.stats() if cache is not None else {}
+
 
-    best = None
-    best_score = 0.0
-    for f in faqs_list:
-        q = normalize_text(f.get('question', ''))
-        ratio = difflib.SequenceMatcher(None, text, q).ratio()
-        overlap = len(set(text.split()) & set(q.split()))
-        ratio += min(overlap * 0.02, 0.1)
-        if ratio > best_score:
-            best = f
-            best_score = ratio
-    return best, best_score
+metrics.register_collector(lambda: metrics.mapping_samples('lunara_chatbot_answer_cache', answer_cache_stats()))
@@ -0,0 +1,111 @@
+"""Cross-process file locking and atomic file replacement.
+
+Locks are advisory and taken on a ``<file>.lock`` sidecar so the data file
+itself can be swapped atomically with ``os.replace``. ``flock`` is used on
+POSIX (it also serializes threads, since each lock opens its own descriptor);
+on Windows ``msvcrt.locking`` provides an exclusive lock.
+"""
+from __future__ import annotations
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Union
+
+try:
+    import fcntl  # type: ignore
+    _HAVE_FCNTL = True
+except ImportError:  # pragma: no cover - Windows
+    import msvcrt  # type: ignore
+    _HAVE_FCNTL = False
+
+
+def lock_path_for(path: Union[str, Path]) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + '.lock')
+
+
+@contextmanager
+def file_lock(path: Union[str, Path], shared: bool = False, timeout: Optional[float] = None) -> Iterator[None]:
+    """Hold an advisory lock for ``path`` (exclusive unless ``shared``) for the block.
+
+    With ``timeout`` (seconds), TimeoutError is raised if the lock is not free by then.
+    """
+    lock_path = lock_path_for(path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if _HAVE_FCNTL:
+            mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            if timeout is None:
+                fcntl.flock(fd, mode)
+            else:
+                deadline = time.monotonic() + timeout
+                while True:
+                    try:
+                        fcntl.flock(fd, mode | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline:
+                            raise TimeoutError(f"lock on {path} not acquired within {timeout}s") from None
+                        time.sleep(0.01)
+        else:  # pragma: no cover - Windows
+            deadline = time.monotonic() + timeout if timeout is not None else None
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise TimeoutError(f"lock on {path} not acquired within {timeout}s") from None
+                    continue
+        try:
+            yield
+        finally:
+            if _HAVE_FCNTL:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:  # pragma: no cover - Windows
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_json(path: Union[str, Path], data: Any, indent: int = 2) -> None:
+    """Write JSON to a temp file in the same directory, fsync it, then rename over ``path``.
+
+    Readers see either the old or the new file, never a partial one.
+    """
+    atomic_write_text(path, [json.dumps(data, indent=indent, ensure_ascii=False)])
+
+
+def atomic_write_text(path: Union[str, Path], chunks: Iterable[str]) -> None:
+    """Stream ``chunks`` into a temp file, fsync it, then rename over ``path``."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.writelines(chunks)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def pid_alive(pid: int) -> bool:
+    """Whether process ``pid`` on this host still exists."""
+    if os.name != 'posix':  # pragma: no cover - os.kill(pid, 0) would terminate it on Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,365 @@
+"""``Idempotency-Key`` support: run a request once, replay its response to retries.
+
+The first request with a given key runs the view; its response (status, body)
+is kept for ``ttl`` seconds and returned as-is for later requests with the
+same key, so a client retrying after a timeout cannot place a second order or
+re-roll a payment decline. Requests arriving while the first is still running
+wait for its result (up to ``wait`` seconds, then 409) instead of running
+again. Reusing a key with a different request body is answered 422.
+
+Two tiers:
+- memory: a bounded LRU of completed results plus the in-flight entries, shared
+  by the threads of one process (in-flight entries are never evicted);
+- disk (``shared``): one file per key under ``<data dir>/idempotency/`` so
+  other worker processes see the result too. The process that runs a key
+  creates an ``O_EXCL`` in-flight marker next to it, which is what concurrent
+  duplicates in other processes wait on (markers left by a process that died
+  are taken over); unrelated keys never wait on each other. A striped
+  cross-process lock is held only while a result file is read or written and
+  the marker created. Expired files are swept periodically.
+
+Keys are scoped to the caller. Logged-in users' keys are scoped to the user.
+Guests have nothing stable the server could scope by (a cookie minted on the
+first attempt never reaches a client whose request timed out), so a guest's
+key must itself be unguessable -- at least 128 bits, e.g. a UUID -- and the
+scope is the key plus the request fingerprint: a replay is only ever returned
+to a client that sends the same key and the same body.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import socket
+import string
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import current_app, jsonify, make_response, request, session
+
+from . import metrics
+from .filelock import atomic_write_json, file_lock, pid_alive
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+MIN_GUEST_KEY_BITS = 128
+IDEMPOTENCY_DIR = 'idempotency'
+
+IDEMPOTENT_REQUESTS = metrics.counter('lunara_idempotent_requests_total',
+                                      'Requests carrying an Idempotency-Key, by outcome.', ('outcome',))
+
+# (status code, mimetype, body)
+Result = Tuple[int, str, bytes]
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a request with a different body."""
+
+
+class IdempotencyInProgress(Exception):
+    """The first request with this key did not finish within the wait time."""
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Optional[Result] = None
+    expires_at: float = 0.0
+
+
+class IdempotencyCache:
+    def __init__(self, data_dir: Optional[str] = None, maxsize: int = 10000, ttl: float = 86400.0,
+                 wait: float = 30.0, stripes: int = 256, sweep_every: int = 500):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self.wait = float(wait)
+        self.stripes = max(1, int(stripes))
+        self.sweep_every = max(1, int(sweep_every))
+        self.dir = Path(data_dir) / IDEMPOTENCY_DIR if data_dir else None
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.replayed = 0
+        self.executed = 0
+        self.evicted = 0
+
+    # ------------------------------------------------------------------ memory
+    def _claim(self, key: str, fingerprint: str) -> Tuple[_Entry, bool]:
+        """The entry for ``key`` and whether this caller owns (must run) it."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.done.is_set() and (entry.result is None or entry.expires_at <= now):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry, False
+            entry = self._entries[key] = _Entry(fingerprint)
+            self._evict()
+            return entry, True
+
+    def _evict(self) -> None:
+        excess = len(self._entries) - self.maxsize
+        if excess <= 0:
+            return
+        for key in [k for k, e in self._entries.items() if e.done.is_set()][:excess]:
+            del self._entries[key]
+            self.evicted += 1
+
+    def _finish(self, key: str, entry: _Entry, result: Optional[Result]) -> None:
+        with self._lock:
+            entry.result = result
+            entry.expires_at = time.monotonic() + self.ttl
+            if result is None and self._entries.get(key) is entry:
+                del self._entries[key]  # failed: a retry may run it again
+        entry.done.set()
+
+    # -------------------------------------------------------------------- disk
+    def _path(self, key: str) -> Path:
+        return self.dir / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json"
+
+    def _marker(self, path: Path) -> Path:
+        return path.with_suffix('.inflight')
+
+    def _stripe_lock(self, path: Path) -> Path:
+        return self.dir / 'locks' / f"{int(path.stem[:8], 16) % self.stripes}"
+
+    def _read(self, path: Path) -> Optional[Tuple[str, Result]]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if record.get('expires_at', 0) <= time.time():
+            return None
+        return record['fingerprint'], (record['status'], record['mimetype'], record['body'].encode('utf-8'))
+
+    def _write(self, path: Path, fingerprint: str, result: Result) -> None:
+        status, mimetype, body = result
+        atomic_write_json(path, {'fingerprint': fingerprint, 'status': status, 'mimetype': mimetype,
+                                 'body': body.decode('utf-8'), 'expires_at': time.time() + self.ttl}, indent=None)
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self.sweep()
+
+    def _mark_in_flight(self, marker: Path) -> bool:
+        """Create ``marker`` for this process; False if another request holds it."""
+        try:
+            fd = os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(f"{socket.gethostname()}:{os.getpid()}")
+        return True
+
+    def _marker_stale(self, marker: Path) -> bool:
+        """Whether ``marker`` was left by a process that is gone (same host) or is far older than any request."""
+        try:
+            owner = marker.read_text(encoding='utf-8')
+            age = time.time() - marker.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        host, _, pid = owner.rpartition(':')
+        if host == socket.gethostname() and pid.isdigit() and not pid_alive(int(pid)):
+            return True
+        return age > max(self.wait * 10, 600.0)
+
+    def sweep(self) -> int:
+        """Delete expired result files; returns how many were removed."""
+        if self.dir is None:
+            return 0
+        removed = 0
+        now = time.time()
+        for path in self.dir.glob('*.json'):
+            try:
+                if path.stat().st_mtime + self.ttl > now:
+                    continue
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+    # --------------------------------------------------------------------- run
+    def run(self, key: str, fingerprint: str, execute: Callable[[], Result]) -> Tuple[Result, bool]:
+        """``(result, replayed)`` for ``key``: runs ``execute`` only for the first request.
+
+        Raises IdempotencyConflict on a fingerprint mismatch and
+        IdempotencyInProgress when the first request is still running after ``wait``.
+        """
+        entry, owner = self._claim(key, fingerprint)
+        if not owner:
+            if entry.fingerprint != fingerprint:
+                raise IdempotencyConflict(key)
+            if not entry.done.wait(self.wait):
+                raise IdempotencyInProgress(key)
+            if entry.result is None:  # the first attempt failed; run this one instead
+                return self.run(key, fingerprint, execute)
+            self.replayed += 1
+            return entry.result, True
+
+        result: Optional[Result] = None
+        try:
+            if self.dir is None:
+                result = execute()
+                self.executed += 1
+                return result, False
+            result, replayed = self._run_shared(key, fingerprint, execute)
+            return result, replayed
+        finally:
+            self._finish(key, entry, result)
+
+    def _run_shared(self, key: str, fingerprint: str, execute: Callable[[], Result]) -> Tuple[Result, bool]:
+        path = self._path(key)
+        marker = self._marker(path)
+        deadline = time.monotonic() + self.wait
+        delay = 0.01
+        while True:
+            try:
+                with file_lock(self._stripe_lock(path), timeout=max(0.0, deadline - time.monotonic())):
+                    stored = self._read(path)
+                    if stored is not None:
+                        if stored[0] != fingerprint:
+                            raise IdempotencyConflict(key)
+                        self.replayed += 1
+                        return stored[1], True
+                    if self._mark_in_flight(marker):
+                        break
+                    if self._marker_stale(marker):
+                        logger.info("Taking over idempotency key abandoned by %s", marker.name)
+                        marker.unlink()
+                        continue
+            except TimeoutError:
+                raise IdempotencyInProgress(key) from None
+            if time.monotonic() + delay > deadline:
+                raise IdempotencyInProgress(key)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+
+        try:
+            result = execute()
+            self.executed += 1
+            try:
+                with file_lock(self._stripe_lock(path)):
+                    self._write(path, fingerprint, result)
+            except OSError as e:
+                logger.warning("Could not store idempotent result for other workers: %s", e)
+            return result, False
+        finally:
+            try:
+                marker.unlink()
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = sum(1 for e in self._entries.values() if not e.done.is_set())
+            size = len(self._entries)
+        return {'size': size, 'maxsize': self.maxsize, 'in_flight': in_flight, 'replayed': self.replayed,
+                'executed': self.executed, 'evicted': self.evicted, 'shared': int(self.dir is not None)}
+
+
+_CACHES: Dict[str, IdempotencyCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_idempotency_cache(config) -> IdempotencyCache:
+    data_dir = str(config.get("DATA_DIR", "data"))
+    with _CACHES_LOCK:
+        cache = _CACHES.get(data_dir)
+        if cache is None:
+            cache = _CACHES[data_dir] = IdempotencyCache(
+                data_dir if config.get("IDEMPOTENCY_SHARED", True) else None,
+                maxsize=int(config.get("IDEMPOTENCY_CACHE_SIZE", 10000)),
+                ttl=float(config.get("IDEMPOTENCY_TTL", 86400)),
+                wait=float(config.get("IDEMPOTENCY_WAIT", 30)),
+            )
+        return cache
+
+
+def _fingerprint() -> str:
+    body = request.get_json(silent=True)
+    raw = json.dumps(body, sort_keys=True, separators=(',', ':')) if body is not None else request.get_data()
+    return hashlib.sha256(raw.encode('utf-8') if isinstance(raw, str) else raw).hexdigest()
+
+
+def _key_bits(key: str) -> int:
+    """Bits a key of this length and alphabet can carry (hex, e.g. a UUID: 4 per char; else 6)."""
+    chars = key.replace('-', '')
+    return len(chars) * (4 if all(c in string.hexdigits for c in chars) else 6)
+
+
+def _caller_scope(key: str, fingerprint: str) -> Optional[str]:
+    """Idempotency scope of the caller; None for a guest whose key is too short to be unguessable."""
+    user_id = session.get('user_id')
+    if user_id:
+        return f"user:{user_id}"
+    if _key_bits(key) < MIN_GUEST_KEY_BITS:
+        return None
+    return f"guest:{fingerprint}"
+
+
+def idempotent(view):
+    """Honour an ``Idempotency-Key`` header on ``view``; requests without one run normally.
+
+    Replayed responses carry ``Idempotent-Replayed: true``.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER, '').strip()
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'success': False, 'message': f'{HEADER} is too long'}), 400
+
+        def execute() -> Result:
+            resp = make_response(view(*args, **kwargs))
+            return resp.status_code, resp.mimetype, resp.get_data()
+
+        fingerprint = _fingerprint()
+        scope = _caller_scope(key, fingerprint)
+        if scope is None:
+            return jsonify({'success': False, 'message': f'{HEADER} must be a random value of at least '
+                                                         f'{MIN_GUEST_KEY_BITS} bits (e.g. a UUID) '
+                                                         f'when not logged in'}), 400
+        scoped = f"{scope}:{request.path}:{key}"
+        cache = get_idempotency_cache(current_app.config)
+        try:
+            (status, mimetype, body), replayed = cache.run(scoped, fingerprint, execute)
+        except IdempotencyConflict:
+            IDEMPOTENT_REQUESTS.inc(outcome='conflict')
+            return jsonify({'success': False,
+                            'message': f'{HEADER} was already used for a different request'}), 422
+        except IdempotencyInProgress:
+            IDEMPOTENT_REQUESTS.inc(outcome='in_progress')
+            resp = jsonify({'success': False, 'message': 'The original request is still being processed'})
+            resp.status_code = 409
+            resp.headers['Retry-After'] = '1'
+            return resp
+        IDEMPOTENT_REQUESTS.inc(outcome='replayed' if replayed else 'executed')
+        resp = current_app.response_class(body, status=status, mimetype=mimetype)
+        if replayed:
+            resp.headers['Idempotent-Replayed'] = 'true'
+        return resp
+    return wrapper
+
+
+def _idempotency_samples() -> List[metrics.Sample]:
+    with _CACHES_LOCK:
+        caches = dict(_CACHES)
+    samples: List[metrics.Sample] = []
+    for data_dir, cache in caches.items():
+        samples.extend(metrics.mapping_samples('lunara_idempotency_cache', cache.stats(), {'data_dir': data_dir}))
+    return samples
+
+
+metrics.register_collector(_idempotency_samples)
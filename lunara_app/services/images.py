@@ -0,0 +1,98 @@
+"""Responsive image derivatives.
+
+``python -m lunara_app.tools.build_images`` writes resized and WebP copies of
+``static/images`` into ``static/images/derived`` and records them in
+``manifest.json`` there. This module reads that manifest and turns it into
+``srcset`` strings for templates and the product payload.
+"""
+from __future__ import annotations
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app, url_for
+
+IMAGES_DIR = 'images'
+DERIVED_DIR = 'derived'
+MANIFEST_FILE = 'manifest.json'
+
+# Mirrors getProductImage() in static/js/script.js for catalog entries whose
+# image is still a placeholder URL.
+_CATEGORY_IMAGE = {'Rings': 'ring', 'Necklaces': 'necklace', 'Bracelets': 'bracelet', 'Earrings': 'earring'}
+
+_MANIFEST: Tuple[Optional[Tuple[int, int]], Dict[str, Any]] = (None, {})
+_MANIFEST_LOCK = threading.Lock()
+
+
+def derived_path(static_folder: str) -> Path:
+    return Path(static_folder) / IMAGES_DIR / DERIVED_DIR
+
+
+def load_image_manifest(static_folder: str) -> Tuple[Optional[Tuple[int, int]], Dict[str, Any]]:
+    """Return (version, images) from the derivative manifest, re-read only when it changes."""
+    global _MANIFEST
+    path = derived_path(static_folder) / MANIFEST_FILE
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None, {}
+    version = (st.st_mtime_ns, st.st_size)
+    with _MANIFEST_LOCK:
+        if _MANIFEST[0] == version:
+            return _MANIFEST
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            images = json.load(f).get('images', {})
+    except (OSError, json.JSONDecodeError, AttributeError):
+        return None, {}
+    with _MANIFEST_LOCK:
+        _MANIFEST = (version, images)
+    return _MANIFEST
+
+
+def local_image_name(product: Dict[str, Any]) -> str:
+    """File name under static/images that the storefront shows for a product."""
+    image = str(product.get('image') or '')
+    for prefix in ('/static/images/', 'static/images/'):
+        if image.startswith(prefix):
+            return image[len(prefix):]
+    base = _CATEGORY_IMAGE.get(product.get('category'), 'ring')
+    try:
+        index = (int(product.get('id')) - 1) % 12 + 1
+    except (TypeError, ValueError):
+        index = 1
+    return f"{base}{index}.jpg"
+
+
+def build_srcset(name: str, images: Dict[str, Any], fmt: Optional[str] = None) -> str:
+    """``srcset`` for ``name`` in its own format (default) or ``fmt`` (e.g. 'webp')."""
+    entry = images.get(name)
+    if not entry:
+        return ''
+    variants: Dict[str, List] = entry.get('variants', {})
+    fmt = fmt or entry.get('format')
+    candidates = [(int(w), url_for('assets.serve_image', filename=path)) for w, path in variants.get(fmt, [])]
+    if fmt == entry.get('format'):
+        # The untouched original is the largest candidate in its own format
+        candidates.append((int(entry['width']), url_for('static', filename=f"{IMAGES_DIR}/{name}")))
+    return ', '.join(f"{url} {w}w" for w, url in sorted(candidates))
+
+
+def image_srcset(name: str, fmt: Optional[str] = None) -> str:
+    """Template helper: srcset for ``static/images/<name>`` ('' if no derivatives were built)."""
+    _, images = load_image_manifest(current_app.static_folder)
+    return build_srcset(name, images, fmt)
+
+
+def with_srcsets(products: List[Dict[str, Any]], images: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Copies of ``products`` carrying ``srcset``/``srcsetWebp`` where derivatives exist."""
+    if not images:
+        return products
+    out = []
+    for p in products:
+        name = local_image_name(p)
+        if name in images:
+            p = dict(p, srcset=build_srcset(name, images), srcsetWebp=build_srcset(name, images, 'webp'))
+        out.append(p)
+    return out
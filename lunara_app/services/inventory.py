@@ -0,0 +1,415 @@
+"""Stock reservation for checkouts that does not serialize them on products.json.
+
+Each process sells from in-memory per-product counters guarded by striped
+locks: ``reserve`` takes units for a whole cart atomically, ``commit`` turns a
+reservation into a sale and ``release`` (or expiry after ``ttl`` seconds) puts
+the units back. Nothing is written per order.
+
+Several worker processes share one stock, so counters are backed by a ledger,
+``inventory.json``, kept under a cross-process lock (the same idea as the
+ticket id blocks in ``services.tickets``)::
+
+    {"pool":      {"<product id>": units not held by any process},
+     "leases":    {"<host>:<pid>": {"<product id>": units held by that process}},
+     "published": {"<product id>": stock last written to products.json}}
+
+A process whose counter runs short takes a small lease from the pool (at most
+``lease`` units, fewer as the pool drains, so the last units are not stranded
+in one worker). Every ``flush_interval`` seconds a background thread expires
+abandoned reservations and hands idle units back to the pool; after sales it
+also writes the remaining stock into the ``inventory`` field of products.json
+(only for totals that changed, so the file is left alone while nothing sells).
+An operator changing that field by hand is picked up as a restock (or
+correction) on the next flush. Leases of processes that died are returned to the pool.
+"""
+from __future__ import annotations
+import atexit
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from . import metrics
+from .db import json_transaction, load_json, load_json_versioned
+from .filelock import pid_alive
+
+logger = logging.getLogger(__name__)
+
+INVENTORY_JSON_FILE = 'inventory.json'
+PRODUCTS_JSON_FILE = 'products.json'
+
+INVENTORY_SYNC_SECONDS = metrics.histogram('lunara_inventory_sync_seconds',
+                                           'Time to reconcile local stock counters with the shared ledger.',
+                                           ('reason',))
+
+
+class OutOfStock(Exception):
+    """Not enough units of ``product_id`` to reserve ``requested``."""
+
+    def __init__(self, product_id: str, requested: int, available: int):
+        super().__init__(f"Only {available} of product {product_id} available, {requested} requested")
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+
+
+@dataclass
+class Reservation:
+    id: str
+    items: Dict[str, int]
+    expires_at: float  # time.monotonic()
+
+
+def _stock_of(product: Mapping[str, Any]) -> Optional[int]:
+    value = product.get('inventory')
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return max(0, int(value))
+
+
+class InventoryManager:
+    """Process-local stock counters for one data directory, synced with the shared ledger."""
+
+    def __init__(self, config, stripes: int = 64, ttl: float = 900.0, lease: int = 10,
+                 flush_interval: float = 1.0):
+        self.data_dir = config.get("DATA_DIR", "data")
+        self.ttl = float(ttl)
+        self.lease = max(1, int(lease))
+        self.flush_interval = max(0.05, float(flush_interval))
+        self._locks = [threading.Lock() for _ in range(max(1, int(stripes)))]
+        self._sync_lock = threading.Lock()
+        self._res_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._tracked: Tuple[Any, Dict[str, int]] = (None, {})
+        self._synced_version: Any = None  # products.json version as of the last publishing sync
+        self._reset_local()
+        self._stats = {'reserved': 0, 'committed': 0, 'released': 0, 'expired': 0, 'out_of_stock': 0,
+                       'ledger_syncs': 0, 'units_sold': 0}
+
+    def _reset_local(self) -> None:
+        self._pid = os.getpid()
+        self._owner = f"{socket.gethostname()}:{self._pid}"
+        self._avail: Dict[str, int] = {}  # units this process may reserve right now
+        self._held: Dict[str, int] = {}   # units leased to this process (free + reserved)
+        self._reservations: Dict[str, Reservation] = {}
+        self._sold_out: Dict[str, float] = {}  # product id -> monotonic time to re-check the ledger
+        self._dirty = False
+
+    def _ensure_process(self) -> None:
+        # A forked child must not sell units leased to its parent; it starts empty
+        if self._pid != os.getpid():
+            with self._sync_lock, self._res_lock:
+                if self._pid != os.getpid():
+                    self._reset_local()
+                    self._thread = None
+        if self._thread is None or not self._thread.is_alive():
+            with self._thread_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stop = threading.Event()
+                    self._thread = threading.Thread(target=self._run, name='inventory-sync', daemon=True)
+                    self._thread.start()
+
+    def _stripe(self, product_id: str) -> threading.Lock:
+        return self._locks[hash(product_id) % len(self._locks)]
+
+    def _stripes_for(self, product_ids) -> List[threading.Lock]:
+        # Always acquire in index order so multi-product carts cannot deadlock
+        indexes = sorted({hash(pid) % len(self._locks) for pid in product_ids})
+        return [self._locks[i] for i in indexes]
+
+    def tracked(self) -> Dict[str, int]:
+        """Product id -> inventory from products.json, for products that track stock."""
+        products, version = load_json_versioned(self.data_dir, PRODUCTS_JSON_FILE, [])
+        if self._tracked[0] != version:
+            self._tracked = (version, self._stock_levels(products))
+        return self._tracked[1]
+
+    # ------------------------------------------------------------ reservations
+    def reserve(self, items: Mapping[Any, int], ttl: Optional[float] = None) -> Reservation:
+        """Reserve ``{product id: quantity}`` all-or-nothing; raises OutOfStock.
+
+        Products without an ``inventory`` field are not limited.
+        """
+        self._ensure_process()
+        tracked = self.tracked()
+        wanted: Dict[str, int] = {}
+        for product_id, quantity in items.items():
+            product_id = str(product_id)
+            if product_id in tracked and quantity > 0:
+                wanted[product_id] = wanted.get(product_id, 0) + int(quantity)
+
+        while True:
+            short = self._take(wanted)
+            if not short:
+                break
+            # Sold-out products are not re-checked in the ledger until the next flush
+            now = time.monotonic()
+            exhausted = [pid for pid in short if self._sold_out.get(pid, 0.0) > now]
+            if not exhausted:
+                exhausted = self._sync(need={pid: wanted[pid] for pid in short}, reason='lease')
+                for pid in exhausted:
+                    self._sold_out[pid] = now + self.flush_interval
+            if exhausted:
+                product_id = exhausted[0]
+                with self._res_lock:
+                    self._stats['out_of_stock'] += 1
+                raise OutOfStock(product_id, wanted[product_id], self._avail.get(product_id, 0))
+
+        reservation = Reservation(uuid.uuid4().hex, wanted, time.monotonic() + (self.ttl if ttl is None else ttl))
+        with self._res_lock:
+            self._reservations[reservation.id] = reservation
+            self._stats['reserved'] += 1
+        return reservation
+
+    def _take(self, wanted: Dict[str, int]) -> Dict[str, int]:
+        """Decrement every counter or none; returns the shortfall per product (empty on success)."""
+        locks = self._stripes_for(wanted)
+        for lock in locks:
+            lock.acquire()
+        try:
+            short = {pid: qty - self._avail.get(pid, 0) for pid, qty in wanted.items()
+                     if self._avail.get(pid, 0) < qty}
+            if not short:
+                for pid, qty in wanted.items():
+                    self._avail[pid] -= qty
+            return short
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def _pop(self, reservation_id: str) -> Optional[Reservation]:
+        with self._res_lock:
+            return self._reservations.pop(reservation_id, None)
+
+    def commit(self, reservation_id: str) -> bool:
+        """Turn a reservation into a sale; False (and a warning) if it had already expired."""
+        reservation = self._pop(reservation_id)
+        if reservation is None:
+            logger.warning("Reservation %s expired before it was paid; its stock was already released",
+                           reservation_id)
+            return False
+        for pid, qty in reservation.items.items():
+            with self._stripe(pid):
+                self._held[pid] = self._held.get(pid, 0) - qty
+        with self._res_lock:
+            self._dirty = True
+            self._stats['committed'] += 1
+            self._stats['units_sold'] += sum(reservation.items.values())
+        return True
+
+    def release(self, reservation_id: str, expired: bool = False) -> None:
+        """Return a reservation's units; a no-op if it was already released or expired."""
+        reservation = self._pop(reservation_id)
+        if reservation is None:
+            return
+        for pid, qty in reservation.items.items():
+            with self._stripe(pid):
+                self._avail[pid] = self._avail.get(pid, 0) + qty
+        with self._res_lock:
+            self._stats['expired' if expired else 'released'] += 1
+
+    def expire(self) -> int:
+        """Release reservations past their TTL (abandoned checkouts); returns how many."""
+        now = time.monotonic()
+        with self._res_lock:
+            stale = [r.id for r in self._reservations.values() if r.expires_at <= now]
+        for reservation_id in stale:
+            self.release(reservation_id, expired=True)
+        return len(stale)
+
+    # ------------------------------------------------------------ ledger
+    def _sync(self, need: Optional[Dict[str, int]] = None, reason: str = 'flush', publish: bool = False) -> List[str]:
+        """Reconcile with the ledger: lease units for ``need``, otherwise return idle units.
+
+        Returns the products in ``need`` that the pool could not cover. With
+        ``publish`` the remaining stock is written to products.json, and hand
+        edits made there since the last publish are applied first.
+        """
+        need = need or {}
+        exhausted: List[str] = []
+        with self._sync_lock, INVENTORY_SYNC_SECONDS.time(reason=reason):
+            if self._pid != os.getpid():
+                return list(need)
+            with json_transaction(self.data_dir, INVENTORY_JSON_FILE, {}) as ledger:
+                pool: Dict[str, int] = ledger.setdefault('pool', {})
+                leases: Dict[str, Dict[str, int]] = ledger.setdefault('leases', {})
+                published: Dict[str, int] = ledger.setdefault('published', {})
+                if publish:
+                    # Read products.json fresh: a stale copy would look like a restock
+                    self._reconcile(self._stock_levels(load_json(self.data_dir, PRODUCTS_JSON_FILE, [])),
+                                    pool, published, restock=True)
+                else:
+                    self._reconcile(self.tracked(), pool, published, restock=False)
+                self._reap(leases, pool)
+                mine = leases.setdefault(self._owner, {})
+                if publish:
+                    with self._res_lock:
+                        self._dirty = False
+                for pid in set(self._held) | set(need):
+                    with self._stripe(pid):
+                        free = self._avail.get(pid, 0)
+                        if pid in need:
+                            missing = need[pid] - free
+                            if missing > 0:
+                                available = max(0, pool.get(pid, 0))
+                                grab = min(available, max(missing, min(self.lease, available // 8)))
+                                if grab < missing:
+                                    exhausted.append(pid)
+                                pool[pid] = pool.get(pid, 0) - grab
+                                self._avail[pid] = free + grab
+                                self._held[pid] = self._held.get(pid, 0) + grab
+                        elif free:
+                            pool[pid] = pool.get(pid, 0) + free
+                            self._avail[pid] = 0
+                            self._held[pid] -= free
+                        if self._held.get(pid):
+                            mine[pid] = self._held[pid]
+                        else:
+                            mine.pop(pid, None)
+                            self._held.pop(pid, None)
+                            self._avail.pop(pid, None)
+                if not mine:
+                    leases.pop(self._owner, None)
+                if publish:
+                    changed: Dict[str, int] = {}
+                    for pid in published:
+                        total = max(0, pool.get(pid, 0) + sum(lease.get(pid, 0) for lease in leases.values()))
+                        if published[pid] != total:
+                            published[pid] = changed[pid] = total
+                    if changed:
+                        self._publish(changed)
+                    self.tracked()
+                    self._synced_version = self._tracked[0]
+            with self._res_lock:
+                self._stats['ledger_syncs'] += 1
+        return exhausted
+
+    @staticmethod
+    def _stock_levels(products: List[Dict[str, Any]]) -> Dict[str, int]:
+        stock = {}
+        for product in products:
+            units = _stock_of(product)
+            if units is not None and product.get('id') is not None:
+                stock[str(product['id'])] = units
+        return stock
+
+    @staticmethod
+    def _reconcile(stock: Dict[str, int], pool: Dict[str, int], published: Dict[str, int], restock: bool) -> None:
+        # New products are seeded from products.json; a hand-edited inventory value is a restock
+        for pid, units in stock.items():
+            if pid not in published:
+                pool[pid] = pool.get(pid, 0) + units
+                published[pid] = units
+            elif restock and published[pid] != units:
+                logger.info("Inventory of product %s changed in products.json (%d -> %d); adjusting stock",
+                            pid, published[pid], units)
+                pool[pid] = pool.get(pid, 0) + units - published[pid]
+                published[pid] = units
+
+    def _reap(self, leases: Dict[str, Dict[str, int]], pool: Dict[str, int]) -> None:
+        host = socket.gethostname()
+        for owner in list(leases):
+            owner_host, _, pid = owner.rpartition(':')
+            if owner != self._owner and owner_host == host and pid.isdigit() and not pid_alive(int(pid)):
+                for product_id, units in leases.pop(owner).items():
+                    pool[product_id] = pool.get(product_id, 0) + units
+                logger.info("Returned stock leased by exited process %s", owner)
+
+    def _publish(self, totals: Dict[str, int]) -> None:
+        """Write remaining stock into products.json (under the ledger lock, so publishes stay ordered)."""
+        with json_transaction(self.data_dir, PRODUCTS_JSON_FILE, []) as products:
+            for product in products:
+                pid = str(product.get('id'))
+                if pid in totals and _stock_of(product) is not None:
+                    product['inventory'] = totals[pid]
+
+    def flush(self) -> None:
+        """Expire stale reservations, return idle units and publish stock levels.
+
+        products.json is only touched after sales (and then only for totals that
+        changed), so idle workers do not invalidate the catalog caches and ETags
+        built on it; a hand edit there is picked up as soon as its version changes.
+        """
+        self.expire()
+        if self._pid != os.getpid():
+            return
+        with self._res_lock:
+            dirty = self._dirty
+        self.tracked()
+        if dirty or self._tracked[0] != self._synced_version:
+            self._sync(publish=True)
+        elif any(list(self._avail.values())):
+            self._sync()
+
+    def _run(self) -> None:
+        stop = self._stop
+        while not stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Inventory sync failed; retrying in %.1fs", self.flush_interval)
+
+    def close(self) -> None:
+        """Release open reservations and hand every unit back to the ledger."""
+        self._stop.set()
+        if self._pid != os.getpid():
+            return
+        with self._res_lock:
+            open_ids = list(self._reservations)
+        for reservation_id in open_ids:
+            self.release(reservation_id)
+        if self._held or self._dirty:
+            self._sync(publish=True, reason='close')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._res_lock:
+            return dict(self._stats, open_reservations=len(self._reservations),
+                        units_available=sum(self._avail.values()), units_held=sum(self._held.values()))
+
+
+_MANAGERS: Dict[str, InventoryManager] = {}
+_MANAGERS_LOCK = threading.Lock()
+
+
+def get_inventory(config) -> InventoryManager:
+    data_dir = str(config.get("DATA_DIR", "data"))
+    with _MANAGERS_LOCK:
+        manager = _MANAGERS.get(data_dir)
+        if manager is None:
+            manager = _MANAGERS[data_dir] = InventoryManager(
+                config,
+                stripes=int(config.get("INVENTORY_LOCK_STRIPES", 64)),
+                ttl=float(config.get("INVENTORY_RESERVATION_TTL", 900)),
+                lease=int(config.get("INVENTORY_LEASE", 10)),
+                flush_interval=float(config.get("INVENTORY_FLUSH_INTERVAL", 1.0)),
+            )
+        return manager
+
+
+@atexit.register
+def close_inventories() -> None:
+    with _MANAGERS_LOCK:
+        managers = list(_MANAGERS.values())
+    for manager in managers:
+        try:
+            manager.close()
+        except Exception:  # pragma: no cover - best effort on shutdown
+            logger.exception("Failed to return leased inventory")
+
+
+def _inventory_samples() -> List[metrics.Sample]:
+    with _MANAGERS_LOCK:
+        managers = dict(_MANAGERS)
+    samples: List[metrics.Sample] = []
+    for data_dir, manager in managers.items():
+        samples.extend(metrics.mapping_samples('lunara_inventory', manager.stats(), {'data_dir': data_dir}))
+    return samples
+
+
+metrics.register_collector(_inventory_samples)
@@ -0,0 +1,526 @@
+"""Append-only JSONL journal storage for record collections (orders, tickets).
+
+Each collection keeps two files in the data directory:
+- ``<name>.json``  — the last compacted snapshot (a JSON array, one record per line)
+- ``<name>.jsonl`` — records appended since that snapshot, one JSON object per line
+
+Writes append a single line instead of rewriting the whole file. Appends are
+flushed immediately and fsync'ed in batches; the journal is periodically folded
+back into the snapshot. On open, the snapshot is loaded and the journal tail is
+replayed (last write wins per id); a torn final line left by a crash is dropped.
+
+Several processes may share the same files: appends, id assignment and
+compaction run under a cross-process file lock, and every read first picks up
+lines (or a new snapshot) written by other processes.
+
+``iter_collection`` streams a collection straight from its files (for exports
+and scans of histories too large to hold in memory), parsing the snapshot one
+record at a time with ``iter_json_array``.
+"""
+from __future__ import annotations
+import atexit
+import io
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .filelock import atomic_write_text, file_lock
+
+logger = logging.getLogger(__name__)
+
+
+class JournalStore:
+    """Id-keyed record collection backed by a JSON snapshot plus a JSONL journal."""
+
+    def __init__(self, data_dir: str, filename: str, key: str = 'id',
+                 fsync_every: int = 16, fsync_interval: float = 1.0, compact_every: int = 1000):
+        base = Path(data_dir)
+        base.mkdir(parents=True, exist_ok=True)
+        self.key = key
+        self.snapshot_path = base / filename
+        self.journal_path = self.snapshot_path.with_suffix('.jsonl')
+        # High-water mark of ids handed out by reserve_ids() but possibly not yet written
+        self.sequence_path = self.snapshot_path.with_suffix('.seq')
+        self.fsync_every = max(1, int(fsync_every))
+        self.fsync_interval = float(fsync_interval)
+        self.compact_every = max(1, int(compact_every))
+
+        self._lock = threading.RLock()
+        self._records: Dict[Any, Dict[str, Any]] = {}
+        # name -> (key function, key -> ids in insertion order)
+        self._indexes: Dict[str, Tuple[Callable[[Dict[str, Any]], Any], Dict[Any, List[Any]]]] = {}
+        self._max_id = 0
+        self._snapshot_sig: Optional[tuple] = None
+        self._journal_offset = 0
+        self._journal_count = 0
+        self._fh = None
+        self._pending = 0
+        self._last_fsync = time.monotonic()
+        with self._lock, file_lock(self.snapshot_path):
+            self._load(recover=True)
+
+    # ------------------------------------------------------------------ loading
+    def _stat_sig(self, path: Path) -> Optional[tuple]:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _load(self, recover: bool = False) -> None:
+        self._records = {}
+        for _, index in self._indexes.values():
+            index.clear()
+        self._max_id = 0
+        self._journal_offset = 0
+        self._journal_count = 0
+
+        if not self.snapshot_path.exists():
+            self._write_snapshot([])
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except json.JSONDecodeError:
+            aside = self.snapshot_path.with_name(f"{self.snapshot_path.name}.corrupt-{int(time.time())}")
+            logger.error("Snapshot %s is not valid JSON; moved aside to %s", self.snapshot_path, aside)
+            os.replace(self.snapshot_path, aside)
+            self._write_snapshot([])
+            snapshot = []
+        self._snapshot_sig = self._stat_sig(self.snapshot_path)
+        for record in snapshot:
+            self._apply(record)
+
+        self._replay(recover=recover)
+
+    def _replay(self, recover: bool = False) -> None:
+        """Apply journal lines past the current offset.
+
+        With ``recover`` set (only while holding the file lock, so no writer can
+        be mid-append), an undecodable or unterminated tail is truncated away:
+        it can only be a write torn by a crash.
+        """
+        try:
+            f = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(self._journal_offset)
+            offset = self._journal_offset
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                self._apply(record)
+                offset += len(line)
+                self._journal_count += 1
+            tail = f.seek(0, os.SEEK_END) - offset
+        self._journal_offset = offset
+        if recover and tail > 0:
+            logger.warning("Dropping %d byte(s) of torn journal tail in %s", tail, self.journal_path)
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(offset)
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        rid = record.get(self.key)
+        old = self._records.get(rid)
+        for key_fn, index in self._indexes.values():
+            new_key = key_fn(record)
+            if old is not None:
+                old_key = key_fn(old)
+                if old_key == new_key:
+                    continue
+                ids = index.get(old_key)
+                if ids is not None:
+                    ids.remove(rid)
+                    if not ids:
+                        del index[old_key]
+            if new_key is not None:
+                index.setdefault(new_key, []).append(rid)
+        self._records[rid] = record
+        if isinstance(rid, int) and rid > self._max_id:
+            self._max_id = rid
+
+    def _refresh(self) -> None:
+        """Pick up changes written by other processes sharing the same files."""
+        sig = self._stat_sig(self.snapshot_path)
+        journal_sig = self._stat_sig(self.journal_path)
+        journal_size = journal_sig[2] if journal_sig else 0
+        if sig != self._snapshot_sig or journal_size < self._journal_offset:
+            self._close_journal()
+            self._load()
+        elif journal_size > self._journal_offset:
+            self._replay()
+
+    # ------------------------------------------------------------------ writing
+    def _journal(self):
+        if self._fh is None:
+            self._fh = open(self.journal_path, 'ab')
+        return self._fh
+
+    def _close_journal(self) -> None:
+        if self._fh is not None:
+            self._sync(force=True)
+            self._fh.close()
+            self._fh = None
+
+    def _sync(self, force: bool = False) -> None:
+        if self._fh is None or self._pending == 0:
+            return
+        now = time.monotonic()
+        if force or self._pending >= self.fsync_every or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._fh.fileno())
+            self._pending = 0
+            self._last_fsync = now
+
+    def _write_snapshot(self, records: List[Dict[str, Any]]) -> None:
+        # A JSON array with one compact record per line: encoded by the C encoder
+        # (indent= would fall back to the pure-Python one) and still diffable
+        def chunks():
+            yield '['
+            for i, record in enumerate(records):
+                yield (',\n' if i else '\n') + json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+            yield '\n]\n'
+        atomic_write_text(self.snapshot_path, chunks())
+
+    def next_id(self) -> int:
+        """Highest integer id seen plus one.
+
+        Only a hint when several processes write: to get a unique id, append the
+        record with its key set to None and let ``append`` assign it under the lock.
+        """
+        with self._lock:
+            self._refresh()
+            return max(self._max_id, self._reserved()) + 1
+
+    def _reserved(self) -> int:
+        try:
+            return int(self.sequence_path.read_text(encoding='utf-8').strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def reserve_ids(self, count: int) -> range:
+        """Hand out ``count`` unused integer ids before their records are written.
+
+        The reservation is recorded in ``<name>.seq`` under the file lock, so
+        other processes (and ``append`` with a None key) never reuse the ids.
+        """
+        count = max(1, int(count))
+        with self._lock, file_lock(self.snapshot_path):
+            self._refresh()
+            start = max(self._max_id, self._reserved()) + 1
+            tmp = self.sequence_path.with_name(f".{self.sequence_path.name}.{os.getpid()}.tmp")
+            tmp.write_text(str(start + count - 1), encoding='utf-8')
+            os.replace(tmp, self.sequence_path)
+            return range(start, start + count)
+
+    def append(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Append (or overwrite by id) a single record."""
+        return self.append_many([record])[0]
+
+    def append_many(self, records: Iterable[Dict[str, Any]], compact: bool = True) -> List[Dict[str, Any]]:
+        """Append a batch of records as one write.
+
+        ``compact=False`` skips the compaction check, for bulk loads that call
+        ``compact()`` once at the end instead of rewriting the snapshot repeatedly.
+        """
+        records = list(records)
+        if not records:
+            return records
+        with self._lock, file_lock(self.snapshot_path):
+            self._refresh()
+            self._write_locked(records, compact)
+        return records
+
+    def add_new(self, records: Iterable[Dict[str, Any]], compact: bool = True) -> List[Dict[str, Any]]:
+        """Append only the records whose key is not stored yet; returns those.
+
+        The membership check and the write happen under one lock, so concurrent
+        writers (threads or processes) cannot both insert the same key.
+        """
+        with self._lock, file_lock(self.snapshot_path):
+            self._refresh()
+            fresh: Dict[Any, Dict[str, Any]] = {}
+            for record in records:
+                rid = record.get(self.key)
+                if rid is not None and rid not in self._records and rid not in fresh:
+                    fresh[rid] = record
+            added = list(fresh.values())
+            if added:
+                self._write_locked(added, compact)
+            return added
+
+    def add_unique(self, record: Dict[str, Any], index: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Append ``record`` unless the ``index`` index already holds ``value``; returns it, or None.
+
+        Like ``add_new`` for a secondary key: the check and the write happen
+        under one cross-process lock.
+        """
+        with self._lock, file_lock(self.snapshot_path):
+            self._refresh()
+            if self._indexes[index][1].get(value):
+                return None
+            self._write_locked([record], True)
+            return record
+
+    def _write_locked(self, records: List[Dict[str, Any]], compact: bool) -> None:
+        if any(record.get(self.key) is None for record in records):
+            next_id = max(self._max_id, self._reserved()) + 1
+            for record in records:
+                if record.get(self.key) is None:
+                    record[self.key] = next_id
+                    next_id += 1
+        payload = b''.join(
+            json.dumps(r, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+            for r in records
+        )
+        fh = self._journal()
+        fh.write(payload)
+        fh.flush()
+        self._pending += len(records)
+        self._sync()
+        for record in records:
+            self._apply(record)
+        self._journal_offset += len(payload)
+        self._journal_count += len(records)
+        if compact and self._journal_count >= self.compact_every:
+            self._compact()
+
+    def compact(self) -> None:
+        """Fold the journal into a fresh snapshot and truncate it."""
+        with self._lock, file_lock(self.snapshot_path):
+            self._compact()
+
+    def compact_if_due(self) -> None:
+        """Compact if the journal has reached ``compact_every`` lines (e.g. after ``compact=False`` appends)."""
+        with self._lock, file_lock(self.snapshot_path):
+            self._refresh()
+            if self._journal_count >= self.compact_every:
+                self._compact()
+
+    def rewrite(self, transform: Callable[[Dict[str, Any]], Dict[str, Any]]) -> int:
+        """Replace every record with ``transform(record)`` in one new snapshot; returns how many changed.
+
+        For schema migrations: the journal is folded in first, and nothing is
+        written when no record changes. The key must stay the same.
+        """
+        with self._lock, file_lock(self.snapshot_path):
+            self._refresh()
+            changed = 0
+            records: List[Dict[str, Any]] = []
+            for record in self._records.values():
+                new = transform(record)
+                if new is not record and new != record:
+                    changed += 1
+                records.append(new)
+            if changed:
+                self._write_snapshot(records)
+                self._close_journal()
+                with open(self.journal_path, 'wb'):
+                    pass
+                self._load()
+            return changed
+
+    def _compact(self) -> None:
+        self._refresh()
+        self._write_snapshot(list(self._records.values()))
+        self._close_journal()
+        with open(self.journal_path, 'wb'):
+            pass
+        self._snapshot_sig = self._stat_sig(self.snapshot_path)
+        self._journal_offset = 0
+        self._journal_count = 0
+
+    def flush(self) -> None:
+        """Force pending appends to disk."""
+        with self._lock:
+            self._sync(force=True)
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_journal()
+
+    # ------------------------------------------------------------------ reading
+    def add_index(self, name: str, key_fn: Callable[[Dict[str, Any]], Any]) -> None:
+        """Maintain an in-memory secondary index ``key_fn(record) -> ids`` (no-op if it exists)."""
+        with self._lock:
+            if name in self._indexes:
+                return
+            index: Dict[Any, List[Any]] = {}
+            for rid, record in self._records.items():
+                value = key_fn(record)
+                if value is not None:
+                    index.setdefault(value, []).append(rid)
+            self._indexes[name] = (key_fn, index)
+
+    def lookup(self, name: str, value: Any) -> List[Dict[str, Any]]:
+        """Records whose ``name`` index key equals ``value``, oldest first."""
+        with self._lock:
+            self._refresh()
+            ids = self._indexes[name][1].get(value, ())
+            return [self._records[rid] for rid in ids]
+
+    def lookup_range(self, name: str, value: Any, start: int, stop: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Slice ``[start:stop]`` of the ``lookup`` result plus the total match count, without materializing all matches."""
+        with self._lock:
+            self._refresh()
+            ids = self._indexes[name][1].get(value, [])
+            # Negative bounds would index from the end
+            return [self._records[rid] for rid in ids[max(0, start):max(0, stop)]], len(ids)
+
+    def get(self, record_id: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            return self._records.get(record_id)
+
+    def all(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            return list(self._records.values())
+
+    def filter(self, predicate: Callable[[Dict[str, Any]], bool]) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            return [r for r in self._records.values() if predicate(r)]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._records)
+
+
+# ---------------------------------------------------------------------- streaming
+def iter_json_array(f: IO[str], chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """Yield the elements of a JSON array read incrementally from text file ``f``.
+
+    Only the current element and one read chunk are held at a time, so memory
+    does not grow with the file. Raises ValueError on malformed input.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = '', 0, False
+
+    def more() -> bool:
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buf, pos = buf[pos:] + chunk, 0
+        return True
+
+    state = 'open'  # open -> first -> (value -> separator)*
+    while True:
+        while pos < len(buf) and buf[pos].isspace():
+            pos += 1
+        if pos >= len(buf):
+            if not more():
+                raise ValueError("unexpected end of JSON array")
+            continue
+        ch = buf[pos]
+        if state == 'open':
+            if ch != '[':
+                raise ValueError("expected a JSON array")
+            pos += 1
+            state = 'first'
+        elif state == 'separator':
+            if ch == ']':
+                return
+            if ch != ',':
+                raise ValueError(f"unexpected {ch!r} in JSON array")
+            pos += 1
+            state = 'value'
+        else:
+            if state == 'first' and ch == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Element cut off by the chunk boundary: read on and retry
+                if not more():
+                    raise
+                continue
+            if isinstance(item, (int, float)) and not eof and buf[end:].lstrip()[:1] not in (',', ']'):
+                more()  # a bare number may continue in the next chunk ("12" of "123")
+                continue
+            pos = end
+            state = 'separator'
+            yield item
+
+
+def iter_collection(data_dir: str, filename: str, key: str = 'id') -> Iterator[Dict[str, Any]]:
+    """Stream the current records of a collection without loading its snapshot.
+
+    The snapshot is opened and the journal (kept short by compaction) is read
+    under a shared lock, which gives a consistent view even if another process
+    compacts while the snapshot is being parsed. Journal versions replace their
+    snapshot records in place; records only in the journal come last.
+    """
+    snapshot_path = Path(data_dir) / filename
+    journal_path = snapshot_path.with_suffix('.jsonl')
+    newer: Dict[Any, Dict[str, Any]] = {}
+    with file_lock(snapshot_path, shared=True):
+        try:
+            snapshot: IO[str] = open(snapshot_path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            snapshot = io.StringIO('[]')
+        try:
+            with open(journal_path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    newer[record.get(key)] = record
+        except FileNotFoundError:
+            pass
+    with snapshot:
+        for record in iter_json_array(snapshot):
+            rid = record.get(key)
+            yield newer.pop(rid) if rid in newer else record
+    yield from newer.values()
+
+
+_STORES: Dict[Path, JournalStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_store(config, filename: str, key: str = 'id') -> JournalStore:
+    """Return the process-wide store for ``filename`` in the configured data dir.
+
+    ``STORAGE_MODE='json'`` keeps the legacy behaviour of rewriting the whole
+    file on every write (the journal is compacted after each append).
+    """
+    data_dir = config.get("DATA_DIR", "data")
+    path = (Path(data_dir) / filename).resolve()
+    with _STORES_LOCK:
+        store = _STORES.get(path)
+        if store is None:
+            compact_every = int(config.get("JOURNAL_COMPACT_EVERY", 1000))
+            if config.get("STORAGE_MODE", "journal") == "json":
+                compact_every = 1
+            store = JournalStore(
+                data_dir, filename, key=key,
+                fsync_every=int(config.get("JOURNAL_FSYNC_EVERY", 16)),
+                fsync_interval=float(config.get("JOURNAL_FSYNC_INTERVAL", 1.0)),
+                compact_every=compact_every,
+            )
+            _STORES[path] = store
+        return store
+
+
+@atexit.register
+def close_stores() -> None:
+    with _STORES_LOCK:
+        for store in _STORES.values():
+            try:
+                store.close()
+            except Exception:  # pragma: no cover - best effort on shutdown
+                logger.exception("Failed to close journal %s", store.journal_path)
@@ -0,0 +1,247 @@
+"""In-process metrics with Prometheus text exposition.
+
+Counters and histograms are recorded by the request hooks (``init_app``) and
+by the storage layer; collectors registered with ``register_collector`` add
+point-in-time gauges (pool sizes, cache hit counts) at scrape time. Values are
+per process: behind a preforking server each worker reports its own numbers,
+labelled with its pid.
+
+``init_app`` also provides an opt-in slow-request log (``METRICS_SLOW_REQUEST_MS``)
+and samples requests for cProfile (``METRICS_PROFILE_RATE``); profiles of slow
+sampled requests are written to ``METRICS_PROFILE_DIR`` as ``.prof`` files
+(view with ``python -m pstats`` or snakeviz).
+"""
+from __future__ import annotations
+import bisect
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.kind = 'counter'
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, '')) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in items]
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.kind = 'histogram'
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, '')) for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the wall time of the ``with`` block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        out: List[Sample] = []
+        for key, counts, total in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                out.append((self.name + '_bucket', dict(labels, le=_number(bound)), cumulative))
+            out.append((self.name + '_sum', labels, total))
+            out.append((self.name + '_count', labels, cumulative))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], List[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Re-registering returns the existing metric (modules may be reloaded)
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], List[Sample]]) -> None:
+        """Add a callable returning ``(name, labels, value)`` gauge samples at scrape time."""
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        pid = str(os.getpid())
+        lines: List[str] = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_labels(dict(labels, pid=pid))} {_number(value)}")
+        gauges: Dict[str, List[str]] = {}
+        for collector in collectors:
+            try:
+                samples = collector()
+            except Exception:
+                logger.exception("Metrics collector %r failed", collector)
+                continue
+            for name, labels, value in samples:
+                gauges.setdefault(name, []).append(f"{name}{_labels(dict(labels, pid=pid))} {_number(value)}")
+        for name, sample_lines in gauges.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(sample_lines)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+register_collector = REGISTRY.register_collector
+render = REGISTRY.render
+
+REQUEST_SECONDS = histogram('lunara_http_request_duration_seconds', 'HTTP request latency.',
+                            ('method', 'endpoint', 'status'))
+REQUESTS_TOTAL = counter('lunara_http_requests_total', 'HTTP requests handled.', ('method', 'endpoint', 'status'))
+SLOW_REQUESTS_TOTAL = counter('lunara_http_slow_requests_total', 'Requests slower than METRICS_SLOW_REQUEST_MS.',
+                              ('endpoint',))
+
+
+def mapping_samples(name: str, stats: Dict[str, Any], labels: Optional[Dict[str, str]] = None) -> List[Sample]:
+    """Turn a ``stats()`` dict into ``<name>_<key>`` gauge samples (numeric values only)."""
+    out: List[Sample] = []
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            out.append((f"{name}_{re.sub(r'[^a-zA-Z0-9_]', '_', key)}", dict(labels or {}), value))
+    return out
+
+
+# ---------------------------------------------------------------------- Flask
+_PROFILE_LOCK = threading.Lock()  # cProfile cannot profile two threads at once on 3.12+
+
+
+def init_app(app) -> None:
+    """Install request timing hooks (and optional slow log / profiling) on ``app``."""
+    from flask import g, request
+
+    slow_ms = float(app.config.get('METRICS_SLOW_REQUEST_MS', 0) or 0)
+    profile_rate = float(app.config.get('METRICS_PROFILE_RATE', 0) or 0)
+    profile_dir = Path(app.config.get('METRICS_PROFILE_DIR', 'profiles'))
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+        if profile_rate > 0 and random.random() < profile_rate and _PROFILE_LOCK.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # another profiler is active
+                _PROFILE_LOCK.release()
+                return
+            g._metrics_profiler = profiler
+
+    @app.after_request
+    def _record(response):
+        started = g.pop('_metrics_started', None)
+        profiler = g.pop('_metrics_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _PROFILE_LOCK.release()
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        # The route pattern (not the raw path) keeps label cardinality bounded
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        status = str(response.status_code)
+        REQUEST_SECONDS.observe(elapsed, method=request.method, endpoint=endpoint, status=status)
+        REQUESTS_TOTAL.inc(method=request.method, endpoint=endpoint, status=status)
+
+        slow = slow_ms > 0 and elapsed * 1000 >= slow_ms
+        if slow:
+            SLOW_REQUESTS_TOTAL.inc(endpoint=endpoint)
+            logger.warning("Slow request: %s %s -> %s in %.1f ms", request.method, request.full_path.rstrip('?'),
+                           status, elapsed * 1000)
+        if profiler is not None and (slow or slow_ms <= 0):
+            _dump_profile(profiler, profile_dir, request.method, endpoint, elapsed)
+        return response
+
+
+def _dump_profile(profiler: cProfile.Profile, directory: Path, method: str, endpoint: str, elapsed: float) -> None:
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r'[^a-zA-Z0-9]+', '_', endpoint).strip('_') or 'root'
+        path = directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{method}-{slug}-{int(elapsed * 1000)}ms.prof"
+        profiler.dump_stats(str(path))
+        logger.info("Wrote request profile %s", path)
+    except OSError as e:
+        logger.warning("Could not write request profile: %s", e)
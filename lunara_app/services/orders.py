@@ -0,0 +1,151 @@
+"""Order records: compact line items priced on the server, expanded on read.
+
+An order line stores only what the order needs to remain correct after the
+catalog changes::
+
+    {"product_id": 12, "quantity": 2, "unit_price": 2499}
+
+``price_items`` prices a cart from the in-memory price index (rebuilt when
+products.json changes), so neither the client's item blobs nor its amount are
+trusted or stored. ``expand_order`` joins the lines back to the current
+product details for the API, keeping the unit price paid. Orders written
+before this schema (full product copies per item) are read unchanged and can be
+rewritten in place with ``python -m lunara_app.tools.compact_orders``.
+"""
+from __future__ import annotations
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .catalog import get_catalog
+from .journal import JournalStore, get_store
+
+ORDERS_JSON_FILE = 'orders.json'
+
+# Product fields that describe the stock, not what was bought
+_LIVE_FIELDS = ('inventory',)
+
+
+class UnknownProduct(ValueError):
+    def __init__(self, product_id: Any):
+        super().__init__(f"unknown product {product_id!r}")
+        self.product_id = product_id
+
+
+def orders_store(config) -> JournalStore:
+    """Order store with a user_id -> order ids index (in creation order)."""
+    store = get_store(config, ORDERS_JSON_FILE)
+    store.add_index('user_id', lambda o: o.get('user_id'))
+    return store
+
+
+def _num(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _unit_price(value: float):
+    """Keep whole prices as ints, as products.json has them."""
+    return int(value) if float(value).is_integer() else round(value, 2)
+
+
+class PriceIndex:
+    """Product id (as a string) -> (product, unit price) for one products.json version."""
+
+    def __init__(self, products: Iterable[Dict[str, Any]]):
+        self.products: Dict[str, Tuple[Dict[str, Any], Any]] = {}
+        for p in products:
+            price = _num(p.get('price'))
+            if p.get('id') is not None and price is not None and price >= 0:
+                self.products[str(p['id'])] = (p, _unit_price(price))
+
+    def product(self, product_id: Any) -> Optional[Dict[str, Any]]:
+        entry = self.products.get(str(product_id))
+        return entry[0] if entry else None
+
+    def price(self, product_id: Any):
+        entry = self.products.get(str(product_id))
+        if entry is None:
+            raise UnknownProduct(product_id)
+        return entry[1]
+
+
+_INDEXES: Dict[str, Tuple[Tuple[int, int], PriceIndex]] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_price_index(data_dir: str) -> PriceIndex:
+    """Return the price index for the current products.json, rebuilding when it changes."""
+    catalog, version = get_catalog(data_dir)
+    with _INDEXES_LOCK:
+        cached = _INDEXES.get(data_dir)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    index = PriceIndex(catalog.products)
+    with _INDEXES_LOCK:
+        _INDEXES[data_dir] = (version, index)
+    return index
+
+
+def price_items(quantities: Mapping[Any, int], index: PriceIndex) -> Tuple[List[Dict[str, Any]], Any]:
+    """Compact order lines and their total for ``{product id: quantity}``; raises UnknownProduct."""
+    lines: List[Dict[str, Any]] = []
+    total = 0.0
+    for product_id, quantity in quantities.items():
+        unit_price = index.price(product_id)
+        product = index.product(product_id)
+        lines.append({'product_id': product['id'], 'quantity': int(quantity), 'unit_price': unit_price})
+        total += unit_price * int(quantity)
+    return lines, _unit_price(total)
+
+
+def _is_compact(item: Dict[str, Any]) -> bool:
+    return 'product_id' in item and 'unit_price' in item
+
+
+def compact_item(item: Dict[str, Any], index: PriceIndex) -> Dict[str, Any]:
+    """Compact line for a legacy (full product copy) item, keeping the price it was sold at.
+
+    The name is kept only when the product is no longer in the catalog, so the
+    line can still be shown.
+    """
+    if _is_compact(item):
+        return item
+    product_id = item.get('id')
+    price = _num(item.get('price'))
+    if product_id is None or price is None:
+        return item
+    try:
+        quantity = int(item.get('quantity') or 1)
+    except (TypeError, ValueError):
+        quantity = 1
+    line = {'product_id': product_id, 'quantity': quantity, 'unit_price': _unit_price(price)}
+    if index.product(product_id) is None and item.get('name'):
+        line['name'] = item['name']
+    return line
+
+
+def compact_order(order: Dict[str, Any], index: PriceIndex) -> Dict[str, Any]:
+    """``order`` with legacy items compacted (the same object if nothing changes)."""
+    items = order.get('items')
+    if not isinstance(items, list) or all(isinstance(it, dict) and _is_compact(it) for it in items):
+        return order
+    return dict(order, items=[compact_item(it, index) if isinstance(it, dict) else it for it in items])
+
+
+def expand_order(order: Dict[str, Any], index: PriceIndex) -> Dict[str, Any]:
+    """API view of an order: compact lines become product details plus ``price`` (paid) and ``quantity``."""
+    items = order.get('items')
+    if not isinstance(items, list) or not any(isinstance(it, dict) and _is_compact(it) for it in items):
+        return order
+    expanded = []
+    for item in items:
+        if not (isinstance(item, dict) and _is_compact(item)):
+            expanded.append(item)
+            continue
+        product = index.product(item['product_id'])
+        detail = {k: v for k, v in product.items() if k not in _LIVE_FIELDS} if product else {'name': item.get('name')}
+        detail.update(id=item['product_id'], price=item['unit_price'], quantity=item['quantity'])
+        expanded.append(detail)
+    return dict(order, items=expanded)
@@ -0,0 +1,36 @@
+"""Opaque cursor helpers for paginated API responses."""
+from __future__ import annotations
+import base64
+import json
+from typing import Any, Dict, Optional
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    raw = json.dumps(state, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Decode a cursor from encode_cursor; None/empty means "first page"."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursor(str(e)) from e
+    if not isinstance(state, dict):
+        raise InvalidCursor("cursor does not decode to an object")
+    return state
+
+
+def parse_limit(value: Optional[str], default: int = 20, maximum: int = 100) -> int:
+    try:
+        limit = int(value) if value not in (None, '') else default
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
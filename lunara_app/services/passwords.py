@@ -0,0 +1,183 @@
+"""Bounded worker pool for bcrypt hashing and verification.
+
+bcrypt releases the GIL, so a small thread pool runs password work in parallel
+while capping how many request threads can be tied up by it at once. When the
+pool is saturated, new work is refused immediately with PasswordQueueFull so the
+endpoint can answer 503 + Retry-After instead of queueing without bound.
+
+``hash`` and ``verify`` still block the calling request thread for the full
+bcrypt cost: the pool bounds how much bcrypt runs at once, not how long a
+request waits for it. Only the opportunistic rehash after a login
+(``verify_and_maybe_rehash``) finishes after the response.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from . import metrics
+
+
+class PasswordQueueFull(Exception):
+    """Raised when the password pool already has ``queue_limit`` jobs outstanding."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Password worker queue is full; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """Cost factor encoded in a bcrypt hash (``$2b$12$...`` -> 12)."""
+    parts = (hashed or '').split('$')
+    try:
+        return int(parts[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = 2, queue_limit: int = 32, rounds: int = 12):
+        self.workers = max(1, int(workers))
+        self.queue_limit = max(self.workers, int(queue_limit))
+        self.rounds = int(rounds)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid = None
+        self._outstanding = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._latencies: Deque[float] = deque(maxlen=512)  # seconds spent hashing
+        self._waits: Deque[float] = deque(maxlen=512)      # seconds spent queued
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Threads do not survive fork(); build the pool lazily in each process
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+            self._pid = os.getpid()
+            self._outstanding = self._running = 0
+        return self._executor
+
+    def _retry_after(self) -> int:
+        avg = (sum(self._latencies) / len(self._latencies)) if self._latencies else 0.25
+        return max(1, int(round(self._outstanding / self.workers * avg + 0.5)))
+
+    def submit(self, fn: Callable[..., Any], *args) -> Future:
+        """Queue ``fn(*args)`` on the pool or raise PasswordQueueFull."""
+        with self._lock:
+            pool = self._pool()
+            if self._outstanding >= self.queue_limit:
+                self._rejected += 1
+                raise PasswordQueueFull(self._retry_after())
+            self._outstanding += 1
+        queued_at = time.perf_counter()
+
+        def run():
+            started = time.perf_counter()
+            with self._lock:
+                self._running += 1
+                self._waits.append(started - queued_at)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._outstanding -= 1
+                    self._completed += 1
+                    self._latencies.append(time.perf_counter() - started)
+
+        try:
+            return pool.submit(run)
+        except Exception:
+            with self._lock:
+                self._outstanding -= 1
+            raise
+
+    def _submit_hash(self, password: str) -> Future:
+        import bcrypt
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self.submit(bcrypt.hashpw, password.encode('utf-8'), salt)
+
+    def hash(self, password: str) -> str:
+        """Hash at the configured cost; blocks until a worker has run it."""
+        return self._submit_hash(password).result().decode('utf-8')
+
+    def verify(self, password: str, hashed: str) -> bool:
+        """Check ``password`` against ``hashed``; blocks until a worker has run it."""
+        import bcrypt
+        if not hashed:
+            return False
+        return self.submit(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8')).result()
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return hash_rounds(hashed) != self.rounds
+
+    def verify_and_maybe_rehash(self, password: str, hashed: str, store: Callable[[str], Any]) -> bool:
+        """``verify``, then upgrade a hash of another cost without waiting for it.
+
+        On a match with an outdated cost the new hash is computed on the pool
+        and passed to ``store`` once done. A full pool skips the upgrade; the
+        next login tries again.
+        """
+        if not self.verify(password, hashed):
+            return False
+        if self.needs_rehash(hashed):
+            try:
+                future = self._submit_hash(password)
+            except PasswordQueueFull:
+                return True
+
+            def done(f: Future) -> None:
+                if f.exception() is None:
+                    store(f.result().decode('utf-8'))
+
+            future.add_done_callback(done)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            waits = list(self._waits)
+            return {
+                'workers': self.workers,
+                'queue_limit': self.queue_limit,
+                'rounds': self.rounds,
+                'in_flight': self._outstanding,
+                'queue_depth': self._outstanding - self._running,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'avg_ms': round(1000 * sum(latencies) / len(latencies), 2) if latencies else 0.0,
+                'p95_ms': round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 2) if latencies else 0.0,
+                'avg_wait_ms': round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+            }
+
+
+_HASHER: Optional[PasswordHasher] = None
+_HASHER_KEY: Optional[Tuple[int, int, int]] = None
+_HASHER_LOCK = threading.Lock()
+
+
+def get_hasher(config) -> PasswordHasher:
+    """Process-wide hasher configured from BCRYPT_ROUNDS / PASSWORD_WORKERS / PASSWORD_QUEUE_LIMIT."""
+    global _HASHER, _HASHER_KEY
+    key = (
+        int(config.get("PASSWORD_WORKERS", 2)),
+        int(config.get("PASSWORD_QUEUE_LIMIT", 32)),
+        int(config.get("BCRYPT_ROUNDS", 12)),
+    )
+    with _HASHER_LOCK:
+        if _HASHER is None or _HASHER_KEY != key:
+            _HASHER = PasswordHasher(workers=key[0], queue_limit=key[1], rounds=key[2])
+            _HASHER_KEY = key
+        return _HASHER
+
+
+def _hasher_samples() -> List[metrics.Sample]:
+    hasher = _HASHER
+    return metrics.mapping_samples('lunara_password_pool', hasher.stats()) if hasher is not None else []
+
+
+metrics.register_collector(_hasher_samples)
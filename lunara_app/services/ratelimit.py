@@ -0,0 +1,237 @@
+"""Token-bucket rate limiting for the expensive endpoints.
+
+Limits are set per Flask endpoint in ``RATE_LIMITS``, e.g.
+``"auth.login=10/60,chatbot.chatbot_ask=30/60"``: a bucket holds up to 10
+requests and refills at 10 per 60 seconds. Every request to a limited
+endpoint takes one token from the caller's IP bucket (the address forwarded by
+``TRUSTED_PROXY_HOPS`` proxies, see ``create_app``) and, once logged in,
+from the user's bucket as well. Tokens are taken from all of them or none: an
+empty bucket answers 429 with ``Retry-After`` (whole seconds until a token is
+available) without spending the others. CORS preflights (OPTIONS) are not
+counted.
+
+Buckets live in ``MemoryBuckets``, an LRU map bounded at ``RATE_LIMIT_MAX_KEYS``:
+each check is O(1) and the least recently seen keys are evicted first (an
+idle bucket has refilled, so dropping it changes nothing). Limits are then per
+worker process. With ``RATE_LIMIT_REDIS_URL`` (and the ``redis`` package) the
+buckets are shared by all workers through ``SharedBuckets``, which runs the
+same update as one Lua script; any object with redis-py's ``eval`` can stand
+in for the client. If the shared store fails, the local one is used.
+"""
+from __future__ import annotations
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import metrics
+
+try:
+    import redis  # type: ignore
+    _HAVE_REDIS = True
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+    _HAVE_REDIS = False
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = metrics.counter('lunara_rate_limited_total', 'Requests refused by the rate limiter.',
+                               ('endpoint', 'scope'))
+
+# (capacity, refill rate in tokens per second)
+Limit = Tuple[float, float]
+
+
+def parse_limits(spec: str) -> Dict[str, Limit]:
+    """``"endpoint=requests/seconds,..."`` -> {endpoint: (capacity, rate)}; ValueError if malformed."""
+    limits: Dict[str, Limit] = {}
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            endpoint, value = part.split('=', 1)
+            requests, seconds = value.split('/', 1)
+            capacity, period = float(requests), float(seconds.rstrip('s'))
+        except ValueError:
+            raise ValueError(f"invalid rate limit {part!r}; expected endpoint=requests/seconds") from None
+        if capacity <= 0 or period <= 0:
+            raise ValueError(f"invalid rate limit {part!r}; requests and seconds must be positive")
+        limits[endpoint.strip()] = (capacity, capacity / period)
+    return limits
+
+
+class MemoryBuckets:
+    """Token buckets in a size-bounded LRU map (O(1) per check)."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max(1, int(max_keys))
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def take(self, keys: List[str], capacity: float, rate: float, cost: float = 1.0) -> Tuple[Optional[int], float]:
+        """Take ``cost`` tokens from every bucket in ``keys`` or from none.
+
+        Returns (None, 0.0) when allowed, else (index of the first bucket that
+        is short, seconds until it would have the tokens).
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key in keys:
+                tokens, stamp = self._buckets.get(key, (capacity, now))
+                levels.append(min(capacity, tokens + (now - stamp) * rate))
+            short = next((i for i, tokens in enumerate(levels) if tokens < cost), None)
+            for key, tokens in zip(keys, levels):
+                self._buckets[key] = (tokens - cost if short is None else tokens, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evicted += 1
+        if short is None:
+            return None, 0.0
+        return short, (cost - levels[short]) / rate
+
+    def stats(self) -> Dict[str, Any]:
+        return {'keys': len(self._buckets), 'max_keys': self.max_keys, 'evicted': self.evicted}
+
+
+# KEYS buckets; ARGV capacity, rate, now, cost -> {index of the first short bucket (0 = none), wait (string)}
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local levels = {}
+local short = 0
+for i, key in ipairs(KEYS) do
+  local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(bucket[1]) or capacity
+  local stamp = tonumber(bucket[2]) or now
+  levels[i] = math.min(capacity, tokens + math.max(0, now - stamp) * rate)
+  if short == 0 and levels[i] < cost then
+    short = i
+  end
+end
+local wait = 0
+if short > 0 then
+  wait = (cost - levels[short]) / rate
+end
+for i, key in ipairs(KEYS) do
+  local tokens = levels[i]
+  if short == 0 then
+    tokens = tokens - cost
+  end
+  redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+  redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 1000)
+end
+return {short, tostring(wait)}
+"""
+
+
+class SharedBuckets:
+    """Token buckets kept in Redis (or anything with redis-py's ``eval``), shared by all workers.
+
+    Keys expire once a bucket would be full again, so the store holds only
+    recently active callers.
+    """
+
+    def __init__(self, client, prefix: str = 'lunara:rl:'):
+        self.client = client
+        self.prefix = prefix
+
+    def take(self, keys: List[str], capacity: float, rate: float, cost: float = 1.0) -> Tuple[Optional[int], float]:
+        short, wait = self.client.eval(_TAKE_SCRIPT, len(keys), *[self.prefix + k for k in keys],
+                                       capacity, rate, time.time(), cost)
+        return (int(short) - 1 if int(short) else None), float(wait)
+
+
+class RateLimiter:
+    def __init__(self, limits: Dict[str, Limit], local: MemoryBuckets, shared: Optional[SharedBuckets] = None):
+        self.limits = limits
+        self.local = local
+        self.shared = shared
+        self.shared_errors = 0
+
+    def _take(self, keys: List[str], limit: Limit) -> Tuple[Optional[int], float]:
+        if self.shared is not None:
+            try:
+                return self.shared.take(keys, *limit)
+            except Exception as e:
+                self.shared_errors += 1
+                if self.shared_errors % 100 == 1:  # once per outage, not once per request
+                    logger.warning("Shared rate limit store failed (%s); using the local one (%d errors)",
+                                   e, self.shared_errors)
+        return self.local.take(keys, *limit)
+
+    def check(self, endpoint: Optional[str], scopes: List[Tuple[str, str]]) -> Optional[Tuple[str, float]]:
+        """None if allowed, else (refusing scope, seconds to wait) for ``[(scope, caller id), ...]``."""
+        limit = self.limits.get(endpoint or '')
+        if limit is None:
+            return None
+        short, wait = self._take([f"{endpoint}:{scope}:{caller}" for scope, caller in scopes], limit)
+        if short is None:
+            return None
+        return scopes[short][0], wait
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.local.stats(), shared=int(self.shared is not None), shared_errors=self.shared_errors,
+                    endpoints=len(self.limits))
+
+
+def build_limiter(config) -> RateLimiter:
+    limits = parse_limits(config.get('RATE_LIMITS', ''))
+    local = MemoryBuckets(int(config.get('RATE_LIMIT_MAX_KEYS', 100000)))
+    shared = None
+    url = config.get('RATE_LIMIT_REDIS_URL')
+    if url:
+        if _HAVE_REDIS:
+            shared = SharedBuckets(redis.Redis.from_url(url, socket_timeout=0.5))
+        else:
+            logger.warning("RATE_LIMIT_REDIS_URL is set but the redis package is not installed; limits are per process")
+    return RateLimiter(limits, local, shared)
+
+
+def init_app(app, limiter: Optional[RateLimiter] = None) -> Optional[RateLimiter]:
+    """Enforce ``RATE_LIMITS`` on ``app`` (unless RATE_LIMIT_ENABLED is off); returns the limiter."""
+    from flask import jsonify, request, session
+
+    if not app.config.get('RATE_LIMIT_ENABLED', True):
+        return None
+    limiter = limiter or build_limiter(app.config)
+    if not limiter.limits:
+        return limiter
+    app.extensions['lunara_rate_limiter'] = limiter
+
+    @app.before_request
+    def _rate_limit():
+        if request.method == 'OPTIONS' or request.endpoint not in limiter.limits:
+            return None
+        scopes = [('ip', request.remote_addr or 'unknown')]
+        if session.get('user_id'):
+            scopes.append(('user', str(session['user_id'])))
+        refused = limiter.check(request.endpoint, scopes)
+        if refused is None:
+            return None
+        scope, wait = refused
+        RATE_LIMITED.inc(endpoint=request.endpoint, scope=scope)
+        resp = jsonify({'success': False, 'message': 'Too many requests. Please try again shortly.'})
+        resp.status_code = 429
+        resp.headers['Retry-After'] = str(max(1, math.ceil(wait)))
+        return resp
+
+    _ACTIVE[:] = [limiter]
+    return limiter
+
+
+_ACTIVE: List[RateLimiter] = []  # the most recently installed limiter, for /api/metrics
+
+
+def _rate_limit_samples() -> List[metrics.Sample]:
+    return [s for limiter in list(_ACTIVE) for s in metrics.mapping_samples('lunara_rate_limit', limiter.stats())]
+
+
+metrics.register_collector(_rate_limit_samples)
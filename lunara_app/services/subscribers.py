@@ -0,0 +1,220 @@
+"""Newsletter subscriber repository backed by the journal store.
+
+Subscribers are records keyed by email (``email``, ``subscribed_at``,
+``discount_code``, ``source``) in ``subscribers.json`` plus the
+``subscribers.jsonl`` journal, so membership is a dictionary lookup and a
+signup appends one line. A legacy ``subscribers.json`` holding a plain list of
+email strings is converted in place the first time the store is opened.
+
+Bulk import and export work in fixed-size batches so CSV/NDJSON syncs of
+hundreds of thousands of addresses neither buffer the whole payload nor hold
+the store lock for long.
+"""
+from __future__ import annotations
+import csv
+import io
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .filelock import atomic_write_json, file_lock
+from .journal import JournalStore, get_store, iter_collection
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBERS_JSON_FILE = 'subscribers.json'
+EXPORT_FIELDS = ('email', 'subscribed_at', 'discount_code', 'source')
+IMPORT_BATCH = 1000
+
+_MIGRATED: set = set()
+_MIGRATE_LOCK = threading.Lock()
+
+
+def normalize_email(email: Any) -> Optional[str]:
+    email = (str(email) if email is not None else '').strip().lower()
+    if not email or '@' not in email or len(email) > 254 or any(c.isspace() for c in email):
+        return None
+    return email
+
+
+def discount_code_for(email: str) -> str:
+    return f"LUNARA10-{email.split('@')[0][:3].upper()}"
+
+
+def new_subscriber(email: str, source: str = 'signup', subscribed_at: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        'email': email,
+        'subscribed_at': subscribed_at or datetime.now().isoformat(),
+        'discount_code': discount_code_for(email),
+        'source': source,
+    }
+
+
+def _is_legacy_list(path: Path) -> bool:
+    """True if the snapshot is a JSON array of strings (checked on its first element only)."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            head = f.read(4096).lstrip()
+    except FileNotFoundError:
+        return False
+    return head.startswith('[') and head[1:].lstrip().startswith('"')
+
+
+def _migrate_legacy(path: Path) -> None:
+    with file_lock(path):
+        if not _is_legacy_list(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            emails = json.load(f)
+        records: Dict[str, Dict[str, Any]] = {}
+        for email in emails:
+            email = normalize_email(email)
+            if email and email not in records:
+                records[email] = dict(new_subscriber(email, source='legacy'), subscribed_at=None)
+        atomic_write_json(path, list(records.values()))
+        logger.info("Migrated %d legacy subscriber(s) in %s to records", len(records), path)
+
+
+def get_subscriber_store(config) -> JournalStore:
+    path = (Path(config.get("DATA_DIR", "data")) / SUBSCRIBERS_JSON_FILE).resolve()
+    if path not in _MIGRATED:
+        with _MIGRATE_LOCK:
+            if path not in _MIGRATED:
+                _migrate_legacy(path)
+                _MIGRATED.add(path)
+    return get_store(config, SUBSCRIBERS_JSON_FILE, key='email')
+
+
+def add_subscriber(config, email: str, source: str = 'signup') -> Tuple[Dict[str, Any], bool]:
+    """Subscribe ``email`` (already normalized); returns (record, created)."""
+    store = get_subscriber_store(config)
+    existing = store.get(email)
+    if existing is not None:
+        return existing, False
+    added = store.add_new([new_subscriber(email, source=source)])
+    if added:
+        return added[0], True
+    return store.get(email), False
+
+
+# ---------------------------------------------------------------------- import
+def _csv_emails(lines: Iterable[str]) -> Iterator[Tuple[Any, Optional[str]]]:
+    """(raw email, subscribed_at) pairs from CSV lines; an ``email`` header row is optional."""
+    column, stamp_column = 0, None
+    for i, row in enumerate(csv.reader(lines)):
+        if not row:
+            continue
+        if i == 0:
+            header = [c.strip().lower() for c in row]
+            if 'email' in header:
+                column = header.index('email')
+                stamp_column = header.index('subscribed_at') if 'subscribed_at' in header else None
+                continue
+        yield (row[column] if column < len(row) else None,
+               row[stamp_column] or None if stamp_column is not None and stamp_column < len(row) else None)
+
+
+def _ndjson_emails(lines: Iterable[str]) -> Iterator[Tuple[Any, Optional[str]]]:
+    """(raw email, subscribed_at) pairs from NDJSON lines holding objects or bare strings."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError:
+            yield None, None
+            continue
+        if isinstance(item, dict):
+            yield item.get('email'), item.get('subscribed_at')
+        else:
+            yield item, None
+
+
+def decode_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Decode a byte stream (e.g. ``request.stream``) into text lines incrementally."""
+    reader = io.TextIOWrapper(io.BufferedReader(_ChunkReader(chunks)), encoding='utf-8-sig', newline='')
+    yield from reader
+
+
+class _ChunkReader(io.RawIOBase):
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def import_subscribers(config, lines: Iterable[str], fmt: str = 'csv', source: str = 'import') -> Dict[str, int]:
+    """Add subscribers from CSV or NDJSON lines; existing addresses are left unchanged."""
+    store = get_subscriber_store(config)
+    parse = _ndjson_emails if fmt == 'ndjson' else _csv_emails
+    counts = {'received': 0, 'imported': 0, 'existing': 0, 'invalid': 0}
+    batch: List[Dict[str, Any]] = []
+
+    def flush() -> None:
+        added = store.add_new(batch, compact=False)
+        counts['imported'] += len(added)
+        counts['existing'] += len(batch) - len(added)
+        batch.clear()
+
+    for raw, subscribed_at in parse(lines):
+        counts['received'] += 1
+        email = normalize_email(raw)
+        if email is None:
+            counts['invalid'] += 1
+            continue
+        batch.append(new_subscriber(email, source=source, subscribed_at=subscribed_at))
+        if len(batch) >= IMPORT_BATCH:
+            flush()
+    if batch:
+        flush()
+    store.compact_if_due()
+    return counts
+
+
+# ---------------------------------------------------------------------- export
+def _iter_subscribers(config) -> Iterator[Dict[str, Any]]:
+    # Stream from the files rather than the store's in-memory copy of every subscriber
+    get_subscriber_store(config)  # migrates a legacy file first
+    yield from iter_collection(str(config.get("DATA_DIR", "data")), SUBSCRIBERS_JSON_FILE, key='email')
+
+
+def export_csv(config) -> Iterator[str]:
+    """CSV export (with header), yielded in chunks of about IMPORT_BATCH rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(EXPORT_FIELDS)
+    for i, record in enumerate(_iter_subscribers(config), 1):
+        writer.writerow([record.get(f) or '' for f in EXPORT_FIELDS])
+        if i % IMPORT_BATCH == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_ndjson(config) -> Iterator[str]:
+    """NDJSON export, one subscriber object per line, yielded in chunks."""
+    lines: List[str] = []
+    for record in _iter_subscribers(config):
+        lines.append(json.dumps({f: record.get(f) for f in EXPORT_FIELDS}, ensure_ascii=False) + '\n')
+        if len(lines) >= IMPORT_BATCH:
+            yield ''.join(lines)
+            lines.clear()
+    yield ''.join(lines)
@@ -0,0 +1,169 @@
+"""Filtered, paginated and streamed reads of the support ticket history.
+
+Tickets are never loaded as a whole: MySQL rows come from an unbuffered
+(server-side) cursor in ``fetchmany`` batches, and the JSON store is parsed
+incrementally from its snapshot and journal (``journal.iter_collection``). A
+page of results is the ``limit`` highest ids below the cursor, selected with a
+bounded heap on JSON, so memory stays flat however long the history grows.
+"""
+from __future__ import annotations
+import heapq
+import json
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, FrozenSet, Iterator, List, Mapping, Optional, Tuple
+
+from .db import MYSQL_QUERY_SECONDS, TICKETS_JSON_FILE, ensure_data_dir, get_db_connection, mysql_ready
+from .journal import iter_collection
+
+logger = logging.getLogger(__name__)
+
+TICKET_FIELDS = ('id', 'name', 'email', 'question', 'sentiment', 'status', 'source', 'created_at')
+FETCH_BATCH = 500
+
+
+def _parse_time(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.strip().replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date or datetime") from None
+
+
+def _values(raw: Optional[str]) -> Optional[FrozenSet[str]]:
+    values = frozenset(v.strip() for v in (raw or '').split(',') if v.strip())
+    return values or None
+
+
+@dataclass(frozen=True)
+class TicketQuery:
+    """Ticket filters; each set matches any of its values, times are [since, until)."""
+
+    statuses: Optional[FrozenSet[str]] = None
+    sources: Optional[FrozenSet[str]] = None
+    sentiments: Optional[FrozenSet[str]] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+    @classmethod
+    def from_args(cls, args: Mapping[str, str]) -> "TicketQuery":
+        """Build from request args (``status=open,pending&source=chat&since=2025-01-01``); ValueError if invalid."""
+        return cls(
+            statuses=_values(args.get('status')),
+            sources=_values(args.get('source')),
+            sentiments=_values(args.get('sentiment')),
+            since=_parse_time(args.get('since'), 'since'),
+            until=_parse_time(args.get('until'), 'until'),
+        )
+
+    def matches(self, ticket: Dict[str, Any]) -> bool:
+        if self.statuses and ticket.get('status') not in self.statuses:
+            return False
+        if self.sources and ticket.get('source') not in self.sources:
+            return False
+        if self.sentiments and ticket.get('sentiment') not in self.sentiments:
+            return False
+        if self.since or self.until:
+            try:
+                created = _parse_time(ticket.get('created_at'), 'created_at')
+            except ValueError:
+                return False
+            if created is None:
+                return False
+            if self.since and created < self.since:
+                return False
+            if self.until and created >= self.until:
+                return False
+        return True
+
+    def where(self, before: Optional[int] = None) -> Tuple[str, List[Any]]:
+        """SQL WHERE clause (possibly empty) and its parameters."""
+        clauses: List[str] = []
+        params: List[Any] = []
+        for column, values in (('status', self.statuses), ('source', self.sources), ('sentiment', self.sentiments)):
+            if values:
+                clauses.append(f"{column} IN ({', '.join(['%s'] * len(values))})")
+                params.extend(sorted(values))
+        if self.since:
+            clauses.append("created_at >= %s")
+            params.append(self.since)
+        if self.until:
+            clauses.append("created_at < %s")
+            params.append(self.until)
+        if before is not None:
+            clauses.append("id < %s")
+            params.append(before)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    ticket = {f: row.get(f) for f in TICKET_FIELDS}
+    if isinstance(ticket['created_at'], (datetime, date)):
+        ticket['created_at'] = ticket['created_at'].isoformat()
+    return ticket
+
+
+def _iter_mysql(config, sql: str, params: List[Any], query_name: str) -> Iterator[Dict[str, Any]]:
+    with get_db_connection(config) as conn:
+        cur = conn.cursor(dictionary=True, buffered=False)  # rows stay on the server until fetched
+        with MYSQL_QUERY_SECONDS.time(query=query_name):
+            cur.execute(sql, params)
+        try:
+            while True:
+                rows = cur.fetchmany(FETCH_BATCH)
+                if not rows:
+                    break
+                for row in rows:
+                    yield _from_row(row)
+        finally:
+            cur.close()
+
+
+def _iter_json(config, query: TicketQuery, before: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    data_dir = ensure_data_dir(config.get("DATA_DIR", "data"))
+    for ticket in iter_collection(str(data_dir), TICKETS_JSON_FILE):
+        if before is not None and not (isinstance(ticket.get('id'), int) and ticket['id'] < before):
+            continue
+        if query.matches(ticket):
+            yield {f: ticket.get(f) for f in TICKET_FIELDS}
+
+
+def iter_tickets(config, query: TicketQuery) -> Iterator[Dict[str, Any]]:
+    """Every matching ticket, oldest id first on MySQL and in storage order on JSON."""
+    if mysql_ready(config):
+        where, params = query.where()
+        return _iter_mysql(config, f"SELECT {', '.join(TICKET_FIELDS)} FROM support_tickets{where} ORDER BY id",
+                           params, 'export_tickets')
+    return _iter_json(config, query)
+
+
+def query_tickets(config, query: TicketQuery, limit: int = 50,
+                  before: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Newest-first page of matching tickets with ids below ``before``; returns (page, next ``before``)."""
+    page: Optional[List[Dict[str, Any]]] = None
+    if mysql_ready(config):
+        where, params = query.where(before)
+        sql = f"SELECT {', '.join(TICKET_FIELDS)} FROM support_tickets{where} ORDER BY id DESC LIMIT %s"
+        try:
+            page = list(_iter_mysql(config, sql, params + [limit + 1], 'query_tickets'))
+        except Exception as e:
+            logger.warning("Querying tickets in MySQL failed (%s); reading the JSON store", e)
+    if page is None:
+        page = heapq.nlargest(limit + 1, _iter_json(config, query, before),
+                              key=lambda t: t['id'] if isinstance(t['id'], int) else -1)
+    if len(page) > limit:
+        return page[:limit], page[limit - 1]['id']
+    return page, None
+
+
+def export_ndjson(config, query: TicketQuery) -> Iterator[str]:
+    """NDJSON export of matching tickets, yielded in chunks of about FETCH_BATCH lines."""
+    lines: List[str] = []
+    for ticket in iter_tickets(config, query):
+        lines.append(json.dumps(ticket, ensure_ascii=False, default=str) + '\n')
+        if len(lines) >= FETCH_BATCH:
+            yield ''.join(lines)
+            lines.clear()
+    yield ''.join(lines)
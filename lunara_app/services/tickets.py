@@ -0,0 +1,383 @@
+"""Support ticket creation with pre-allocated ids and a write-behind queue.
+
+Ticket ids are reserved in small blocks before anything is written — from the
+``support_ticket_seq`` table when MySQL is up, otherwise from the JSON store's
+sequence file — so a chat reply can quote a real ticket number right away.
+``TicketWriter`` then persists queued tickets on a background thread in
+batches: one ``executemany`` per batch for MySQL, one journal append per batch
+for JSON. The queue is bounded; when it is full the ticket is written inline
+instead. Pending tickets are flushed at interpreter exit (and by the gunicorn
+``worker_exit`` hook in ``serve``).
+
+A batch that cannot be written even to JSON is parked in
+``support_tickets.failed.jsonl`` rather than dropped (its ids were already
+quoted to customers). The writer thread replays parked tickets when it starts
+and then with backoff (1s doubling to a minute) until they are stored.
+"""
+from __future__ import annotations
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+from . import metrics
+from .db import MYSQL_QUERY_SECONDS, TICKETS_JSON_FILE, get_db_connection, mysql_ready
+from .filelock import file_lock
+from .journal import get_store
+
+logger = logging.getLogger(__name__)
+
+TICKET_FLUSH_SECONDS = metrics.histogram('lunara_ticket_flush_seconds', 'Time to persist one batch of tickets.',
+                                         ('backend',))
+TICKETS_WRITTEN = metrics.counter('lunara_tickets_written_total', 'Tickets persisted, by backend.', ('backend',))
+
+PARKED_TICKETS_FILE = 'support_tickets.failed.jsonl'
+REPLAY_MAX_DELAY = 60.0
+
+_INSERT_SQL = ("INSERT INTO support_tickets (id, name, email, question, sentiment, status, source, created_at) "
+               "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)")
+
+
+def build_ticket(ticket_id: int, name: Optional[str], email: Optional[str], question: str, sentiment: str,
+                 status: str = 'open', source: str = 'chat') -> Dict[str, Any]:
+    return {
+        'id': ticket_id,
+        'name': name,
+        'email': email,
+        'question': question,
+        'sentiment': sentiment,
+        'status': status,
+        'source': source,
+        'created_at': datetime.now().isoformat()
+    }
+
+
+class TicketIdAllocator:
+    """Hands out ticket ids from locally cached blocks reserved in MySQL or the JSON store."""
+
+    def __init__(self, config, block: int = 16):
+        self.config = config
+        self.block = max(1, int(block))
+        self._ids: Deque[int] = deque()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _reserve_mysql(self, count: int) -> range:
+        with get_db_connection(self.config) as conn, MYSQL_QUERY_SECONDS.time(query='reserve_ticket_ids'):
+            cur = conn.cursor()
+            # LAST_INSERT_ID(expr) makes the new value readable on this connection only,
+            # so concurrent reservations never see each other's numbers
+            cur.execute("UPDATE support_ticket_seq SET next_id = LAST_INSERT_ID(next_id + %s) WHERE id = 1", (count,))
+            cur.execute("SELECT LAST_INSERT_ID()")
+            (end,) = cur.fetchone()
+            conn.commit()
+            cur.close()
+        return range(int(end) - count, int(end))
+
+    def _reserve(self, count: int) -> range:
+        if mysql_ready(self.config):
+            try:
+                return self._reserve_mysql(count)
+            except Exception as e:
+                logger.warning("Reserving ticket ids in MySQL failed (%s); using the JSON store", e)
+        return get_store(self.config, TICKETS_JSON_FILE).reserve_ids(count)
+
+    def next_id(self) -> int:
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked child must not reuse ids its parent still holds
+                self._ids.clear()
+                self._pid = os.getpid()
+            if not self._ids:
+                self._ids.extend(self._reserve(self.block))
+            return self._ids.popleft()
+
+
+def _insert_mysql(config, tickets: List[Dict[str, Any]]) -> None:
+    with get_db_connection(config) as conn, MYSQL_QUERY_SECONDS.time(query='insert_tickets'):
+        cur = conn.cursor()
+        cur.executemany(_INSERT_SQL, [
+            (t['id'], t['name'], t['email'], t['question'], t['sentiment'], t['status'], t['source'],
+             t['created_at'].replace('T', ' ')) for t in tickets
+        ])
+        conn.commit()
+        cur.close()
+
+
+def write_tickets(config, tickets: List[Dict[str, Any]]) -> str:
+    """Persist tickets that already carry ids as one batch; returns the backend used."""
+    if mysql_ready(config):
+        try:
+            with TICKET_FLUSH_SECONDS.time(backend='mysql'):
+                _insert_mysql(config, tickets)
+            TICKETS_WRITTEN.inc(len(tickets), backend='mysql')
+            return 'mysql'
+        except Exception as e:
+            logger.warning("Inserting %d ticket(s) into MySQL failed (%s); writing them to JSON", len(tickets), e)
+    with TICKET_FLUSH_SECONDS.time(backend='json'):
+        get_store(config, TICKETS_JSON_FILE).append_many(tickets)
+    TICKETS_WRITTEN.inc(len(tickets), backend='json')
+    return 'json'
+
+
+class TicketWriter:
+    """Bounded write-behind queue that persists tickets in batches on a daemon thread."""
+
+    def __init__(self, config, maxsize: int = 1000, batch_size: int = 100, linger: float = 0.05):
+        self.config = config
+        self.batch_size = max(1, int(batch_size))
+        self.linger = max(0.0, float(linger))
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max(1, int(maxsize)))
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._stopping = False
+        self._submitted = 0
+        self._written = 0
+        self._inline = 0
+        self._failed = 0
+        self._parked = 0
+        self._replayed = 0
+        self._batches = 0
+        self._replay_at = 0.0
+        self._replay_delay = 1.0
+        self._flush_latencies: Deque[float] = deque(maxlen=256)
+
+    def _ensure_thread(self) -> None:
+        # Threads do not survive fork(); start the writer lazily in each process
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='ticket-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, ticket: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a ticket (with its id already set); written inline if the queue is full."""
+        self._ensure_thread()
+        with self._lock:
+            self._submitted += 1
+        try:
+            self._queue.put_nowait(ticket)
+        except queue.Full:
+            with self._lock:
+                self._inline += 1
+            self._write([ticket])
+        return ticket
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        try:
+            write_tickets(self.config, batch)
+        except Exception:
+            logger.exception("Failed to persist %d ticket(s): %s", len(batch), [t['id'] for t in batch])
+            self._park(batch)
+            return
+        with self._lock:
+            self._written += len(batch)
+            self._batches += 1
+            self._flush_latencies.append(time.perf_counter() - started)
+
+    # ------------------------------------------------------------ parked tickets
+    def _parked_path(self) -> Path:
+        return Path(self.config.get("DATA_DIR", "data")) / PARKED_TICKETS_FILE
+
+    def _park(self, batch: List[Dict[str, Any]]) -> None:
+        path = self._parked_path()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with file_lock(path), open(path, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(t, ensure_ascii=False) + '\n' for t in batch))
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            logger.exception("Could not park %d ticket(s); they are lost: %s", len(batch), batch)
+            with self._lock:
+                self._failed += len(batch)
+            return
+        logger.warning("Parked %d ticket(s) in %s; they are written again later", len(batch), path)
+        with self._lock:
+            self._parked += len(batch)
+
+    def replay_parked(self) -> int:
+        """Write tickets parked by failed batches (of any process); returns how many were stored.
+
+        The parked file is removed only once its tickets are stored, so a
+        failure leaves it for the next attempt.
+        """
+        path = self._parked_path()
+        if not path.exists():
+            return 0
+        tickets: List[Dict[str, Any]] = []
+        with file_lock(path):
+            try:
+                lines = path.read_text(encoding='utf-8').splitlines()
+            except FileNotFoundError:
+                return 0
+            for line in lines:
+                try:
+                    tickets.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning("Skipping a torn line in %s", path)
+            if tickets:
+                write_tickets(self.config, tickets)
+            path.unlink()
+        if tickets:
+            logger.info("Stored %d parked ticket(s)", len(tickets))
+            with self._lock:
+                self._replayed += len(tickets)
+        return len(tickets)
+
+    def _maybe_replay(self) -> None:
+        if time.monotonic() < self._replay_at:
+            return
+        try:
+            self.replay_parked()
+        except Exception as e:
+            logger.warning("Replaying parked tickets failed (%s); retrying in %.0fs", e, self._replay_delay)
+            self._replay_at = time.monotonic() + self._replay_delay
+            self._replay_delay = min(self._replay_delay * 2, REPLAY_MAX_DELAY)
+        else:
+            self._replay_delay = 1.0
+
+    def _run(self) -> None:
+        while True:
+            self._maybe_replay()
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stopping:
+                    return
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued ticket has been written; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Flush pending tickets and stop the writer thread."""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            # No live writer in this process: persist whatever is queued directly
+            batch = []
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    self._queue.task_done()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            self._maybe_replay()
+            return
+        if not self.flush(timeout):
+            logger.error("Timed out flushing %d queued ticket(s)", self._queue.qsize())
+        self._stopping = True
+        thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._flush_latencies)
+            return {
+                'queue_depth': self._queue.qsize(),
+                'queue_limit': self._queue.maxsize,
+                'submitted': self._submitted,
+                'written': self._written,
+                'written_inline': self._inline,
+                'failed': self._failed,
+                'parked': self._parked,
+                'replayed': self._replayed,
+                'batches': self._batches,
+                'avg_flush_ms': round(1000 * sum(latencies) / len(latencies), 2) if latencies else 0.0,
+                'max_flush_ms': round(1000 * latencies[-1], 2) if latencies else 0.0,
+            }
+
+
+_ALLOCATORS: Dict[str, TicketIdAllocator] = {}
+_WRITERS: Dict[str, TicketWriter] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_id_allocator(config) -> TicketIdAllocator:
+    data_dir = str(config.get("DATA_DIR", "data"))
+    with _REGISTRY_LOCK:
+        allocator = _ALLOCATORS.get(data_dir)
+        if allocator is None:
+            allocator = _ALLOCATORS[data_dir] = TicketIdAllocator(config, int(config.get("TICKET_ID_BLOCK", 16)))
+        return allocator
+
+
+def get_ticket_writer(config) -> TicketWriter:
+    """Process-wide writer for the configured data dir / database."""
+    data_dir = str(config.get("DATA_DIR", "data"))
+    with _REGISTRY_LOCK:
+        writer = _WRITERS.get(data_dir)
+        if writer is None:
+            writer = _WRITERS[data_dir] = TicketWriter(
+                config,
+                maxsize=int(config.get("TICKET_QUEUE_SIZE", 1000)),
+                batch_size=int(config.get("TICKET_BATCH_SIZE", 100)),
+                linger=float(config.get("TICKET_FLUSH_LINGER", 0.05)),
+            )
+        return writer
+
+
+def enqueue_ticket(config, name: Optional[str], email: Optional[str], question: str, sentiment: str,
+                   status: str = 'open', source: str = 'chat') -> int:
+    """Create a ticket without waiting for storage; returns its (already final) id."""
+    ticket = build_ticket(get_id_allocator(config).next_id(), name, email, question, sentiment, status, source)
+    if not config.get("TICKET_WRITE_BEHIND", True):
+        write_tickets(config, [ticket])
+    else:
+        get_ticket_writer(config).submit(ticket)
+    return int(ticket['id'])
+
+
+@atexit.register
+def close_ticket_writers() -> None:
+    with _REGISTRY_LOCK:
+        writers = list(_WRITERS.values())
+    for writer in writers:
+        try:
+            writer.close()
+        except Exception:  # pragma: no cover - best effort on shutdown
+            logger.exception("Failed to flush ticket writer")
+
+
+def _writer_samples() -> List[metrics.Sample]:
+    with _REGISTRY_LOCK:
+        writers = dict(_WRITERS)
+    samples: List[metrics.Sample] = []
+    for data_dir, writer in writers.items():
+        samples.extend(metrics.mapping_samples('lunara_ticket_queue', writer.stats(), {'data_dir': data_dir}))
+    return samples
+
+
+metrics.register_collector(_writer_samples)
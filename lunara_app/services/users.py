@@ -0,0 +1,42 @@
+"""User repository backed by the journal store.
+
+Users live in ``users.json`` (snapshot) plus ``users.jsonl`` (appended since the
+last compaction). The store keeps users by id in memory and an email index on
+top, so lookups by id or email are dictionary hits and registering a user
+appends a single line instead of rewriting the whole list.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Optional
+
+from .journal import JournalStore, get_store
+
+USERS_JSON_FILE = 'users.json'
+
+
+def get_user_store(config) -> JournalStore:
+    store = get_store(config, USERS_JSON_FILE)
+    store.add_index('email', lambda u: (u.get('email') or '').lower() or None)
+    return store
+
+
+def find_user_by_id(config, user_id: str) -> Optional[Dict[str, Any]]:
+    return get_user_store(config).get(user_id)
+
+
+def find_user_by_email(config, email: str) -> Optional[Dict[str, Any]]:
+    matches = get_user_store(config).lookup('email', (email or '').lower())
+    return matches[0] if matches else None
+
+
+def create_user(config, user: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Persist a new user; returns None if the email is already registered.
+
+    The email check and the append share the store's file lock, so concurrent
+    registrations in different worker processes cannot both succeed.
+    """
+    return get_user_store(config).add_unique(user, 'email', (user.get('email') or '').lower() or None)
+
+
+def update_user(config, user: Dict[str, Any]) -> Dict[str, Any]:
+    """Overwrite a stored user record (matched by id)."""
+    return get_user_store(config).append(user)
@@ -0,0 +1,127 @@
+"""Build minified, fingerprinted and precompressed JS/CSS bundles.
+
+For each source asset this writes ``static/dist/<dir>/<name>.<hash>.<ext>`` plus
+``.gz`` (and ``.br`` when the optional ``brotli`` package is installed), and
+records the mapping in ``static/dist/manifest.json`` for the ``asset_url``
+template helper.
+
+Usage:
+    python -m lunara_app.tools.build_assets [--static-dir static]
+"""
+from __future__ import annotations
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import brotli  # type: ignore
+    BROTLI_AVAILABLE = True
+except Exception:  # pragma: no cover - optional dependency
+    brotli = None  # type: ignore
+    BROTLI_AVAILABLE = False
+
+from ..services.assets import DIST_DIR, MANIFEST_FILE
+
+logger = logging.getLogger("lunara_app.build_assets")
+
+ASSETS = ['js/script.js', 'js/chatbot.js', 'css/styles.css', 'css/chatbot.css']
+
+
+def minify_css(source: str) -> str:
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.S)
+    source = re.sub(r"\s+", " ", source)
+    source = re.sub(r"\s*([{};,])\s*", r"\1", source)
+    return source.replace(";}", "}").strip()
+
+
+def minify_js(source: str) -> str:
+    """Conservative line-level minifier.
+
+    Drops indentation, blank lines and whole-line comments while keeping line
+    breaks (so automatic semicolon insertion is unaffected) and leaving the
+    contents of multi-line template literals untouched.
+    """
+    out: List[str] = []
+    in_template = False
+    in_comment = False
+    for line in source.splitlines():
+        if in_template:
+            out.append(line)
+        else:
+            stripped = line.strip()
+            if in_comment:
+                if '*/' in stripped:
+                    in_comment = False
+                    stripped = stripped.split('*/', 1)[1].strip()
+                else:
+                    continue
+            if stripped.startswith('/*'):
+                if '*/' not in stripped:
+                    in_comment = True
+                    continue
+                stripped = stripped.split('*/', 1)[1].strip()
+            if not stripped or stripped.startswith('//'):
+                continue
+            out.append(stripped)
+        if len(re.findall(r"(?<!\\)`", line)) % 2:
+            in_template = not in_template
+    return '\n'.join(out) + '\n'
+
+
+def _write_variants(path: Path, data: bytes) -> None:
+    path.write_bytes(data)
+    with open(str(path) + '.gz', 'wb') as raw:
+        # mtime=0 keeps the output byte-for-byte reproducible
+        with gzip.GzipFile(filename='', mode='wb', compresslevel=9, fileobj=raw, mtime=0) as gz:
+            gz.write(data)
+    if BROTLI_AVAILABLE:
+        Path(str(path) + '.br').write_bytes(brotli.compress(data, quality=11))
+
+
+def build(static_dir: Path, assets: Optional[List[str]] = None) -> Dict[str, str]:
+    """Build all assets into ``static_dir/dist`` and return the manifest."""
+    dist = static_dir / DIST_DIR
+    if dist.exists():
+        shutil.rmtree(dist)
+    dist.mkdir(parents=True)
+
+    manifest: Dict[str, str] = {}
+    for name in assets or ASSETS:
+        source = (static_dir / name).read_text(encoding='utf-8')
+        minified = minify_css(source) if name.endswith('.css') else minify_js(source)
+        data = minified.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        stem, ext = os.path.splitext(name)
+        hashed = f"{stem}.{digest}{ext}"
+        target = dist / hashed
+        target.parent.mkdir(parents=True, exist_ok=True)
+        _write_variants(target, data)
+        manifest[name] = hashed
+        logger.info("%s -> %s (%d -> %d bytes)", name, hashed, len(source.encode('utf-8')), len(data))
+
+    tmp = dist / (MANIFEST_FILE + '.tmp')
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding='utf-8')
+    os.replace(tmp, dist / MANIFEST_FILE)
+    if not BROTLI_AVAILABLE:
+        logger.info("brotli not installed; wrote gzip variants only")
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed static bundles.")
+    parser.add_argument('--static-dir', default=str(Path(__file__).resolve().parents[2] / 'static'))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    build(Path(args.static_dir))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
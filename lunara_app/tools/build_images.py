@@ -0,0 +1,134 @@
+"""Generate responsive derivatives for static/images.
+
+For every JPEG/PNG in ``static/images`` this writes downscaled copies at the
+fixed WIDTHS (in the source format and as WebP) plus a full-size WebP into
+``static/images/derived``. Results are recorded in ``manifest.json`` keyed by
+source file and its SHA-256, so unchanged images are skipped on later runs.
+Requires the optional Pillow package.
+
+Usage:
+    python -m lunara_app.tools.build_images [--static-dir static] [--force]
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    from PIL import Image  # type: ignore
+    PIL_AVAILABLE = True
+except Exception:  # pragma: no cover - optional dependency
+    Image = None  # type: ignore
+    PIL_AVAILABLE = False
+
+from ..services.images import DERIVED_DIR, IMAGES_DIR, MANIFEST_FILE
+
+logger = logging.getLogger("lunara_app.build_images")
+
+WIDTHS = (320, 640, 960)
+SOURCE_FORMATS = {'.jpg': 'jpeg', '.jpeg': 'jpeg', '.png': 'png'}
+EXTENSIONS = {'jpeg': '.jpg', 'png': '.png', 'webp': '.webp'}
+SAVE_OPTIONS: Dict[str, Dict[str, Any]] = {
+    'jpeg': {'quality': 82, 'optimize': True, 'progressive': True},
+    'png': {'optimize': True},
+    'webp': {'quality': 80, 'method': 6},
+}
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _save(img, target: Path, fmt: str) -> None:
+    if fmt == 'jpeg' and img.mode != 'RGB':
+        img = img.convert('RGB')
+    elif fmt == 'webp' and img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+    tmp = target.with_name(target.name + '.tmp')
+    img.save(tmp, format=fmt.upper(), **SAVE_OPTIONS[fmt])
+    os.replace(tmp, target)
+
+
+def _process(source: Path, digest: str, out_dir: Path) -> Dict[str, Any]:
+    fmt = SOURCE_FORMATS[source.suffix.lower()]
+    with Image.open(source) as img:
+        img.load()
+        width, height = img.size
+        variants: Dict[str, List] = {fmt: [], 'webp': []}
+        for target_width in [w for w in WIDTHS if w < width] + [width]:
+            if target_width == width:
+                resized = img
+            else:
+                resized = img.resize((target_width, round(height * target_width / width)), Image.LANCZOS)
+            # Full-size copies only make sense as WebP; the original already covers its own format
+            for out_fmt in (('webp',) if target_width == width else (fmt, 'webp')):
+                name = f"{source.stem}.{digest[:10]}.{target_width}{EXTENSIONS[out_fmt]}"
+                _save(resized, out_dir / name, out_fmt)
+                variants[out_fmt].append([target_width, name])
+    return {'hash': digest, 'format': fmt, 'width': width, 'height': height, 'variants': variants}
+
+
+def build(static_dir: Path, force: bool = False) -> Dict[str, Any]:
+    """Bring ``images/derived`` up to date and return the manifest's images map."""
+    if not PIL_AVAILABLE:
+        raise RuntimeError("Pillow is required: pip install Pillow")
+    src_dir = static_dir / IMAGES_DIR
+    out_dir = src_dir / DERIVED_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / MANIFEST_FILE
+    try:
+        previous = json.loads(manifest_path.read_text(encoding='utf-8')).get('images', {})
+    except (OSError, json.JSONDecodeError, AttributeError):
+        previous = {}
+
+    images: Dict[str, Any] = {}
+    built = skipped = 0
+    for source in sorted(src_dir.iterdir()):
+        if not source.is_file() or source.suffix.lower() not in SOURCE_FORMATS:
+            continue
+        digest = _sha256(source)
+        entry = previous.get(source.name)
+        if (not force and entry and entry.get('hash') == digest and all(
+                (out_dir / name).is_file() for variants in entry['variants'].values() for _, name in variants)):
+            images[source.name] = entry
+            skipped += 1
+            continue
+        images[source.name] = _process(source, digest, out_dir)
+        built += 1
+        logger.info("built %s (%d variants)", source.name,
+                    sum(len(v) for v in images[source.name]['variants'].values()))
+
+    # Drop derivatives that no longer belong to any current source
+    keep = {MANIFEST_FILE} | {name for e in images.values() for v in e['variants'].values() for _, name in v}
+    for path in out_dir.iterdir():
+        if path.is_file() and path.name not in keep:
+            path.unlink()
+
+    tmp = manifest_path.with_name(MANIFEST_FILE + '.tmp')
+    tmp.write_text(json.dumps({'version': 1, 'widths': list(WIDTHS), 'images': images}, indent=2, sort_keys=True),
+                   encoding='utf-8')
+    os.replace(tmp, manifest_path)
+    logger.info("%d image(s) built, %d unchanged", built, skipped)
+    return images
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate resized/WebP derivatives of static/images.")
+    parser.add_argument('--static-dir', default=str(Path(__file__).resolve().parents[2] / 'static'))
+    parser.add_argument('--force', action='store_true', help="rebuild every image even if unchanged")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    build(Path(args.static_dir), force=args.force)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
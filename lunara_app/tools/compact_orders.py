@@ -0,0 +1,51 @@
+"""Rewrite orders.json into the compact order schema.
+
+Each legacy line item (a full copy of the product plus ``quantity``) becomes
+``{product_id, quantity, unit_price}``, keeping the price it was sold at;
+orders already compact are left alone. The journal is folded in and the
+snapshot is replaced in one step under the store's file lock, so the app can
+keep running. Read-time expansion brings back the product details.
+
+Usage:
+    python -m lunara_app.tools.compact_orders [--data-dir DIR] [--dry-run]
+"""
+from __future__ import annotations
+import argparse
+import logging
+from dataclasses import asdict
+from typing import List, Optional
+
+from ..config import Config
+from ..services.orders import compact_order, get_price_index, orders_store
+
+logger = logging.getLogger("lunara_app.compact_orders")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compact line items of stored orders.")
+    parser.add_argument('--data-dir', help="JSON data directory (defaults to DATA_DIR)")
+    parser.add_argument('--dry-run', action='store_true', help="only count the orders that would change")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    config = asdict(Config())
+    if args.data_dir:
+        config['DATA_DIR'] = args.data_dir
+    index = get_price_index(config['DATA_DIR'])
+    store = orders_store(config)
+    size_before = store.snapshot_path.stat().st_size + (
+        store.journal_path.stat().st_size if store.journal_path.exists() else 0)
+
+    if args.dry_run:
+        pending = sum(1 for order in store.all() if compact_order(order, index) is not order)
+        logger.info("dry run: %d of %d orders would be compacted", pending, len(store))
+        return 0
+    changed = store.rewrite(lambda order: compact_order(order, index))
+    size_after = store.snapshot_path.stat().st_size
+    logger.info("compacted %d of %d orders; %s: %d -> %d bytes",
+                changed, len(store), store.snapshot_path, size_before, size_after)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
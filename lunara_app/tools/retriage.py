@@ -0,0 +1,211 @@
+"""Bulk re-triage of support tickets after FAQ or sentiment-word changes.
+
+Re-scores every open ticket with detect_sentiment and match_faq, marks tickets
+that now have a confident FAQ answer (and are not negative) as ``auto-closed``
+and refreshes stored sentiment. Scoring fans out over a process pool; each
+worker builds the FAQ index once.
+
+Usage:
+    python -m lunara_app.tools.retriage [--workers N] [--chunk-size 500] [--dry-run]
+"""
+from __future__ import annotations
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from ..config import Config
+from ..services.db import DBState, TICKETS_JSON_FILE, get_db_connection, init_db
+from ..services.faq_service import (
+    FAQ_SEED, MATCH_THRESHOLD, FaqIndex, detect_sentiment, load_faqs, normalize_text,
+)
+from ..services.journal import get_store, iter_collection
+
+logger = logging.getLogger("lunara_app.retriage")
+
+AUTO_CLOSED = 'auto-closed'
+
+# (id, question, sentiment, status)
+TicketRow = Tuple[Any, str, Optional[str], Optional[str]]
+# (id, new sentiment, new status)
+TicketUpdate = Tuple[Any, str, str]
+
+_worker_index: Optional[FaqIndex] = None
+
+
+def _init_worker(faqs_list: List[Dict[str, str]]) -> None:
+    global _worker_index
+    _worker_index = FaqIndex(faqs_list)
+
+
+def score_chunk(rows: List[TicketRow]) -> Tuple[int, List[TicketUpdate]]:
+    """Score one chunk in a worker; return (rows seen, changed tickets)."""
+    updates: List[TicketUpdate] = []
+    for ticket_id, question, sentiment, status in rows:
+        new_sentiment = detect_sentiment(question)
+        _, score = _worker_index.search(normalize_text(question))
+        new_status = status or 'open'
+        if score >= MATCH_THRESHOLD and new_sentiment != 'negative':
+            new_status = AUTO_CLOSED
+        if new_sentiment != sentiment or new_status != status:
+            updates.append((ticket_id, new_sentiment, new_status))
+    return len(rows), updates
+
+
+# ---------------------------------------------------------------- ticket sources
+def _iter_json_chunks(config, chunk_size: int, statuses: Optional[Set[str]]) -> Iterator[List[TicketRow]]:
+    chunk: List[TicketRow] = []
+    for t in iter_collection(str(config.get("DATA_DIR", "data")), TICKETS_JSON_FILE):
+        if statuses and t.get('status') not in statuses:
+            continue
+        chunk.append((t.get('id'), t.get('question') or '', t.get('sentiment'), t.get('status')))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _iter_mysql_chunks(config, chunk_size: int, statuses: Optional[Set[str]]) -> Iterator[List[TicketRow]]:
+    sql = "SELECT id, question, sentiment, status FROM support_tickets"
+    params: Tuple = ()
+    if statuses:
+        sql += " WHERE status IN (%s)" % ", ".join(["%s"] * len(statuses))
+        params = tuple(sorted(statuses))
+    sql += " ORDER BY id"
+    with get_db_connection(config) as conn:
+        cur = conn.cursor(buffered=False)  # server-side streaming
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [tuple(r) for r in rows]
+        cur.close()
+
+
+# ---------------------------------------------------------------- write-back
+class _JsonWriter:
+    def __init__(self, config):
+        self.store = get_store(config, TICKETS_JSON_FILE)
+        self.pending: List[Dict[str, Any]] = []
+
+    def write(self, updates: List[TicketUpdate]) -> None:
+        for ticket_id, sentiment, status in updates:
+            current = self.store.get(ticket_id)
+            if current is not None:
+                self.pending.append(dict(current, sentiment=sentiment, status=status))
+
+    def finish(self) -> None:
+        # One journal append for everything, then a single snapshot rewrite
+        self.store.append_many(self.pending)
+        self.store.compact()
+
+
+class _MySQLWriter:
+    def __init__(self, config, batch_size: int):
+        self.config = config
+        self.batch_size = batch_size
+        self.pending: List[TicketUpdate] = []
+
+    def write(self, updates: List[TicketUpdate]) -> None:
+        self.pending.extend(updates)
+        if len(self.pending) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self.pending:
+            return
+        with get_db_connection(self.config) as conn:
+            cur = conn.cursor()
+            cur.executemany(
+                "UPDATE support_tickets SET sentiment = %s, status = %s WHERE id = %s",
+                [(sentiment, status, ticket_id) for ticket_id, sentiment, status in self.pending],
+            )
+            conn.commit()
+            cur.close()
+        self.pending = []
+
+    def finish(self) -> None:
+        self._flush()
+
+
+# ---------------------------------------------------------------- driver
+def retriage(config, workers: int, chunk_size: int = 500, batch_size: int = 1000,
+             statuses: Optional[Set[str]] = None, dry_run: bool = False) -> Dict[str, Any]:
+    """Re-score tickets and write changes back; returns a summary dict."""
+    use_mysql = DBState.available
+    chunks = (_iter_mysql_chunks if use_mysql else _iter_json_chunks)(config, chunk_size, statuses)
+    writer = None if dry_run else (_MySQLWriter(config, batch_size) if use_mysql else _JsonWriter(config))
+    faqs_list = list(load_faqs(config))
+
+    started = time.perf_counter()
+    seen = changed = closed = 0
+    max_in_flight = max(2, workers * 2)
+    in_flight: Set[Future] = set()
+
+    def drain(block_until: int) -> None:
+        nonlocal seen, changed, closed, in_flight
+        while len(in_flight) > block_until:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                n, updates = fut.result()
+                seen += n
+                changed += len(updates)
+                closed += sum(1 for u in updates if u[2] == AUTO_CLOSED)
+                if writer is not None and updates:
+                    writer.write(updates)
+            elapsed = time.perf_counter() - started
+            logger.info("processed %d tickets (%d changed, %d auto-closed) at %.0f tickets/s",
+                        seen, changed, closed, seen / elapsed if elapsed else 0.0)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(faqs_list,)) as pool:
+        for chunk in chunks:
+            in_flight.add(pool.submit(score_chunk, chunk))
+            drain(max_in_flight - 1)
+        drain(0)
+
+    if writer is not None:
+        writer.finish()
+    elapsed = time.perf_counter() - started
+    return {
+        'backend': 'mysql' if use_mysql else 'json',
+        'tickets': seen,
+        'changed': changed,
+        'auto_closed': closed,
+        'seconds': round(elapsed, 3),
+        'tickets_per_second': round(seen / elapsed, 1) if elapsed else 0.0,
+        'dry_run': dry_run,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-score support tickets against the current FAQs.")
+    parser.add_argument('--data-dir', help="JSON data directory (defaults to DATA_DIR)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=1000, help="rows per MySQL executemany")
+    parser.add_argument('--all', action='store_true', help="include tickets that are not open")
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    config = asdict(Config())
+    if args.data_dir:
+        config['DATA_DIR'] = args.data_dir
+    init_db(FAQ_SEED, config)
+
+    summary = retriage(
+        config, workers=max(1, args.workers), chunk_size=max(1, args.chunk_size),
+        batch_size=max(1, args.batch_size), statuses=None if args.all else {'open'},
+        dry_run=args.dry_run,
+    )
+    logger.info("done: %s", summary)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
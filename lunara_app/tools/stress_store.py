@@ -0,0 +1,98 @@
+"""Multi-process stress check for the JSON and journal stores.
+
+Starts several worker processes that concurrently append to a JSON document
+(via ``json_transaction``) and to a journal store (with store-assigned ids),
+then verifies that no write was lost and every id is unique. ``--unsafe``
+runs the JSON half as a plain unlocked load/save loop to show the lost
+updates the locking prevents.
+
+Usage:
+    python -m lunara_app.tools.stress_store [--workers 4] [--writes 200] [--unsafe]
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from ..services.db import json_transaction
+from ..services.journal import JournalStore
+
+logger = logging.getLogger("lunara_app.stress_store")
+
+DOC_FILE = 'stress_doc.json'
+JOURNAL_FILE = 'stress_records.json'
+
+
+def _worker(data_dir: str, worker: int, writes: int, unsafe: bool) -> None:
+    store = JournalStore(data_dir, JOURNAL_FILE, fsync_every=64, compact_every=50)
+    doc_path = Path(data_dir) / DOC_FILE
+    for i in range(writes):
+        entry = f"{worker}:{i}"
+        if unsafe:
+            # The old load_json/save_json pair: no lock, in-place rewrite, reset on parse errors
+            try:
+                items = json.loads(doc_path.read_text(encoding='utf-8'))
+            except json.JSONDecodeError:
+                items = []
+            items.append(entry)
+            doc_path.write_text(json.dumps(items), encoding='utf-8')
+        else:
+            with json_transaction(data_dir, DOC_FILE, []) as items:
+                items.append(entry)
+        store.append({'id': None, 'entry': entry})
+    store.close()
+
+
+def run(data_dir: str, workers: int, writes: int, unsafe: bool = False) -> bool:
+    (Path(data_dir) / DOC_FILE).write_text('[]', encoding='utf-8')
+    started = time.perf_counter()
+    procs = [multiprocessing.Process(target=_worker, args=(data_dir, w, writes, unsafe)) for w in range(workers)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    expected = workers * writes
+    doc = json.loads((Path(data_dir) / DOC_FILE).read_text(encoding='utf-8'))
+    records = JournalStore(data_dir, JOURNAL_FILE).all()
+    ids = [r['id'] for r in records]
+    entries = {r['entry'] for r in records}
+    ok = True
+    for label, count in (('json document', len(set(doc))), ('journal records', len(entries))):
+        lost = expected - count
+        logger.info("%s: %d/%d writes kept%s", label, count, expected, f" ({lost} LOST)" if lost else "")
+        ok = ok and lost == 0
+    if len(ids) != len(set(ids)) or sorted(ids) != list(range(1, expected + 1)):
+        logger.info("journal ids are not unique and contiguous")
+        ok = False
+    failed = [p.exitcode for p in procs if p.exitcode]
+    if failed:
+        logger.info("%d worker(s) exited with errors", len(failed))
+        ok = False
+    logger.info("%d workers x %d writes in %.2fs: %s", workers, writes, elapsed, "OK" if ok else "FAILED")
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent multi-process writes against the JSON stores.")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--writes', type=int, default=200, help="writes per worker to each store")
+    parser.add_argument('--unsafe', action='store_true', help="use unlocked load/save for the JSON document")
+    parser.add_argument('--data-dir', help="scratch directory (default: a temporary directory)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    if args.data_dir:
+        Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+        return 0 if run(args.data_dir, args.workers, args.writes, args.unsafe) else 1
+    with tempfile.TemporaryDirectory() as tmp:
+        return 0 if run(tmp, args.workers, args.writes, args.unsafe) else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
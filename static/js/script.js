@@ -47,11 +47,32 @@ function getProductImage(product) {
     return `/static/images/${base}${index}.jpg`;
 }
 
+// Product image markup; uses server-provided responsive variants when available
+function productImageTag(product) {
+    const sizes = '(max-width: 768px) 50vw, 300px';
+    if (!product.srcset) {
+        return `<img src="${product.image}" alt="${product.name}" loading="lazy">`;
+    }
+    const webp = product.srcsetWebp ? `<source type="image/webp" srcset="${product.srcsetWebp}" sizes="${sizes}">` : '';
+    return `<picture>${webp}<img src="${product.image}" srcset="${product.srcset}" sizes="${sizes}" alt="${product.name}" loading="lazy"></picture>`;
+}
+
+// Products inlined by the server on first paint, otherwise fetched from the API
+function loadProducts() {
+    const inline = document.getElementById('initial-products');
+    if (inline) {
+        try {
+            return Promise.resolve(JSON.parse(inline.textContent));
+        } catch (error) {
+            console.error('Error reading inline products:', error);
+        }
+    }
+    return fetch('/api/products').then(response => response.json());
+}
+
 // Initialize the application
 document.addEventListener('DOMContentLoaded', function () {
-    // Fetch products from backend
-    fetch('/api/products')
-        .then(response => response.json())
+    loadProducts()
         .then(data => {
             products = data.map(p => ({ ...p, image: getProductImage(p) }));
             // Render initial products
@@ -814,7 +835,7 @@ function setupEventListeners() {
             card.className = 'product-card';
             card.innerHTML = `
                 <div class="product-image">
-                    <img src="${product.image}" alt="${product.name}">
+                    ${productImageTag(product)}
                     ${product.originalPrice ? `<div class="product-badge">Sale</div>` : ''}
                 </div>
                 <div class="product-info">
@@ -1075,7 +1096,7 @@ function renderProducts() {
         productCard.className = 'product-card';
         productCard.innerHTML = `
             <div class="product-image">
-                <img src="${product.image}" alt="${product.name}">
+                ${productImageTag(product)}
                 ${product.originalPrice ? `<div class="product-badge">Sale</div>` : ''}
             </div>
             <div class="product-info">
@@ -1117,7 +1138,7 @@ function renderCatalogProducts() {
         productCard.className = 'product-card';
         productCard.innerHTML = `
             <div class="product-image">
-                <img src="${product.image}" alt="${product.name}">
+                ${productImageTag(product)}
                 ${product.originalPrice ? `<div class="product-badge">Sale</div>` : ''}
             </div>
             <div class="product-info">
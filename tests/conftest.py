@@ -0,0 +1,32 @@
+"""Shared fixtures: an app over a scratch copy of data/ (JSON storage, no MySQL needed)."""
+from __future__ import annotations
+import shutil
+from pathlib import Path
+
+import pytest
+
+from lunara_app import create_app
+from lunara_app.config import Config
+
+REPO_DATA = Path(__file__).resolve().parent.parent / 'data'
+
+
+@pytest.fixture
+def data_dir(tmp_path) -> Path:
+    target = tmp_path / 'data'
+    target.mkdir()
+    for path in REPO_DATA.glob('*.json'):
+        shutil.copy(path, target / path.name)
+    return target
+
+
+@pytest.fixture
+def app(data_dir):
+    app = create_app(Config(DATA_DIR=str(data_dir), RATE_LIMIT_ENABLED=False, BCRYPT_ROUNDS=4))
+    app.testing = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,33 @@
+from __future__ import annotations
+import json
+import os
+
+from lunara_app.services.db import json_transaction, load_json_versioned
+
+
+def test_versioned_load_is_cached_until_the_file_changes(tmp_path):
+    path = tmp_path / 'products.json'
+    path.write_text(json.dumps([{'id': 1}]))
+    first, version = load_json_versioned(str(tmp_path), 'products.json', [])
+    again, same = load_json_versioned(str(tmp_path), 'products.json', [])
+    assert again is first and same == version
+
+    # A rewrite of the same size is told apart by its mtime
+    path.write_text(json.dumps([{'id': 2}]))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    changed, new_version = load_json_versioned(str(tmp_path), 'products.json', [])
+    assert changed == [{'id': 2}] and new_version != version
+
+
+def test_json_transaction_invalidates_the_cache(tmp_path):
+    (tmp_path / 'settings.json').write_text('{}')
+    load_json_versioned(str(tmp_path), 'settings.json', {})
+    with json_transaction(str(tmp_path), 'settings.json', {}) as settings:
+        settings['banner'] = 'sale'
+    assert load_json_versioned(str(tmp_path), 'settings.json', {})[0] == {'banner': 'sale'}
+
+
+def test_missing_file_gives_default(tmp_path):
+    data, _ = load_json_versioned(str(tmp_path), 'absent.json', [])
+    assert data == []
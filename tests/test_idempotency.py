@@ -0,0 +1,131 @@
+from __future__ import annotations
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+
+import pytest
+
+from lunara_app.services.idempotency import IdempotencyCache, IdempotencyConflict, IdempotencyInProgress
+
+
+def _slow(calls, body=b'ok', delay=0.0):
+    def execute():
+        calls.append(1)
+        time.sleep(delay)
+        return 200, 'application/json', body
+    return execute
+
+
+@pytest.mark.parametrize('shared', [False, True])
+def test_concurrent_duplicates_run_once(tmp_path, shared):
+    cache = IdempotencyCache(str(tmp_path) if shared else None, wait=5)
+    calls, results = [], []
+    threads = [threading.Thread(target=lambda: results.append(cache.run('k', 'fp', _slow(calls, delay=0.1))))
+               for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert sorted(replayed for _, replayed in results) == [False] + [True] * 9
+
+
+def test_key_reused_for_another_request_conflicts(tmp_path):
+    cache = IdempotencyCache(str(tmp_path))
+    cache.run('k', 'fp', _slow([]))
+    with pytest.raises(IdempotencyConflict):
+        cache.run('k', 'other', _slow([]))
+
+
+def test_failed_request_can_be_retried(tmp_path):
+    cache = IdempotencyCache(str(tmp_path))
+
+    def fail():
+        raise RuntimeError('gateway down')
+
+    with pytest.raises(RuntimeError):
+        cache.run('k', 'fp', fail)
+    calls = []
+    assert cache.run('k', 'fp', _slow(calls)) == ((200, 'application/json', b'ok'), False)
+    assert not list((tmp_path / 'idempotency').glob('*.inflight'))
+
+
+def _run_in_child(data_dir, queue):
+    queue.put(IdempotencyCache(data_dir).run('k', 'fp', _slow([], body=b'child')))
+
+
+def test_other_processes_replay_from_disk(tmp_path):
+    IdempotencyCache(str(tmp_path)).run('k', 'fp', _slow([], body=b'parent'))
+    ctx = multiprocessing.get_context('fork')
+    queue = ctx.Queue()
+    child = ctx.Process(target=_run_in_child, args=(str(tmp_path), queue))
+    child.start()
+    child.join(10)
+    assert queue.get(timeout=5) == ((200, 'application/json', b'parent'), True)
+
+
+def test_unrelated_keys_do_not_wait_for_each_other(tmp_path):
+    slow = IdempotencyCache(str(tmp_path), stripes=1)
+    fast = IdempotencyCache(str(tmp_path), stripes=1, wait=0.2)
+    worker = threading.Thread(target=slow.run, args=('slow', 'fp', _slow([], delay=1.0)))
+    worker.start()
+    time.sleep(0.1)
+    started = time.monotonic()
+    fast.run('fast', 'fp', _slow([]))
+    assert time.monotonic() - started < 0.5
+    worker.join()
+
+
+def test_running_key_in_another_process_times_out(tmp_path):
+    cache = IdempotencyCache(str(tmp_path), wait=0.2)
+    marker = cache._marker(cache._path('k'))
+    marker.parent.mkdir(parents=True)
+    marker.write_text(f"{socket.gethostname()}:{os.getpid()}")  # a live owner
+    with pytest.raises(IdempotencyInProgress):
+        cache.run('k', 'fp', _slow([]))
+
+
+def test_marker_of_dead_process_is_taken_over(tmp_path):
+    cache = IdempotencyCache(str(tmp_path), wait=1)
+    marker = cache._marker(cache._path('k'))
+    marker.parent.mkdir(parents=True)
+    marker.write_text(f"{socket.gethostname()}:999999999")
+    calls = []
+    assert cache.run('k', 'fp', _slow(calls))[1] is False
+    assert calls == [1]
+
+
+# ------------------------------------------------------------------ endpoint
+@pytest.fixture
+def cart(data_dir):
+    product = json.loads((data_dir / 'products.json').read_text())[0]
+    return {'method': 'card', 'items': [{'id': product['id'], 'quantity': 1}]}
+
+
+def _pay(client, cart, key):
+    return client.post('/api/process-payment', json=cart, headers={'Idempotency-Key': key})
+
+
+def test_guest_retry_from_a_fresh_client_is_replayed(app, cart):
+    key = str(uuid.uuid4())
+    first = _pay(app.test_client(), cart, key)
+    retry = _pay(app.test_client(), cart, key)  # no cookie from the first attempt
+    assert retry.headers.get('Idempotent-Replayed') == 'true'
+    assert retry.get_data() == first.get_data()
+
+
+def test_guest_keys_must_be_unguessable(client, cart):
+    resp = _pay(client, cart, 'order-1')
+    assert resp.status_code == 400
+
+
+def test_user_key_reused_for_another_cart_conflicts(client, cart):
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'u1'
+    assert _pay(client, cart, 'checkout-1').status_code == 200
+    other = dict(cart, items=[dict(cart['items'][0], quantity=2)])
+    assert _pay(client, other, 'checkout-1').status_code == 422
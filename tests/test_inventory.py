@@ -0,0 +1,125 @@
+from __future__ import annotations
+import json
+import multiprocessing
+import socket
+import threading
+import time
+
+import pytest
+
+from lunara_app.services.inventory import InventoryManager, OutOfStock
+
+
+@pytest.fixture
+def stocked(data_dir):
+    products = [{'id': 1, 'name': 'Ring', 'price': 100, 'inventory': 20},
+                {'id': 2, 'name': 'Chain', 'price': 50, 'inventory': 1},
+                {'id': 3, 'name': 'Gift card', 'price': 25}]
+    (data_dir / 'products.json').write_text(json.dumps(products))
+    return data_dir
+
+
+@pytest.fixture
+def manager(stocked):
+    manager = InventoryManager({'DATA_DIR': str(stocked)}, lease=4, flush_interval=60)
+    yield manager
+    manager.close()
+
+
+def _stock(data_dir):
+    return {p['id']: p.get('inventory') for p in json.loads((data_dir / 'products.json').read_text())}
+
+
+def test_commit_publishes_remaining_stock(manager, stocked):
+    manager.commit(manager.reserve({1: 3}).id)
+    manager.flush()
+    assert _stock(stocked)[1] == 17
+
+
+def test_idle_flush_leaves_products_json_alone(manager, stocked):
+    manager.commit(manager.reserve({1: 1}).id)
+    manager.flush()
+    before = (stocked / 'products.json').stat().st_mtime_ns
+    manager.release(manager.reserve({1: 1}).id)  # leaves idle leased units behind
+    manager.flush()
+    manager.flush()
+    assert (stocked / 'products.json').stat().st_mtime_ns == before
+
+
+def test_cart_is_reserved_all_or_nothing(manager):
+    with pytest.raises(OutOfStock) as err:
+        manager.reserve({1: 2, 2: 2})
+    assert err.value.product_id == '2'
+    manager.commit(manager.reserve({1: 18}).id)  # the failed cart held nothing back
+
+
+def test_released_and_expired_units_return(manager):
+    manager.release(manager.reserve({2: 1}).id)
+    manager.reserve({2: 1}, ttl=0)
+    assert manager.expire() == 1
+    manager.reserve({2: 1})
+
+
+def test_untracked_products_are_not_limited(manager):
+    manager.reserve({3: 1000})
+
+
+def test_threads_never_oversell(manager, stocked):
+    sold = []
+
+    def buy():
+        for _ in range(10):
+            try:
+                sold.append(manager.commit(manager.reserve({1: 1}).id))
+            except OutOfStock:
+                pass
+
+    threads = [threading.Thread(target=buy) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    manager.flush()
+    assert len(sold) == 20
+    assert _stock(stocked)[1] == 0
+
+
+def _buy_until_sold_out(data_dir, results):
+    manager = InventoryManager({'DATA_DIR': data_dir}, lease=4, flush_interval=0.05)
+    sold = 0
+    misses = 0
+    while misses < 20:
+        try:
+            manager.commit(manager.reserve({1: 1}).id)
+            sold += 1
+        except OutOfStock:
+            misses += 1
+            time.sleep(0.02)  # let the other process hand idle units back
+    manager.close()
+    results.put(sold)
+
+
+def test_processes_share_stock_through_leases(stocked):
+    ctx = multiprocessing.get_context('fork')
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_buy_until_sold_out, args=(str(stocked), results)) for _ in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+    assert sum(results.get(timeout=5) for _ in procs) == 20
+    assert _stock(stocked)[1] == 0
+
+
+def test_leases_of_dead_processes_are_returned(manager, stocked):
+    manager.commit(manager.reserve({1: 1}).id)
+    manager.flush()
+    ledger_path = stocked / 'inventory.json'
+    ledger = json.loads(ledger_path.read_text())
+    ledger['pool']['1'] -= 5
+    ledger['leases'][f"{socket.gethostname()}:999999999"] = {'1': 5}
+    ledger_path.write_text(json.dumps(ledger))
+
+    manager.commit(manager.reserve({1: 19}).id)
+    with pytest.raises(OutOfStock):
+        manager.reserve({1: 1})
@@ -0,0 +1,86 @@
+from __future__ import annotations
+import json
+
+from lunara_app.services.journal import JournalStore, iter_collection
+
+
+def test_append_survives_reopen(tmp_path):
+    store = JournalStore(str(tmp_path), 'orders.json')
+    store.append({'id': 1, 'total': 10})
+    store.append({'id': 2, 'total': 20})
+    store.append({'id': 1, 'total': 15})
+    store.close()
+
+    reopened = JournalStore(str(tmp_path), 'orders.json')
+    assert [r['total'] for r in reopened.all()] == [15, 20]
+
+
+def test_torn_final_journal_line_is_dropped(tmp_path):
+    store = JournalStore(str(tmp_path), 'orders.json')
+    store.append({'id': 1, 'total': 10})
+    store.close()
+    with open(tmp_path / 'orders.jsonl', 'ab') as f:
+        f.write(b'{"id": 2, "tot')  # crash in the middle of a write
+
+    reopened = JournalStore(str(tmp_path), 'orders.json')
+    assert [r['id'] for r in reopened.all()] == [1]
+
+
+def test_compact_folds_journal_into_snapshot(tmp_path):
+    store = JournalStore(str(tmp_path), 'orders.json', compact_every=3)
+    for i in range(1, 5):
+        store.append({'id': i})
+    snapshot = json.loads((tmp_path / 'orders.json').read_text())
+    assert [r['id'] for r in snapshot] == [1, 2, 3]
+    assert (tmp_path / 'orders.jsonl').read_text().count('\n') == 1
+    assert [r['id'] for r in JournalStore(str(tmp_path), 'orders.json').all()] == [1, 2, 3, 4]
+
+
+def test_other_instances_see_appends(tmp_path):
+    writer = JournalStore(str(tmp_path), 'orders.json')
+    reader = JournalStore(str(tmp_path), 'orders.json')
+    writer.append({'id': 7})
+    assert reader.get(7) == {'id': 7}
+
+
+def test_reserved_ids_are_never_reused(tmp_path):
+    first = JournalStore(str(tmp_path), 'tickets.json')
+    second = JournalStore(str(tmp_path), 'tickets.json')
+    a = first.reserve_ids(5)
+    b = second.reserve_ids(5)
+    assert not set(a) & set(b)
+    assigned = first.append({'id': None, 'question': 'hi'})
+    assert assigned['id'] > max(max(a), max(b))
+
+
+def test_add_unique_rejects_taken_index_value(tmp_path):
+    store = JournalStore(str(tmp_path), 'users.json')
+    store.add_index('email', lambda u: u.get('email'))
+    other = JournalStore(str(tmp_path), 'users.json')
+    other.add_index('email', lambda u: u.get('email'))
+
+    assert store.add_unique({'id': 'a', 'email': 'x@example.com'}, 'email', 'x@example.com') is not None
+    assert other.add_unique({'id': 'b', 'email': 'x@example.com'}, 'email', 'x@example.com') is None
+    assert len(other) == 1
+
+
+def test_rewrite_replaces_records_and_truncates_journal(tmp_path):
+    store = JournalStore(str(tmp_path), 'orders.json')
+    store.append({'id': 1, 'v': 1})
+    store.append({'id': 2, 'v': 2})
+
+    changed = store.rewrite(lambda r: dict(r, v=r['v'] * 10) if r['id'] == 2 else r)
+    assert changed == 1
+    assert (tmp_path / 'orders.jsonl').read_text() == ''
+    assert [r['v'] for r in JournalStore(str(tmp_path), 'orders.json').all()] == [1, 20]
+    assert store.rewrite(lambda r: r) == 0
+
+
+def test_iter_collection_streams_snapshot_and_journal(tmp_path):
+    store = JournalStore(str(tmp_path), 'orders.json')
+    store.append_many([{'id': 1, 'v': 'a'}, {'id': 2, 'v': 'b'}])
+    store.compact()
+    store.append({'id': 1, 'v': 'A'})
+    store.append({'id': 3, 'v': 'c'})
+    assert [(r['id'], r['v']) for r in iter_collection(str(tmp_path), 'orders.json')] == \
+        [(1, 'A'), (2, 'b'), (3, 'c')]
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import pytest
+
+from lunara_app.services.orders import orders_store
+from lunara_app.services.pagination import encode_cursor
+
+
+@pytest.fixture
+def orders(app, client):
+    store = orders_store(app.config)
+    store.append_many([{'id': i, 'user_id': 'u1', 'items': [], 'total': i} for i in range(1, 8)])
+    store.append({'id': 100, 'user_id': 'someone-else', 'items': [], 'total': 0})
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'u1'
+    return store
+
+
+def test_pages_walk_newest_first(client, orders):
+    seen, cursor = [], None
+    while True:
+        resp = client.get('/api/orders', query_string={'limit': 3, **({'cursor': cursor} if cursor else {})})
+        body = resp.get_json()
+        seen.append([o['id'] for o in body['orders']])
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert seen == [[7, 6, 5], [4, 3, 2], [1]]
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', '!!!'])
+def test_malformed_cursor_is_rejected(client, orders, cursor):
+    assert client.get('/api/orders', query_string={'cursor': cursor}).status_code == 400
+
+
+@pytest.mark.parametrize('before', [-5, 8, 31])
+def test_out_of_range_cursor_is_rejected(client, orders, before):
+    resp = client.get('/api/orders', query_string={'cursor': encode_cursor({'before': before})})
+    assert resp.status_code == 400
+
+
+def test_orders_need_login(app):
+    assert app.test_client().get('/api/orders').get_json()['success'] is False
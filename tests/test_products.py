@@ -0,0 +1,38 @@
+from __future__ import annotations
+import json
+
+import pytest
+
+
+@pytest.fixture
+def many_products(data_dir):
+    products = [{'id': i, 'name': f'Ring {i}', 'category': 'rings', 'price': 1000 + i, 'rating': 4.0}
+                for i in range(1, 151)]
+    (data_dir / 'products.json').write_text(json.dumps(products))
+    return products
+
+
+def test_filters_sort_and_page(client, many_products):
+    resp = client.get('/api/products', query_string={'min_price': 1100, 'sort': 'price_desc',
+                                                      'limit': 5, 'offset': 2})
+    assert resp.status_code == 200
+    assert [p['id'] for p in resp.get_json()] == [148, 147, 146, 145, 144]
+    assert resp.headers['X-Total-Count'] == '51'
+
+
+def test_limit_is_capped(client, many_products):
+    resp = client.get('/api/products', query_string={'limit': 5000})
+    assert len(resp.get_json()) == 100
+    assert resp.headers['X-Total-Count'] == '150'
+    assert len(client.get('/api/products').get_json()) == 150
+
+
+@pytest.mark.parametrize('query', [{'min_price': 'nan'}, {'max_price': 'inf'}, {'min_rating': '-inf'},
+                                   {'min_price': 'cheap'}, {'limit': -1}, {'sort': 'random'}])
+def test_bad_queries_are_rejected(client, query):
+    assert client.get('/api/products', query_string=query).status_code == 400
+
+
+def test_unchanged_catalog_answers_304(client):
+    etag = client.get('/api/products').headers['ETag']
+    assert client.get('/api/products', headers={'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import pytest
+
+from lunara_app import create_app
+from lunara_app.config import Config
+from lunara_app.services.ratelimit import MemoryBuckets, RateLimiter, SharedBuckets, parse_limits
+
+
+def test_parse_limits():
+    assert parse_limits('auth.login=10/60, chatbot.chatbot_ask=30/60s') == {
+        'auth.login': (10.0, 10 / 60), 'chatbot.chatbot_ask': (30.0, 0.5)}
+    for bad in ('auth.login', 'auth.login=10', 'auth.login=0/60', 'auth.login=x/60'):
+        with pytest.raises(ValueError):
+            parse_limits(bad)
+
+
+def test_buckets_are_taken_all_or_none():
+    buckets = MemoryBuckets()
+    assert buckets.take(['ip:a', 'user:u'], 2, 0.001) == (None, 0.0)
+    assert buckets.take(['ip:a', 'user:u'], 2, 0.001) == (None, 0.0)
+    short, wait = buckets.take(['ip:b', 'user:u'], 2, 0.001)
+    assert short == 1 and wait > 0
+    assert buckets.take(['ip:b'], 2, 0.001)[0] is None  # the refusal spent nothing from ip:b
+    assert buckets.take(['ip:b'], 2, 0.001)[0] is None
+
+
+def test_least_recent_buckets_are_evicted():
+    buckets = MemoryBuckets(max_keys=2)
+    for key in ('a', 'b', 'c'):
+        buckets.take([key], 1, 0.001)
+    assert buckets.stats() == {'keys': 2, 'max_keys': 2, 'evicted': 1}
+    assert buckets.take(['a'], 1, 0.001)[0] is None  # forgotten, so full again
+
+
+def test_failing_shared_store_falls_back_to_local():
+    class Down:
+        def eval(self, *args):
+            raise ConnectionError('redis down')
+
+    limiter = RateLimiter({'auth.login': (1, 0.001)}, MemoryBuckets(), SharedBuckets(Down()))
+    assert limiter.check('auth.login', [('ip', '1.2.3.4')]) is None
+    assert limiter.check('auth.login', [('ip', '1.2.3.4')])[0] == 'ip'
+    assert limiter.shared_errors == 2
+
+
+@pytest.fixture
+def limited(data_dir):
+    app = create_app(Config(DATA_DIR=str(data_dir), RATE_LIMITS='auth.login=2/600', BCRYPT_ROUNDS=4))
+    app.testing = True
+    return app
+
+
+def _login(client, ip, password='wrong'):
+    return client.post('/api/login', json={'email': 'a@example.com', 'password': password},
+                       environ_base={'REMOTE_ADDR': ip})
+
+
+def test_limited_endpoint_answers_429(limited):
+    client = limited.test_client()
+    assert [_login(client, '10.0.0.1').status_code for _ in range(3)] == [200, 200, 429]
+    resp = _login(client, '10.0.0.1')
+    assert int(resp.headers['Retry-After']) >= 1
+    assert _login(client, '10.0.0.2').status_code == 200
+
+
+def test_user_refusal_leaves_ip_budget(limited):
+    client = limited.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'u1'
+    assert [_login(client, '10.0.0.1').status_code for _ in range(2)] == [200, 200]
+    assert _login(client, '10.0.0.3').status_code == 429  # user bucket empty
+    guest = limited.test_client()
+    assert [_login(guest, '10.0.0.3').status_code for _ in range(3)] == [200, 200, 429]
+
+
+def test_preflights_are_not_counted(limited):
+    client = limited.test_client()
+    for _ in range(5):
+        client.options('/api/login', environ_base={'REMOTE_ADDR': '10.0.0.4'})
+    assert _login(client, '10.0.0.4').status_code == 200